@@ -0,0 +1,157 @@
+"""
+Compare the throughput and tail latency of the listing pages served by the
+sync views under WSGI and by the async views under ASGI.
+
+The script fills a throwaway database with synthetic data if it is empty,
+then for each server starts gunicorn on a local port, sends concurrent
+requests to the homepage, a category page and a search, and prints the
+requests per second and the median and 99th percentile latencies.
+
+Usage::
+
+    python benchmarks/asgi_vs_wsgi.py --concurrency 64 --requests 2000
+
+The ASGI server needs uvicorn. The database comes from ``DATABASE_URL``
+and defaults to a throwaway SQLite file in the temporary directory, which
+also holds the cache shared by the workers unless ``CACHE_URL`` is set.
+Never point it at a production database.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'developer_toolkit.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(
+    tempfile.gettempdir(), 'asgi_vs_wsgi.sqlite3'))
+# The workers share a cache table of the database, as gunicorn.conf.py
+# refuses to start several of them with a local memory cache each
+os.environ.setdefault('CACHE_URL', 'db://benchmark_cache')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+
+from resources.models import Category, Resource  # noqa: E402
+
+SERVERS = {
+    'WSGI, sync views': (
+        ['developer_toolkit.wsgi:application', '-k', 'gthread'],
+        {'ASYNC_VIEWS': '0'},
+    ),
+    'ASGI, async views': (
+        ['developer_toolkit.asgi:application',
+         '-k', 'uvicorn.workers.UvicornWorker'],
+        {'ASYNC_VIEWS': '1'},
+    ),
+}
+
+
+def populate(resources, categories, batch_size=5000):
+    user = User.objects.create(username='bench-user')
+    category_objs = Category.objects.bulk_create([
+        Category(name=f'Category {i}', author=user, published=True)
+        for i in range(categories)
+    ])
+    for start in range(0, resources, batch_size):
+        Resource.objects.bulk_create([
+            Resource(
+                name=f'Resource {i}',
+                description=f'Synthetic resource number {i}',
+                url=f'https://example.com/{i}',
+                category=category_objs[i % categories],
+                uploader=user,
+                approved=True,
+            )
+            for i in range(start, min(start + batch_size, resources))
+        ])
+
+
+def wait_until_up(server, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not come up')
+
+
+def fetch(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(label, args, env, base_url, paths, options):
+    command = [
+        sys.executable, '-m', 'gunicorn', *args,
+        '--bind', base_url.split('//')[1],
+        '--workers', str(options.workers),
+        '--threads', str(options.threads),
+        '--log-level', 'warning',
+    ]
+    server = subprocess.Popen(
+        command, cwd=BASE_DIR, env={**os.environ, **env})
+    try:
+        wait_until_up(server, base_url + paths[0])
+        urls = [
+            base_url + paths[i % len(paths)]
+            for i in range(options.requests)
+        ]
+        with ThreadPoolExecutor(options.concurrency) as pool:
+            start = time.perf_counter()
+            timings = sorted(pool.map(fetch, urls))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f'{label}: {len(timings) / elapsed:.0f} requests/s, '
+          f'median {statistics.median(timings):.1f} ms, p99 {p99:.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--resources', type=int, default=20000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    options = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    call_command('createcachetable', verbosity=0)
+    if not Resource.objects.exists():
+        print(f'Creating {options.resources} resources...')
+        populate(options.resources, options.categories)
+    category = Category.objects.order_by('pk').first()
+    paths = [
+        '/',
+        f'/category/{category.pk}/?sort_by=newest',
+        '/search/?q=synthetic&in=description',
+    ]
+    base_url = f'http://127.0.0.1:{options.port}'
+    print(f'{options.requests} requests, {options.concurrency} concurrent, '
+          f'{options.workers} workers\n')
+    for label, (args, env) in SERVERS.items():
+        run(label, args, env, base_url, paths, options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Time typo-tolerant searches against the target of 50 ms at 100k resources.
+
+The script fills the database with synthetic resources named and tagged
+after common frameworks if it is empty, builds the in-process trigram
+index once, then times misspelled searches the way the search view runs
+them: the first page of results by relevance, and their count.
+
+Usage::
+
+    python benchmarks/fuzzy_search.py --resources 100000
+
+The database comes from ``DATABASE_URL`` and defaults to a throwaway SQLite
+file in the temporary directory. Never point it at a production database.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'developer_toolkit.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(
+    tempfile.gettempdir(), 'fuzzy_search.sqlite3'))
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.contrib.contenttypes.models import ContentType  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from taggit.models import Tag, TaggedItem  # noqa: E402
+
+from resources import fuzzy  # noqa: E402
+from resources.models import Category, Resource  # noqa: E402
+
+TARGET_MS = 50
+QUERIES = ['djnago', 'kubernets', 'djnago gude pythn', 'reakt hooks']
+NAME_WORDS = [
+    'Django', 'Kubernetes', 'Python', 'React', 'Docker', 'Flask', 'Rust',
+    'TypeScript', 'JavaScript', 'PostgreSQL', 'Redis', 'GraphQL', 'Vue',
+    'Angular', 'Terraform', 'Ansible', 'Linux', 'Git', 'Node', 'Go',
+    'Guide', 'Tutorial', 'Handbook', 'Cheatsheet', 'Course', 'Hooks',
+    'Testing', 'Deployment', 'Patterns', 'Performance', 'Security',
+    'Introduction', 'Advanced', 'Practical', 'Complete', 'Modern',
+]
+KEYWORDS = [
+    'python', 'django', 'kubernetes', 'react', 'docker', 'devops', 'web',
+    'frontend', 'backend', 'database', 'cloud', 'testing', 'security',
+    'javascript', 'typescript', 'rust', 'golang', 'linux', 'git', 'api',
+]
+
+
+def populate(resources, categories, users, batch_size=5000):
+    # Names of two to four words, two keywords each, a tenth unapproved
+    rng = random.Random(0)
+    user_objs = User.objects.bulk_create([
+        User(username=f'bench-user-{i}') for i in range(users)
+    ])
+    category_objs = Category.objects.bulk_create([
+        Category(name=f'Category {i}', author=user_objs[0], published=True)
+        for i in range(categories)
+    ])
+    tags = Tag.objects.bulk_create([
+        Tag(name=name, slug=name) for name in KEYWORDS
+    ])
+    content_type = ContentType.objects.get_for_model(Resource)
+    for start in range(0, resources, batch_size):
+        created = Resource.objects.bulk_create([
+            Resource(
+                name=' '.join(rng.sample(NAME_WORDS, rng.randint(2, 4))),
+                description=f'Synthetic resource number {i}',
+                url=f'https://example.com/{i}',
+                category=category_objs[i % categories],
+                uploader=user_objs[i % users],
+                approved=i % 10 != 0,
+            )
+            for i in range(start, min(start + batch_size, resources))
+        ])
+        TaggedItem.objects.bulk_create([
+            TaggedItem(tag=tag, content_type=content_type,
+                       object_id=resource.pk)
+            for resource in created
+            for tag in rng.sample(tags, 2)
+        ])
+
+
+def run(query, repeat):
+    def execute():
+        results = fuzzy.fuzzy_search(
+            Resource.objects.filter(approved=True), query,
+            ['name', 'keywords'])
+        page = list(results.order_by('-search_rank', 'pk')[:20])
+        return page, results.count()
+    page, count = execute()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        execute()
+        timings.append((time.perf_counter() - start) * 1000)
+    median = statistics.median(timings)
+    verdict = 'ok' if median < TARGET_MS else 'OVER TARGET'
+    print(f'--- {query!r}: median {median:.2f} ms, {count} results, '
+          f'{verdict}')
+    for resource in page[:3]:
+        print(f'    {resource.search_rank:.2f} {resource.name}')
+    return median < TARGET_MS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--resources', type=int, default=100000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    if not Resource.objects.exists():
+        print(f'Creating {args.resources} resources...')
+        populate(args.resources, args.categories, args.users)
+    print(f'Database: {connection.vendor}, '
+          f'{Resource.objects.count()} resources\n')
+
+    fuzzy.invalidate_index()
+    start = time.perf_counter()
+    fuzzy.get_index()
+    print(f'Index built in {(time.perf_counter() - start) * 1000:.0f} ms\n')
+
+    results = [run(query, args.repeat) for query in QUERIES]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Show the query plans and timings of the listing and moderation queries
+before and after the listing indexes migration.
+
+The script migrates the database to just before
+``resources.0009_listing_indexes``, fills it with synthetic data if it is
+empty, explains and times each query, then applies the migration and
+does the same again.
+
+Usage::
+
+    python benchmarks/listing_query_plans.py --resources 200000
+
+The database comes from ``DATABASE_URL`` and defaults to a throwaway SQLite
+file in the temporary directory. Never point it at a production database.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'developer_toolkit.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(
+    tempfile.gettempdir(), 'listing_query_plans.sqlite3'))
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Max, Q, Value  # noqa: E402
+from django.db.models.functions import Lower  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from resources.models import Category, Resource  # noqa: E402
+from resources.utils import listing_queryset, sort_resources  # noqa: E402
+
+BEFORE = '0008_resource_duplicate_keys'
+AFTER = '0009_listing_indexes'
+
+
+def populate(resources, categories, users, batch_size=5000):
+    # Spread resources over categories, a tenth of them unapproved
+    user_objs = User.objects.bulk_create([
+        User(username=f'bench-user-{i}') for i in range(users)
+    ])
+    category_objs = Category.objects.bulk_create([
+        Category(name=f'Category {i}', author=user_objs[0], published=True)
+        for i in range(categories)
+    ])
+    for start in range(0, resources, batch_size):
+        Resource.objects.bulk_create([
+            Resource(
+                name=f'Resource {i}',
+                description=f'Synthetic resource number {i}',
+                url=f'https://example.com/{i}',
+                category=category_objs[i % categories],
+                uploader=user_objs[i % users],
+                approved=i % 10 != 0,
+                favorites_count=i % 97,
+            )
+            for i in range(start, min(start + batch_size, resources))
+        ])
+
+
+def queries():
+    """
+    Return ``(label, queryset)`` pairs built the way the views build them.
+    """
+    category = Category.objects.order_by('pk').first()
+    uploader = Resource.objects.filter(
+        category=category).values_list('uploader', flat=True).first()
+    factory = RequestFactory()
+    approved = category.resources.filter(approved=True)
+    pairs = []
+    for sort_by in ('alphabetical', 'newest', 'oldest', 'most_favorited'):
+        request = factory.get('/', {'sort_by': sort_by})
+        pairs.append((
+            f'category listing, {sort_by}',
+            sort_resources(request, listing_queryset(approved))[:21],
+        ))
+    pairs += [
+        ('category resource count', approved.order_by()),
+        ('pending resources of an uploader', listing_queryset(
+            category.resources.filter(approved=False, uploader=uploader))),
+        ('homepage categories', Category.objects.filter(
+            published=True).annotate(
+                resource_count=Count(
+                    'resources', filter=Q(resources__approved=True)),
+                newest_resource=Max(
+                    'resources__created_at',
+                    filter=Q(resources__approved=True)),
+        ).order_by('name')),
+        ('category name lookup', Category.objects.alias(
+            name_lower=Lower('name')
+        ).filter(name_lower=Lower(Value('CATEGORY 7')))),
+    ]
+    return pairs
+
+
+def run(label, queryset, repeat):
+    if label == 'category resource count':
+        execute = queryset.count
+        plan = queryset.values('pk').explain()
+    else:
+        def execute():
+            return list(queryset.all())
+        plan = queryset.explain()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        execute()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f'--- {label}: median {statistics.median(timings):.2f} ms')
+    print(plan)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--resources', type=int, default=200000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    call_command('migrate', 'resources', BEFORE, verbosity=0)
+    if not Resource.objects.exists():
+        print(f'Creating {args.resources} resources...')
+        populate(args.resources, args.categories, args.users)
+    if connection.vendor == 'sqlite':
+        connection.cursor().execute('ANALYZE')
+    print(f'Database: {connection.vendor}, '
+          f'{Resource.objects.count()} resources\n')
+
+    for phase, migration in (('BEFORE', BEFORE), ('AFTER', AFTER)):
+        call_command('migrate', 'resources', migration, verbosity=0)
+        if connection.vendor == 'postgresql':
+            connection.cursor().execute('ANALYZE')
+        elif connection.vendor == 'sqlite':
+            connection.cursor().execute('ANALYZE')
+        print(f'===== {phase} {migration} =====\n')
+        for label, queryset in queries():
+            run(label, queryset, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
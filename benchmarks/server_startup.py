@@ -0,0 +1,163 @@
+"""
+Compare how fast the web server gets to serving warm responses with the
+gunicorn defaults and with the shipped ``gunicorn.conf.py``.
+
+For each configuration, the script starts gunicorn, measures the time
+until the first response, then requests every page once per worker, as
+the first visitors after a deploy do, and again once the workers are
+warm, printing the median and slowest latencies of both rounds.
+
+Usage::
+
+    python benchmarks/server_startup.py --workers 4 --runs 3
+
+The database comes from ``DATABASE_URL`` and defaults to a throwaway SQLite
+file in the temporary directory, which also holds the cache shared by the
+workers unless ``CACHE_URL`` is set. Never point it at a production
+database.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'developer_toolkit.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(
+    tempfile.gettempdir(), 'server_startup.sqlite3'))
+# The workers share a cache table of the database, as gunicorn.conf.py
+# refuses to start several of them with a local memory cache each
+os.environ.setdefault('CACHE_URL', 'db://benchmark_cache')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+
+from resources.models import Category, Resource  # noqa: E402
+
+CONFIGS = {
+    # An empty configuration file in place of gunicorn.conf.py, which
+    # gunicorn reads by default
+    'gunicorn defaults': [
+        '--config', os.devnull, 'developer_toolkit.wsgi:application',
+    ],
+    'gunicorn.conf.py': ['--config', 'gunicorn.conf.py'],
+}
+
+
+def populate():
+    user = User.objects.create(username='bench-user')
+    category = Category.objects.create(
+        name='Category', author=user, published=True)
+    Resource.objects.bulk_create([
+        Resource(
+            name=f'Resource {i}',
+            description=f'Synthetic resource number {i}',
+            url=f'https://example.com/{i}',
+            category=category,
+            uploader=user,
+            approved=True,
+        )
+        for i in range(100)
+    ])
+    return category
+
+
+def wait_until_serving(server, url):
+    while server.poll() is None:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+        except urllib.error.HTTPError:
+            # Any response means a worker is serving
+            pass
+        except OSError:
+            time.sleep(0.05)
+            continue
+        return
+    raise RuntimeError('gunicorn exited')
+
+
+def fetch(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(args, paths, options):
+    """
+    Return the seconds to the first response and the latencies of the
+    cold and warm rounds of requests.
+    """
+    base_url = f'http://127.0.0.1:{options.port}'
+    env = {
+        **os.environ,
+        'PORT': str(options.port),
+        'WEB_CONCURRENCY': str(options.workers),
+    }
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *args,
+         '--bind', f'127.0.0.1:{options.port}',
+         '--workers', str(options.workers), '--log-level', 'warning'],
+        cwd=BASE_DIR, env=env)
+    try:
+        # A page no test request asks for, so as not to warm it up
+        wait_until_serving(server, base_url + '/startup-probe/')
+        ready = time.perf_counter() - start
+        urls = [base_url + path for path in paths] * options.workers
+        rounds = []
+        for _ in range(2):
+            with ThreadPoolExecutor(len(urls)) as pool:
+                rounds.append(list(pool.map(fetch, urls)))
+    finally:
+        server.terminate()
+        server.wait()
+    return ready, rounds[0], rounds[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8766)
+    options = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    call_command('createcachetable', verbosity=0)
+    category = Category.objects.order_by('pk').first() or populate()
+    paths = [
+        '/',
+        f'/category/{category.pk}/',
+        '/search/?q=synthetic&in=description',
+        '/accounts/login/',
+        '/contact/',
+    ]
+    for label, args in CONFIGS.items():
+        ready, cold, warm = [], [], []
+        for _ in range(options.runs):
+            run_ready, run_cold, run_warm = run(args, paths, options)
+            ready.append(run_ready)
+            cold += run_cold
+            warm += run_warm
+        print(f'{label}: first response after '
+              f'{statistics.median(ready):.2f} s, '
+              f'first requests median {statistics.median(cold):.1f} ms '
+              f'max {max(cold):.1f} ms, '
+              f'warm median {statistics.median(warm):.1f} ms '
+              f'max {max(warm):.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
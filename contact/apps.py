@@ -3,7 +3,12 @@ from django.apps import AppConfig
 
 class ContactConfig(AppConfig):
     """
-    Provides primary key type for the contact application.
+    Provides primary key type for the contact application
+    and connects its signal handlers.
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contact'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,125 @@
+"""
+Archival of old contact requests to compressed JSON Lines files.
+
+Read requests older than the retention period are appended, a batch at a
+time, to a gzip file per day of creation, under
+``<directory>/<year>/<month>/requests-<date>.jsonl.gz``, then deleted from
+the table in a short transaction. Each batch is written and synced before
+it is deleted, so a crash can at worst archive a batch twice, and
+restoring skips requests that already exist.
+"""
+import datetime
+import gzip
+import json
+import os
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from developer_toolkit.serialization import json_default
+from .cache import invalidate_unread_count
+from .models import Request
+
+FIELDS = ['id', 'name', 'email', 'message', 'created_at', 'read']
+
+
+def archive_path(directory, day):
+    """
+    Return the path of the archive of the requests created on a day.
+
+    :param directory: The root directory of the archives.
+    :param day: A date.
+    """
+    return os.path.join(
+        directory, f'{day:%Y}', f'{day:%m}', f'requests-{day}.jsonl.gz')
+
+
+def retention_cutoff(days=None):
+    """
+    Return the creation date before which read requests are archived.
+
+    :param days: The retention period in days, the
+    ``CONTACT_RETENTION_DAYS`` setting by default.
+    """
+    if days is None:
+        days = settings.CONTACT_RETENTION_DAYS
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def archive_requests(before, directory=None, batch_size=None):
+    """
+    Move read requests created before a date to the archives.
+
+    :param before: The creation date before which requests are archived.
+    :param directory: The root directory of the archives, the
+    ``CONTACT_ARCHIVE_DIR`` setting by default.
+    :param batch_size: The number of requests archived per transaction,
+    the ``CONTACT_ARCHIVE_BATCH_SIZE`` setting by default.
+    :returns: The number of archived requests.
+    """
+    directory = directory or settings.CONTACT_ARCHIVE_DIR
+    batch_size = batch_size or settings.CONTACT_ARCHIVE_BATCH_SIZE
+    archived = 0
+    while True:
+        # Served by the index on read requests by creation date
+        rows = list(Request.objects.filter(
+            read=True, created_at__lt=before,
+        ).order_by('-created_at', '-id').values(*FIELDS)[:batch_size])
+        if not rows:
+            return archived
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row['created_at'].date(), []).append(row)
+        for day, day_rows in by_day.items():
+            path = archive_path(directory, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Every batch is a gzip member of its own, which readers
+            # decompress as a single stream
+            with open(path, 'ab') as f:
+                with gzip.GzipFile(fileobj=f, mode='wb') as archive:
+                    for row in day_rows:
+                        archive.write(json.dumps(
+                            row, default=json_default).encode() + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+        ids = [row['id'] for row in rows]
+        with transaction.atomic(), connection.cursor() as cursor:
+            # A single DELETE, without loading the requests to send a
+            # signal each, which only matter to unread ones
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(
+                f'DELETE FROM {Request._meta.db_table} '
+                f'WHERE id IN ({placeholders})', ids)
+        archived += len(ids)
+
+
+def restore_requests(paths, batch_size=None):
+    """
+    Restore archived requests into the table, keeping their IDs.
+
+    :param paths: The paths of the archive files to restore.
+    :param batch_size: The number of requests inserted per query, the
+    ``CONTACT_ARCHIVE_BATCH_SIZE`` setting by default.
+    :returns: The number of requests read from the archives.
+    """
+    batch_size = batch_size or settings.CONTACT_ARCHIVE_BATCH_SIZE
+    restored = 0
+    batch = []
+    for path in paths:
+        with gzip.open(path, 'rt') as archive:
+            for line in archive:
+                row = json.loads(line)
+                row['created_at'] = parse_datetime(row['created_at'])
+                batch.append(Request(**row))
+                if len(batch) == batch_size:
+                    restored += _insert(batch)
+                    batch = []
+    restored += _insert(batch)
+    invalidate_unread_count()
+    return restored
+
+
+def _insert(requests):
+    # Requests archived twice or already restored are skipped
+    Request.objects.bulk_create(requests, ignore_conflicts=True)
+    return len(requests)
@@ -0,0 +1,28 @@
+"""
+Cached counters of the contact request inbox.
+
+The number of unread requests is counted from the unread index once and
+cached until a request is added, marked read or unread, or deleted.
+"""
+from django.core.cache import cache
+from .models import Request
+
+UNREAD_COUNT_KEY = 'contact-unread-count'
+
+
+def unread_count():
+    """
+    Return the number of unread contact requests.
+    """
+    return cache.get_or_set(
+        UNREAD_COUNT_KEY,
+        lambda: Request.objects.filter(read=False).count(),
+        None,
+    )
+
+
+def invalidate_unread_count():
+    """
+    Remove the cached number of unread contact requests.
+    """
+    cache.delete(UNREAD_COUNT_KEY)
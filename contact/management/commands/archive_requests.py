@@ -0,0 +1,48 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from contact.archive import archive_requests, retention_cutoff
+
+
+class Command(BaseCommand):
+    """
+    Move read contact requests older than the retention period to
+    compressed JSON Lines archives.
+
+    Meant to run as a scheduled job, for example daily. Requests are
+    archived and deleted in small batches, so the table is never locked
+    for long. The archives are the only copy of the deleted requests, so
+    their directory must be set explicitly, outside of the project.
+    """
+    help = 'Archive read contact requests older than the retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CONTACT_RETENTION_DAYS,
+            help='Age in days of the read requests to archive.')
+        parser.add_argument(
+            '--directory', default=settings.CONTACT_ARCHIVE_DIR,
+            help='Root directory of the archives, on persistent storage.')
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.CONTACT_ARCHIVE_BATCH_SIZE,
+            help='Number of requests to archive per transaction.')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not directory:
+            raise CommandError('CONTACT_ARCHIVE_DIR is not set.')
+        # The project directory is replaced on every deploy
+        project = os.path.realpath(settings.BASE_DIR)
+        if os.path.commonpath(
+                [project, os.path.realpath(directory)]) == project:
+            raise CommandError(
+                f'Directory "{directory}" is inside the project, set '
+                f'CONTACT_ARCHIVE_DIR to persistent storage.')
+        archived = archive_requests(
+            retention_cutoff(options['days']),
+            directory=directory,
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} requests.'))
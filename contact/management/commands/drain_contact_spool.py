@@ -0,0 +1,71 @@
+import signal
+import sqlite3
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+from contact.spool import drain, spool_enabled
+
+# Longest wait in seconds between attempts while the database fails
+MAX_BACKOFF = 60
+
+
+class Command(BaseCommand):
+    """
+    Move spooled contact submissions into the main database.
+
+    Runs as a single worker process next to the web processes, started by
+    gunicorn, see :mod:`contact.spool`. A batch is moved as soon as it is
+    full, and smaller batches every interval. While the database fails,
+    batches stay spooled and are retried after waits doubling from the
+    interval up to a minute. On SIGTERM the spool is emptied before
+    exiting, unless the database is failing.
+    """
+    help = 'Move spooled contact submissions into the main database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.CONTACT_SPOOL_BATCH_SIZE,
+            help='Maximum number of submissions to insert per query.')
+        parser.add_argument(
+            '--interval', type=int,
+            default=settings.CONTACT_SPOOL_INTERVAL,
+            help='Milliseconds to wait for a batch to fill up.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Empty the spool and exit instead of waiting for more.')
+
+    def handle(self, *args, **options):
+        if not spool_enabled():
+            raise CommandError('CONTACT_SPOOL_PATH is not set.')
+        batch_size = options['batch_size']
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+        drained = 0
+        failures = 0
+        while True:
+            try:
+                moved = drain(batch_size)
+            except (DatabaseError, sqlite3.Error) as e:
+                if options['once'] or stopping.is_set():
+                    raise CommandError(
+                        f'Could not move a batch: {e}') from e
+                failures += 1
+                backoff = min(
+                    options['interval'] / 1000 * 2 ** failures, MAX_BACKOFF)
+                self.stderr.write(
+                    f'Could not move a batch: {e}, retrying in '
+                    f'{backoff:.1f} s.')
+                # A broken connection is replaced by the next attempt
+                close_old_connections()
+                stopping.wait(backoff)
+                continue
+            failures = 0
+            drained += moved
+            if moved < batch_size:
+                if options['once'] or stopping.is_set():
+                    break
+                stopping.wait(options['interval'] / 1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {drained} submissions.'))
@@ -0,0 +1,31 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from contact.archive import restore_requests
+
+
+class Command(BaseCommand):
+    """
+    Restore contact requests from archives written by archive_requests.
+
+    Requests keep their IDs and creation dates, and those already in the
+    table are skipped, so restoring a file twice is harmless.
+    """
+    help = 'Restore contact requests from archive files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+', help='Paths of the archive files.')
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.CONTACT_ARCHIVE_BATCH_SIZE,
+            help='Number of requests to insert per query.')
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            if not os.path.isfile(path):
+                raise CommandError(f'File "{path}" does not exist.')
+        restored = restore_requests(
+            options['paths'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Restored {restored} requests.'))
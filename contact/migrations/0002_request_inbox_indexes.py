@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-18 10:57
+
+from django.db import migrations, models
+import developer_toolkit.db.operations
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL builds the indexes concurrently, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('contact', '0001_initial'),
+    ]
+
+    operations = [
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='request',
+            index=models.Index(fields=['-created_at', '-id'], name='request_created_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='request',
+            index=models.Index(condition=models.Q(('read', False)), fields=['-created_at', '-id'], name='request_unread_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='request',
+            index=models.Index(condition=models.Q(('read', True)), fields=['-created_at', '-id'], name='request_read_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.26 on 2026-10-18 10:59
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0002_request_inbox_indexes'),
+    ]
+
+    operations = [
+        # The default is applied by Django, the column itself doesn't
+        # change, so don't rebuild the table on SQLite
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='request',
+                    name='created_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
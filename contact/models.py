@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 # Create your models here.
@@ -17,7 +18,9 @@ class Request(models.Model):
     name = models.CharField(max_length=200)
     email = models.EmailField()
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so restored archives keep their
+    # creation dates
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     read = models.BooleanField(default=False)
 
     def __str__(self):
@@ -27,3 +30,17 @@ class Request(models.Model):
     class Meta:
         # Set default ordering to show newest requests first
         ordering = ['-created_at']
+        # The inbox lists requests newest first, all of them or only the
+        # unread or read ones, ending with the ID as the admin does. The
+        # read state is a partial index condition rather than a column so
+        # SQLite can use the indexes for NOT "read" too.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='request_created_idx'),
+            models.Index(fields=['-created_at', '-id'],
+                         condition=models.Q(read=False),
+                         name='request_unread_idx'),
+            models.Index(fields=['-created_at', '-id'],
+                         condition=models.Q(read=True),
+                         name='request_read_idx'),
+        ]
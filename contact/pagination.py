@@ -0,0 +1,35 @@
+import json
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Return the planner's estimate of the number of rows of a queryset, or
+    ``None`` if the database can't estimate it.
+
+    :param queryset: A queryset of any model.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.explain(format='json'))
+    return plan[0]['Plan']['Plan Rows']
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator using the planner's estimate of the number of objects
+    when there are many, so listing a page never counts the whole table.
+
+    Counts under ``exact_count_limit`` are cheap enough to be exact, and
+    databases without estimates, like SQLite, always count exactly.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        return estimate
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import invalidate_unread_count
+from .models import Request
+
+
+@receiver(post_save, sender=Request)
+@receiver(post_delete, sender=Request)
+def request_changed(sender, instance, **kwargs):
+    """
+    Drop the cached unread count when a request is added, changed or
+    deleted.
+    """
+    invalidate_unread_count()
@@ -0,0 +1,156 @@
+"""
+Write-behind spool of contact form submissions.
+
+When the ``CONTACT_SPOOL_PATH`` setting is set, valid submissions are
+appended to a local SQLite database in WAL mode instead of being inserted
+into the main database during the request. The ``drain_contact_spool``
+worker moves them into :model:`contact.Request` in batches with
+``bulk_create``.
+
+The spool is a local file, so it only works on a single host with a
+persistent disk, where gunicorn starts one worker draining it next to the
+web processes, see ``gunicorn.conf.py``. On hosts with an ephemeral
+filesystem, such as Heroku dynos, submissions still spooled when the host
+is replaced are lost, so the spool must stay disabled there. A submission
+is removed from the spool only after its batch is committed to the main
+database, so a worker restart never loses one. A crash between the two
+can deliver a batch twice.
+
+Each process opens the spool once and shares the connection between its
+threads.
+"""
+import json
+import os
+import sqlite3
+import threading
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .cache import invalidate_unread_count
+from .models import Request
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS spool ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)'
+)
+
+
+def spool_enabled():
+    """
+    Return whether contact submissions go through the spool.
+    """
+    return bool(getattr(settings, 'CONTACT_SPOOL_PATH', None))
+
+
+def connect(path=None):
+    """
+    Open the spool database, creating it if needed.
+
+    :param path: The path of the spool, the ``CONTACT_SPOOL_PATH`` setting
+    by default.
+    """
+    path = path or settings.CONTACT_SPOOL_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Shared by the threads of the process, which take turns
+    conn = sqlite3.connect(
+        path, timeout=30, isolation_level=None, check_same_thread=False)
+    # WAL lets the web processes append while the worker reads, and a
+    # full sync makes every appended submission durable
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=FULL')
+    conn.execute(SCHEMA)
+    return conn
+
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def get_connection(path=None):
+    """
+    Return the connection of this process to the spool database, opening
+    it on first use.
+
+    Callers hold the lock of the connections while using it.
+
+    :param path: The path of the spool, the ``CONTACT_SPOOL_PATH`` setting
+    by default.
+    """
+    path = path or settings.CONTACT_SPOOL_PATH
+    pid, conn = _connections.get(path, (None, None))
+    # A connection opened before a fork belongs to the parent
+    if conn is None or pid != os.getpid():
+        conn = connect(path)
+        _connections[path] = (os.getpid(), conn)
+    return conn
+
+
+def close_connections():
+    """
+    Close the connections of this process to spool databases.
+    """
+    with _connections_lock:
+        for pid, conn in _connections.values():
+            if pid == os.getpid():
+                conn.close()
+        _connections.clear()
+
+
+def enqueue(data, path=None):
+    """
+    Append a contact submission to the spool.
+
+    :param data: The cleaned data of a valid ``ContactForm``.
+    :param path: The path of the spool, the ``CONTACT_SPOOL_PATH`` setting
+    by default.
+    """
+    payload = json.dumps({
+        'name': data['name'],
+        'email': data['email'],
+        'message': data['message'],
+        'created_at': timezone.now().isoformat(),
+    })
+    with _connections_lock:
+        get_connection(path).execute(
+            'INSERT INTO spool (payload) VALUES (?)', [payload])
+
+
+def drain(batch_size=None, path=None):
+    """
+    Move a batch of spooled submissions into the main database.
+
+    :param batch_size: The maximum number of submissions to move, the
+    ``CONTACT_SPOOL_BATCH_SIZE`` setting by default.
+    :param path: The path of the spool, the ``CONTACT_SPOOL_PATH`` setting
+    by default.
+    :returns: The number of submissions moved.
+    """
+    batch_size = batch_size or settings.CONTACT_SPOOL_BATCH_SIZE
+    with _connections_lock:
+        conn = get_connection(path)
+        rows = conn.execute(
+            'SELECT id, payload FROM spool ORDER BY id LIMIT ?',
+            [batch_size]).fetchall()
+        if not rows:
+            return 0
+        requests = []
+        for _, payload in rows:
+            data = json.loads(payload)
+            data['created_at'] = parse_datetime(data['created_at'])
+            requests.append(Request(**data))
+        Request.objects.bulk_create(requests)
+        invalidate_unread_count()
+        conn.execute('DELETE FROM spool WHERE id <= ?', [rows[-1][0]])
+    return len(rows)
+
+
+def backlog(path=None):
+    """
+    Return the number of submissions waiting in the spool.
+
+    :param path: The path of the spool, the ``CONTACT_SPOOL_PATH`` setting
+    by default.
+    """
+    with _connections_lock:
+        return get_connection(path).execute(
+            'SELECT count(*) FROM spool').fetchone()[0]
@@ -0,0 +1,82 @@
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .cache import unread_count
+from .models import Request
+from .pagination import EstimatedCountPaginator
+
+
+class RequestAdminTests(TestCase):
+    """The contact request inbox scales to many requests."""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(username='admin', password='pass')
+        self.client.login(username='admin', password='pass')
+        for i in range(4):
+            Request.objects.create(
+                name=f'N{i}', email=f'n{i}@example.com', message='m',
+                read=i < 1)
+        self.url = reverse('admin:contact_request_changelist')
+
+    def test_unread_count_in_title(self):
+        """The change list shows the cached number of unread requests."""
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Contact requests (3 unread)')
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(), 3)
+        Request.objects.create(name='N', email='n@example.com', message='m')
+        self.assertEqual(unread_count(), 4)
+
+    def test_mark_read_and_unread_in_one_update(self):
+        """Bulk actions use a single UPDATE and refresh the counter."""
+        self.assertEqual(unread_count(), 3)
+        selected = list(Request.objects.values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, {
+                'action': 'mark_read', '_selected_action': selected,
+            })
+        updates = [q for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(unread_count(), 0)
+        self.client.post(self.url, {
+            'action': 'mark_unread', '_selected_action': selected[:2],
+        })
+        self.assertEqual(unread_count(), 2)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite query plan')
+    def test_unread_listing_uses_index(self):
+        """Unread requests are listed newest first from an index."""
+        plan = Request.objects.filter(read=False).order_by(
+            '-created_at', '-id').explain()
+        self.assertIn('request_unread_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Large counts are estimated, small ones counted exactly."""
+
+    def setUp(self):
+        for i in range(3):
+            Request.objects.create(
+                name=f'N{i}', email=f'n{i}@example.com', message='m')
+
+    def count(self, estimate):
+        with mock.patch(
+            'contact.pagination.estimate_count', return_value=estimate
+        ):
+            return EstimatedCountPaginator(Request.objects.all(), 2).count
+
+    def test_large_counts_are_estimated(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(50000), 50000)
+
+    def test_small_counts_are_exact(self):
+        self.assertEqual(self.count(10), 3)
+        self.assertEqual(self.count(None), 3)
@@ -0,0 +1,80 @@
+import datetime
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .archive import archive_path
+from .models import Request
+
+
+class ArchiveTests(TestCase):
+    """Old read requests are moved to archives and can be restored."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.now = timezone.now()
+        self.old = []
+        for days in [100, 100, 200]:
+            self.old.append(self.create(days, read=True))
+        self.unread = self.create(200, read=False)
+        self.recent = self.create(10, read=True)
+
+    def create(self, days, read):
+        return Request.objects.create(
+            name='N', email='n@example.com', message='m', read=read,
+            created_at=self.now - datetime.timedelta(days=days))
+
+    def archive(self, **options):
+        with override_settings(CONTACT_ARCHIVE_DIR=self.directory.name):
+            call_command(
+                'archive_requests', days=90, stdout=StringIO(), **options)
+
+    def test_archives_old_read_requests(self):
+        """Read requests past the retention period are archived by day."""
+        self.archive(batch_size=2)
+        self.assertEqual(
+            set(Request.objects.values_list('pk', flat=True)),
+            {self.unread.pk, self.recent.pk})
+        path = archive_path(
+            self.directory.name, self.old[0].created_at.date())
+        self.assertTrue(path.endswith(
+            f'{self.old[0].created_at:%Y/%m}/'
+            f'requests-{self.old[0].created_at.date()}.jsonl.gz'))
+        # Written by two batches, read as one stream
+        with gzip.open(path, 'rt') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(
+            sorted(row['id'] for row in rows),
+            [self.old[0].pk, self.old[1].pk])
+
+    def test_restore(self):
+        """Restored requests keep their IDs and dates, once."""
+        self.archive()
+        paths = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(self.directory.name)
+            for name in names
+        ]
+        self.assertEqual(len(paths), 2)
+        for _ in range(2):
+            call_command('restore_requests', *paths, stdout=StringIO())
+        self.assertEqual(Request.objects.count(), 5)
+        restored = Request.objects.get(pk=self.old[2].pk)
+        self.assertEqual(restored.created_at, self.old[2].created_at)
+        self.assertTrue(restored.read)
+
+    def test_refuses_without_persistent_directory(self):
+        """Nothing is deleted unless it is archived outside the project."""
+        for directory in [None, os.path.join(settings.BASE_DIR, 'archive')]:
+            with override_settings(CONTACT_ARCHIVE_DIR=directory):
+                with self.assertRaises(CommandError):
+                    call_command('archive_requests', stdout=StringIO())
+        self.assertEqual(Request.objects.count(), 5)
@@ -0,0 +1,109 @@
+import os
+import signal
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import spool
+from .models import Request
+from developer_toolkit.metrics import exposition
+from .spool import backlog, close_connections, drain
+
+
+class SpoolTests(TestCase):
+    """Submissions are spooled locally and drained in batches."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            CONTACT_SPOOL_PATH=os.path.join(directory.name, 'spool.db'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(close_connections)
+
+    def submit(self, i):
+        return self.client.post(reverse('contact'), {
+            'name': f'N{i}', 'email': f'n{i}@example.com', 'message': 'm',
+        })
+
+    def test_submission_skips_database(self):
+        """Submissions are confirmed without touching the database."""
+        with self.assertNumQueries(0):
+            response = self.submit(0)
+        self.assertContains(response, 'Thank you for contacting us')
+        self.assertFalse(Request.objects.exists())
+
+    def test_drain(self):
+        """The worker moves spooled submissions in batches."""
+        for i in range(5):
+            self.submit(i)
+        with self.assertNumQueries(1):
+            self.assertEqual(drain(batch_size=3), 3)
+        call_command(
+            'drain_contact_spool', once=True, batch_size=3,
+            stdout=StringIO())
+        self.assertEqual(
+            sorted(Request.objects.values_list('name', flat=True)),
+            ['N0', 'N1', 'N2', 'N3', 'N4'])
+        self.assertEqual(drain(), 0)
+
+    def test_connection_opened_once(self):
+        """Each process opens the spool once."""
+        with mock.patch(
+            'contact.spool.connect', wraps=spool.connect
+        ) as connect:
+            for i in range(3):
+                self.submit(i)
+            drain()
+        self.assertEqual(connect.call_count, 1)
+
+    def test_failed_batch_stays_spooled(self):
+        """Submissions are kept until their batch is committed."""
+        self.submit(0)
+        with mock.patch.object(
+            Request.objects, 'bulk_create', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            drain()
+        self.assertEqual(drain(), 1)
+        self.assertEqual(Request.objects.get().name, 'N0')
+
+    def test_drainer_retries_after_database_errors(self):
+        """The worker outlives a database outage, reconnecting after it."""
+        self.addCleanup(
+            signal.signal, signal.SIGTERM, signal.getsignal(signal.SIGTERM))
+        self.submit(0)
+        attempts = []
+
+        def flaky_drain(batch_size):
+            attempts.append(batch_size)
+            if len(attempts) == 1:
+                raise OperationalError('server closed the connection')
+            os.kill(os.getpid(), signal.SIGTERM)
+            return drain(batch_size)
+
+        command = 'contact.management.commands.drain_contact_spool'
+        stderr = StringIO()
+        with mock.patch(f'{command}.drain', side_effect=flaky_drain), \
+                mock.patch(f'{command}.close_old_connections') as close:
+            call_command(
+                'drain_contact_spool', interval=0, stdout=StringIO(),
+                stderr=stderr)
+        self.assertEqual(len(attempts), 2)
+        close.assert_called_once()
+        self.assertIn('server closed the connection', stderr.getvalue())
+        self.assertEqual(Request.objects.get().name, 'N0')
+
+    def test_backlog_metric(self):
+        """The number of spooled submissions is exposed in the metrics."""
+        for i in range(2):
+            self.submit(i)
+        self.assertEqual(backlog(), 2)
+        self.assertIn('contact_spool_backlog 2\n', exposition())
+        drain()
+        self.assertIn('contact_spool_backlog 0\n', exposition())
@@ -1,9 +1,14 @@
 from django.shortcuts import render
 from django.contrib import messages
+from developer_toolkit.query_checks import query_budget
+from developer_toolkit.throttling import throttle
 from .forms import ContactForm
+from .spool import enqueue, spool_enabled
 
 
 # Create your views here.
+@query_budget(3)
+@throttle('contact')
 def contact(request):
     """
     Handle contact form submissions.
@@ -12,6 +17,10 @@ def contact(request):
     it validates the form data and saves it if valid.
     It also provides user feedback through messages.
 
+    When the spool is enabled, valid submissions are appended to it and
+    saved later by a worker, without waiting on the database, see
+    :mod:`contact.spool`.
+
     :param request: The HTTP request object.
 
     **Context:**
@@ -26,7 +35,10 @@ def contact(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
-            form.save()
+            if spool_enabled():
+                enqueue(form.cleaned_data)
+            else:
+                form.save()
             messages.success(
                 request,
                 'Thank you for contacting us. We will get back to you shortly.'
@@ -2,6 +2,11 @@
 ASGI config for developer_toolkit project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+With the ``ASYNC_VIEWS`` environment variable set to ``1``, the listing pages
+are served by the async views of :mod:`resources.async_views`. Run it with::
+
+    ASYNC_VIEWS=1 gunicorn developer_toolkit.asgi:application \
+        -k uvicorn.workers.UvicornWorker
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
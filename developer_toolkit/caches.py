@@ -0,0 +1,58 @@
+"""
+Checks that the cache is shared by the processes serving the site.
+
+The cache holds state that every worker must agree on: the versions
+invalidating the cached pages and validating conditional requests, and
+the buckets of throttling. A local memory cache is per process, so
+behind several gunicorn workers a change bumps a version in one worker
+only, and the others keep serving stale pages and 304 responses. Each
+worker would also throttle clients on its own, letting them through as
+many times their budget as there are workers, and forget the budgets on
+every restart. :func:`check_shared_cache` is run by ``gunicorn.conf.py``
+before the workers start, refuses several workers and warns about a
+single throttled one.
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+# Backends keeping their entries in the memory of each process, or not
+# at all
+LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_is_shared(alias='default'):
+    """
+    Return whether a cache is shared by every process of the site.
+
+    :param alias: The alias of the cache in ``CACHES``.
+    """
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_BACKENDS
+
+
+def check_shared_cache(workers):
+    """
+    Raise :class:`ImproperlyConfigured` if several workers would each use
+    a cache of their own, and log a warning if throttling would keep its
+    budgets in the cache of a single worker.
+
+    :param workers: The number of worker processes serving the site.
+    """
+    if cache_is_shared():
+        return
+    if workers > 1:
+        raise ImproperlyConfigured(
+            f'{workers} workers can\'t share the local memory cache, set '
+            f'CACHE_URL to a Redis, Memcached or database cache, or '
+            f'WEB_CONCURRENCY to 1')
+    if getattr(settings, 'THROTTLE_RATES', {}):
+        logger.warning(
+            'Throttling budgets are kept in the local memory cache and reset '
+            'on every restart, set CACHE_URL to a Redis, Memcached or '
+            'database cache, or THROTTLE_RATES to off')
@@ -0,0 +1,68 @@
+"""
+PostgreSQL backend taking its connections from the pool of the process.
+
+Closing a connection returns it to the pool instead, clean and outside
+any transaction, and connections left broken or in an unknown state are
+discarded. The ``POOL`` dictionary of the database settings sizes the
+pool:
+
+- ``MAX_SIZE``: the maximum number of open connections per process.
+- ``TIMEOUT``: the number of seconds to wait for a connection when they
+  are all in use, after which the query fails with ``OperationalError``.
+
+With ``CONN_HEALTH_CHECKS``, idle connections are checked before being
+reused.
+"""
+from django.db.backends.postgresql import base
+from developer_toolkit.db.pool import PoolTimeout, get_pool
+
+Database = base.Database
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self):
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(
+            self.alias, options.get('MAX_SIZE', 10),
+            options.get('TIMEOUT', 10))
+
+    def get_new_connection(self, conn_params):
+        check = None
+        if self.settings_dict['CONN_HEALTH_CHECKS']:
+            check = _is_usable
+        try:
+            return self.get_pool().getconn(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params),
+                check=check,
+            )
+        except PoolTimeout as e:
+            raise Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        discard = connection.closed or self.in_atomic_block
+        if not discard and (
+            connection.info.transaction_status
+            != Database.extensions.TRANSACTION_STATUS_IDLE
+        ):
+            # Don't hand an open or failed transaction to the next thread
+            try:
+                connection.rollback()
+            except Database.Error:
+                discard = True
+        self.get_pool().putconn(connection, discard=discard)
+
+
+def _is_usable(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except Database.Error:
+        return False
+    return True
@@ -0,0 +1,41 @@
+"""
+Migration operations shared by the migrations of the apps.
+"""
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrently(AddIndex):
+    """
+    Add an index, without locking the table against writes on PostgreSQL.
+
+    On PostgreSQL the index is built with ``CREATE INDEX CONCURRENTLY``,
+    which cannot run in a transaction, so migrations using this operation
+    must set ``atomic = False``. Other databases add the index normally.
+    """
+
+    def describe(self):
+        return (f'Concurrently create index {self.index.name} on '
+                f'{self.model_name}')
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, **self._options(
+                schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, **self._options(
+                schema_editor))
+
+    def _options(self, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return {}
+        if schema_editor.atomic_migration:
+            raise ValueError(
+                'AddIndexConcurrently cannot run in a transaction, set '
+                'atomic = False on the migration.')
+        return {'concurrently': True}
@@ -0,0 +1,191 @@
+"""
+In-process pool of database connections shared by the threads of a worker.
+
+Each thread of a threaded worker, and the thread running the ORM queries of
+the async views, has a database connection of its own in Django. The pool
+bounds how many are open at once and hands connections closed by one
+thread on to the next, so requests don't pay for connecting and
+authenticating to the database.
+
+Pools are per process, and a forked worker never reuses the connections
+of its parent.
+"""
+import os
+import threading
+import time
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """
+    No connection was returned to a full pool in time.
+    """
+
+
+class ConnectionPool:
+    """
+    A bounded pool of connections, most recently used first.
+
+    :param max_size: The maximum number of open connections, idle or
+    checked out.
+    :param timeout: The number of seconds to wait for a connection when
+    they are all checked out.
+    """
+
+    def __init__(self, max_size, timeout=10):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = []
+        self._size = 0
+        self._condition = threading.Condition()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.reconnects = 0
+
+    def getconn(self, connect, check=None):
+        """
+        Check out a connection, waiting for one if they are all in use.
+
+        :param connect: A function opening a new connection.
+        :param check: A function returning whether an idle connection is
+        still usable, the broken ones being replaced by new ones.
+        :raises PoolTimeout: If no connection is free in time.
+        """
+        start = time.monotonic()
+        waited = False
+        with self._condition:
+            while not self._idle and self._size >= self.max_size:
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection free after '
+                        f'{self.timeout} seconds')
+                waited = True
+                self._condition.wait(remaining)
+            if waited:
+                wait_time = time.monotonic() - start
+                self.waits += 1
+                self.wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                # Hold the place of the connection opened below
+                conn = None
+                self._size += 1
+            self.checked_out += 1
+            self.checkouts += 1
+        # Checking and connecting happen outside the lock, so as not to
+        # hold up the other threads
+        try:
+            if conn is not None and check is not None and not check(conn):
+                _close_quietly(conn)
+                conn = None
+                with self._condition:
+                    self.reconnects += 1
+            if conn is None:
+                conn = connect()
+        except BaseException:
+            self._release()
+            raise
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Return a checked out connection to the pool.
+
+        :param conn: The connection.
+        :param discard: Whether to close the connection instead, when it
+        is broken or in an unknown state.
+        """
+        if discard:
+            _close_quietly(conn)
+            with self._condition:
+                self.reconnects += 1
+            self._release()
+            return
+        with self._condition:
+            self._idle.append(conn)
+            self.checked_out -= 1
+            self._condition.notify()
+
+    def _release(self):
+        # Free the place of a checked out connection that is gone
+        with self._condition:
+            self._size -= 1
+            self.checked_out -= 1
+            self._condition.notify()
+
+    def close_all(self):
+        """
+        Close the idle connections.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            _close_quietly(conn)
+
+    def stats(self):
+        """
+        Return the size and usage counters of the pool.
+        """
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'checked_out': self.checked_out,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+                'timeouts': self.timeouts,
+                'reconnects': self.reconnects,
+            }
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def get_pool(alias, max_size, timeout=10):
+    """
+    Return the pool of connections to a database of this process.
+
+    :param alias: The alias of the database in ``DATABASES``.
+    :param max_size: The maximum number of open connections of a new pool.
+    :param timeout: The number of seconds to wait for a connection of a
+    new pool.
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        # Connections of the parent of a forked process can't be shared
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = ConnectionPool(max_size, timeout)
+        return pool
+
+
+def pool_stats():
+    """
+    Return the statistics of the connection pools of this process, by
+    database alias.
+    """
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        alias: pool.stats() for alias, pool in pools
+        if pool.pid == os.getpid()
+    }
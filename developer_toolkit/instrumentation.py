@@ -0,0 +1,177 @@
+"""
+Measurement of what each request costs: the number and duration of its
+SQL queries, the time spent rendering templates and the total time.
+
+:func:`performance_middleware` records them in the histograms of
+:mod:`developer_toolkit.metrics` by view, and sends them to staff users
+in a ``Server-Timing`` header, which browser developer tools display.
+The user is only loaded from the session for that on requests with the
+``server_timing=1`` cookie, which staff set in the developer tools, other
+requests get the header when their view loaded a staff user anyway.
+Queries are counted with an execute wrapper and templates timed by the
+template backend of this module, which both cost a couple of clock reads,
+so the middleware stays on in production.
+"""
+import contextvars
+import time
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import connections
+from django.template.backends import django as django_backend
+from django.utils.decorators import sync_and_async_middleware
+from developer_toolkit import metrics
+
+current_request = contextvars.ContextVar('current_request', default=None)
+SERVER_TIMING_COOKIE = 'server_timing'
+
+
+class RequestCosts:
+    """
+    The costs of a request, added up while it is handled.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Execute wrapper of the database connections
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self, total):
+        """
+        Return the value of the ``Server-Timing`` header of the request.
+
+        :param total: The duration of the request, in seconds.
+        """
+        return (
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.queries} queries", '
+            f'template;dur={self.template_time * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+
+class Template(django_backend.Template):
+    """
+    A Django template timing its rendering as part of the current request.
+    """
+
+    def render(self, context=None, request=None):
+        costs = current_request.get()
+        # Templates rendered by other templates are part of their time
+        if costs is None or costs.rendering:
+            return super().render(context, request)
+        costs.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            costs.template_time += time.perf_counter() - start
+            costs.rendering = False
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    The Django template backend, timing the rendering of its templates.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(
+            super().get_template(template_name).template, self)
+
+
+def view_name(request):
+    """
+    Return the name of the view that handled a request, the label of its
+    metrics.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+def _start():
+    costs = RequestCosts()
+    token = current_request.set(costs)
+    for connection in connections.all():
+        connection.execute_wrappers.append(costs)
+    return costs, token
+
+
+def _finish(costs, token):
+    for connection in connections.all():
+        if costs in connection.execute_wrappers:
+            connection.execute_wrappers.remove(costs)
+    current_request.reset(token)
+    return time.perf_counter() - costs.start
+
+
+def _record(request, costs, total):
+    metrics.record(
+        view_name(request), total, costs.db_time, costs.template_time,
+        costs.queries)
+
+
+def _timing_opt_in(request):
+    # Whether the user must be loaded to decide on the Server-Timing header
+    return (request.COOKIES.get(SERVER_TIMING_COOKIE) == '1' and
+            '_cached_user' not in request.__dict__)
+
+
+def _is_staff(request, load=False):
+    # The lazy user of AuthenticationMiddleware caches the loaded user on
+    # the request, which is only read here unless loading is asked for
+    if load:
+        user = getattr(request, 'user', None)
+    else:
+        user = request.__dict__.get('_cached_user')
+    return user is not None and user.is_staff
+
+
+@sync_and_async_middleware
+def performance_middleware(get_response):
+    """
+    Record the costs of every request, and send them to staff users in a
+    ``Server-Timing`` header, without loading the user for it unless the
+    request opts in.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            costs, token = _start()
+            try:
+                response = await get_response(request)
+            finally:
+                total = _finish(costs, token)
+            _record(request, costs, total)
+            if _timing_opt_in(request):
+                # Loading the user from the session is sync only
+                is_staff = await sync_to_async(_is_staff)(request, load=True)
+            else:
+                is_staff = _is_staff(request)
+            if is_staff:
+                response['Server-Timing'] = costs.server_timing(total)
+            return response
+    else:
+        def middleware(request):
+            costs, token = _start()
+            try:
+                response = get_response(request)
+            finally:
+                total = _finish(costs, token)
+            _record(request, costs, total)
+            if _is_staff(request, load=_timing_opt_in(request)):
+                response['Server-Timing'] = costs.server_timing(total)
+            return response
+    return middleware
@@ -0,0 +1,174 @@
+"""
+In-process metrics of the web process, exposed in the Prometheus text
+format on ``/metrics``.
+
+Histograms are per process, so each worker reports the requests it served
+since it started, and the scraper adds them up by instance.
+"""
+import threading
+from bisect import bisect_left
+from contact.spool import backlog, spool_enabled
+from developer_toolkit.db.pool import pool_stats
+from developer_toolkit.throttling import shed_counts
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """
+    A Prometheus histogram with a series per combination of labels.
+
+    :param name: The name of the metric.
+    :param description: The help text of the metric.
+    :param buckets: The upper bounds of the buckets, in increasing order.
+    """
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Record a value in the series of some labels.
+        """
+        key = tuple(sorted(labels.items()))
+        # The first bucket whose upper bound is at least the value, or
+        # the implicit +Inf one
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0,
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def clear(self):
+        """
+        Forget the values recorded so far.
+        """
+        with self._lock:
+            self.series = {}
+
+    def samples(self):
+        """
+        Return the lines of the histogram in the Prometheus text format.
+        """
+        with self._lock:
+            series = {
+                key: (list(counts), total, count)
+                for key, (counts, total, count) in self.series.items()
+            }
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(
+                (*self.buckets, '+Inf'), counts
+            ):
+                cumulative += bucket_count
+                labels = format_labels(key + (('le', bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = format_labels(key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'view_request_duration_seconds',
+    'Time to respond to a request, by view.', DURATION_BUCKETS)
+DB_DURATION = Histogram(
+    'view_db_duration_seconds',
+    'Time spent in SQL queries per request, by view.', DURATION_BUCKETS)
+TEMPLATE_DURATION = Histogram(
+    'view_template_duration_seconds',
+    'Time spent rendering templates per request, by view.',
+    DURATION_BUCKETS)
+QUERIES = Histogram(
+    'view_queries', 'Number of SQL queries per request, by view.',
+    QUERY_BUCKETS)
+HISTOGRAMS = [REQUEST_DURATION, DB_DURATION, TEMPLATE_DURATION, QUERIES]
+
+POOL_METRICS = [
+    ('db_pool_size', 'size', 'gauge', 'Open connections of the pool.'),
+    ('db_pool_idle', 'idle', 'gauge', 'Idle connections of the pool.'),
+    ('db_pool_checked_out', 'checked_out', 'gauge',
+     'Connections of the pool in use.'),
+    ('db_pool_checkouts_total', 'checkouts', 'counter',
+     'Connections checked out of the pool.'),
+    ('db_pool_waits_total', 'waits', 'counter',
+     'Checkouts that waited for a connection.'),
+    ('db_pool_wait_seconds_total', 'wait_time', 'counter',
+     'Time spent waiting for a connection.'),
+    ('db_pool_timeouts_total', 'timeouts', 'counter',
+     'Checkouts that gave up waiting.'),
+    ('db_pool_reconnects_total', 'reconnects', 'counter',
+     'Broken connections replaced.'),
+]
+
+
+def format_labels(labels):
+    """
+    Return labels formatted for the Prometheus text format.
+
+    :param labels: ``(name, value)`` pairs.
+    """
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def record(view, duration, db_duration, template_duration, queries):
+    """
+    Record the costs of a request in the histograms of its view.
+    """
+    REQUEST_DURATION.observe(duration, view=view)
+    DB_DURATION.observe(db_duration, view=view)
+    TEMPLATE_DURATION.observe(template_duration, view=view)
+    QUERIES.observe(queries, view=view)
+
+
+def exposition():
+    """
+    Return all the metrics of the process in the Prometheus text format.
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.samples()
+    lines += [
+        '# HELP throttle_rejected_total Requests rejected by throttling.',
+        '# TYPE throttle_rejected_total counter',
+    ]
+    for scope, count in sorted(shed_counts().items()):
+        labels = format_labels([('scope', scope)])
+        lines.append(f'throttle_rejected_total{labels} {count}')
+    pools = pool_stats()
+    for metric, name, kind, description in POOL_METRICS:
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} {kind}']
+        for alias, stats in sorted(pools.items()):
+            labels = format_labels([('database', alias)])
+            lines.append(f'{metric}{labels} {stats[name]}')
+    if spool_enabled():
+        lines += [
+            '# HELP contact_spool_backlog Contact submissions waiting to be '
+            'moved into the database.',
+            '# TYPE contact_spool_backlog gauge',
+            f'contact_spool_backlog {backlog()}',
+        ]
+    return '\n'.join(lines) + '\n'
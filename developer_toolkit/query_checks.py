@@ -0,0 +1,152 @@
+"""
+Checks of the SQL queries of views, for development and tests.
+
+N+1 queries are a query per item of a list, usually sent by a template
+accessing a relation of each item, like ``{{ resource.uploader.username }}``
+inside ``{% for resource in resources %}`` when the view didn't load the
+uploaders up front. With the ``NPLUSONE`` setting set to ``'log'`` or
+``'raise'``, :func:`nplusone_middleware` watches the queries sent while
+rendering templates, and reports the template line of a loop sending
+``NPLUSONE_THRESHOLD`` times the same query in a request. The test suite
+raises.
+
+Views also declare with :func:`query_budget` how many queries a request
+may take, whatever the amount of data, which
+``resources/test_query_budgets.py`` checks against a populated database.
+"""
+import collections
+import logging
+import sys
+from contextlib import ExitStack, contextmanager
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Node, TokenType
+from django.template.defaulttags import ForNode
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+RENDER_NODE = Node.render_annotated.__code__
+
+
+class NPlusOneError(Exception):
+    """
+    A loop of a template sent the same query for each of its items.
+    """
+
+
+def query_budget(queries):
+    """
+    Decorate a view with the maximum number of queries of its requests.
+
+    :param queries: The number of queries, including loading the session
+    and the user.
+    """
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+def template_node():
+    """
+    Return the template node being rendered by the current thread, and
+    whether it is inside a ``{% for %}`` loop, or ``(None, False)``.
+    """
+    nodes = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is RENDER_NODE:
+            nodes.append(frame.f_locals['self'])
+        frame = frame.f_back
+    if not nodes:
+        return None, False
+    return nodes[0], any(isinstance(node, ForNode) for node in nodes[1:])
+
+
+def describe_node(node):
+    """
+    Return the template, line and source of a template node.
+    """
+    if node.token.token_type == TokenType.VAR:
+        source = '{{ %s }}' % node.token.contents
+    else:
+        source = '{%% %s %%}' % node.token.contents
+    name = node.origin.template_name or node.origin.name
+    return f'{name}, line {node.token.lineno}: {source}'
+
+
+class RepeatedQueryDetector:
+    """
+    Execute wrapper reporting queries repeated by template loops.
+
+    :param action: ``'raise'`` to raise :class:`NPlusOneError`, or
+    ``'log'`` to log a warning.
+    :param threshold: The number of times a query is repeated before it
+    is reported.
+    """
+
+    def __init__(self, action='raise', threshold=3):
+        self.action = action
+        self.threshold = threshold
+        self.counts = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        node, in_loop = template_node()
+        if in_loop:
+            # The same query from the same place, with other parameters
+            key = (sql, node)
+            self.counts[key] += 1
+            if self.counts[key] == self.threshold:
+                self.report(node, sql)
+        return execute(sql, params, many, context)
+
+    def report(self, node, sql):
+        message = (
+            f'{describe_node(node)} sent {self.threshold} similar queries '
+            f'in a loop, load them up front with select_related() or '
+            f'prefetch_related(): {sql}'
+        )
+        if self.action == 'raise':
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+@contextmanager
+def detect_repeated_queries(action='raise', threshold=3):
+    """
+    Report the queries repeated by template loops in a block.
+
+    :param action: ``'raise'`` or ``'log'``.
+    :param threshold: The number of times a query is repeated before it
+    is reported.
+    """
+    detector = RepeatedQueryDetector(action, threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+
+
+@sync_and_async_middleware
+def nplusone_middleware(get_response):
+    """
+    Report the queries repeated by template loops in every request, when
+    the ``NPLUSONE`` setting is on.
+    """
+    action = getattr(settings, 'NPLUSONE', None)
+    if not action:
+        raise MiddlewareNotUsed
+    threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 3)
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with detect_repeated_queries(action, threshold):
+                return await get_response(request)
+    else:
+        def middleware(request):
+            with detect_repeated_queries(action, threshold):
+                return get_response(request)
+    return middleware
@@ -0,0 +1,20 @@
+"""
+JSON serialization shared by the apps.
+"""
+import datetime
+
+
+def json_default(value):
+    """
+    Serialize the values ``json.dumps`` doesn't handle, for its
+    ``default`` argument.
+
+    Datetimes keep their full precision, unlike with ``DjangoJSONEncoder``,
+    which truncates microseconds.
+
+    :param value: A value that isn't JSON serializable by default.
+    :raises TypeError: If the value isn't a datetime.
+    """
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
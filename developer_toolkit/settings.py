@@ -14,6 +14,7 @@ from pathlib import Path
 import os
 import sys
 from django.contrib.messages import constants as messages
+from django.core.exceptions import ImproperlyConfigured
 import dj_database_url
 if os.path.exists('env.py'):
     import env
@@ -65,6 +66,8 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'developer_toolkit.instrumentation.performance_middleware',
+    'developer_toolkit.query_checks.nplusone_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,11 +79,80 @@ MIDDLEWARE = [
 
 TAGGIT_CASE_INSENSITIVE = True
 
+# Minimum trigram similarity of a word for typo-tolerant search
+FUZZY_SEARCH_THRESHOLD = 0.25
+
+# Number of resources per page of a listing
+RESOURCES_PER_PAGE = 20
+
+# Serve the listing pages with async views, for ASGI deployments, see
+# developer_toolkit/asgi.py
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+
+# Report the template lines of loops sending the same query for each item,
+# 'log' or 'raise', in development, see developer_toolkit/query_checks.py
+NPLUSONE = os.environ.get('NPLUSONE')
+NPLUSONE_THRESHOLD = 3
+
+# Bearer token of the Prometheus scraper of /metrics, which staff users can
+# read without it
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Budgets of the endpoints writing to the database, per user and per IP
+# address, see developer_toolkit.throttling. The THROTTLE_RATES environment
+# variable overrides them with comma-separated scope=rate pairs, such as
+# 'contact=10/h,delete_resource=off', or disables throttling with 'off'
+THROTTLE_RATES = {
+    'submit_resource': '20/h',
+    'suggest_category': '10/h',
+    'favorite_resource': '120/m',
+    'delete_resource': '30/h',
+    'contact': '5/h',
+}
+if os.environ.get('THROTTLE_RATES', '').strip() == 'off':
+    THROTTLE_RATES = {}
+else:
+    for pair in filter(None, os.environ.get('THROTTLE_RATES', '').split(',')):
+        scope, sep, rate = pair.partition('=')
+        if not sep:
+            raise ImproperlyConfigured(f'Invalid THROTTLE_RATES pair: {pair}')
+        THROTTLE_RATES[scope.strip()] = rate.strip()
+    THROTTLE_RATES = {
+        scope: rate for scope, rate in THROTTLE_RATES.items()
+        if rate != 'off'
+    }
+# Number of proxies in front of the app adding to X-Forwarded-For, one
+# for the Heroku router
+THROTTLE_PROXY_COUNT = int(os.environ.get('THROTTLE_PROXY_COUNT', 1))
+
+# Read contact requests older than the retention period are moved to
+# compressed JSON Lines archives by the archive_requests command. It deletes
+# the archived requests, so it refuses to run unless CONTACT_ARCHIVE_DIR is
+# set to persistent storage outside of the project, which Heroku dynos lose
+# on restart
+CONTACT_RETENTION_DAYS = int(os.environ.get('CONTACT_RETENTION_DAYS', 90))
+CONTACT_ARCHIVE_DIR = os.environ.get('CONTACT_ARCHIVE_DIR')
+# Number of requests archived and deleted per transaction
+CONTACT_ARCHIVE_BATCH_SIZE = 500
+
+# When set, contact submissions are appended to this local spool and
+# moved into the database by the drain_contact_spool worker gunicorn starts,
+# at most CONTACT_SPOOL_BATCH_SIZE at a time and every
+# CONTACT_SPOOL_INTERVAL milliseconds. It needs a single host with a
+# persistent disk, and must stay unset on Heroku, whose dynos lose their
+# files on restart
+CONTACT_SPOOL_PATH = os.environ.get('CONTACT_SPOOL_PATH')
+CONTACT_SPOOL_BATCH_SIZE = 500
+CONTACT_SPOOL_INTERVAL = 500
+
 ROOT_URLCONF = 'developer_toolkit.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Times the rendering of templates, see
+        # developer_toolkit/instrumentation.py
+        'BACKEND': 'developer_toolkit.instrumentation.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -100,12 +172,101 @@ WSGI_APPLICATION = 'developer_toolkit.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections are kept open for DATABASE_CONN_MAX_AGE seconds, 0 to close
+# them after every request, and checked before being reused. The default is
+# 60 seconds, except with ASYNC_VIEWS: the ORM queries of async views run in
+# threads that may not outlive the request, whose persistent connections
+# would stay open without ever being reused, so they are closed after every
+# request unless the pool of DATABASE_POOL_SIZE below hands them on
 DATABASES = {
-    'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+    'default': dj_database_url.parse(
+        os.environ.get('DATABASE_URL'),
+        conn_max_age=int(os.environ.get(
+            'DATABASE_CONN_MAX_AGE', 0 if ASYNC_VIEWS else 60)),
+    )
 }
+DATABASES['default']['CONN_HEALTH_CHECKS'] = (
+    os.environ.get('DATABASE_HEALTH_CHECKS', '1') == '1'
+)
+# dj-database-url names the PostgreSQL backend by its pre-Django 3.0 name
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql_psycopg2':
+    DATABASES['default']['ENGINE'] = 'django.db.backends.postgresql'
+
+# With DATABASE_POOL_SIZE set, each process keeps a pool of up to that many
+# PostgreSQL connections shared by its threads, and requests check them
+# out and back in, see developer_toolkit/db/pool.py
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 0))
+if (
+    DATABASE_POOL_SIZE
+    and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+):
+    DATABASES['default'].update({
+        'ENGINE': 'developer_toolkit.db.backends.postgresql_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': DATABASE_POOL_SIZE,
+            'TIMEOUT': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+        },
+    })
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# The cache holds the versions invalidating cached pages and validating
+# conditional requests, and the throttling buckets, which every worker must
+# see, so production needs a cache shared by all of them, set by CACHE_URL,
+# or the REDIS_URL of the Heroku Redis add-on:
+# - redis://host:port/db or rediss://... for Redis
+# - memcached://host:port for Memcached
+# - db://table for a database table, created by the createcachetable command
+# Without it, each process has its own local memory cache, which only works
+# with a single process, and gunicorn.conf.py refuses to start several.
+# Throttling then forgets its budgets on every restart.
+CACHE_URL = os.environ.get('CACHE_URL', os.environ.get('REDIS_URL', ''))
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        },
+    }
+elif CACHE_URL.startswith('memcached://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': CACHE_URL[len('memcached://'):],
+        },
+    }
+elif CACHE_URL.startswith('db://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': CACHE_URL[len('db://'):],
+        },
+    }
+elif CACHE_URL:
+    raise ImproperlyConfigured(f'Unsupported CACHE_URL: {CACHE_URL}')
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
 
 if 'test' in sys.argv:
-    DATABASES['default']['ENGINE'] = 'django.db.backends.sqlite3'
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+    DATABASES['default'].update({
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+    })
+    DATABASES['default'].pop('POOL', None)
+    # Tests of throttling set their own budgets
+    THROTTLE_RATES = {}
+    NPLUSONE = 'raise'
 
 
 # Password validation
@@ -0,0 +1,41 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from .caches import cache_is_shared, check_shared_cache
+
+LOCMEM = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+REDIS = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/0',
+    },
+}
+
+
+class SharedCacheTests(SimpleTestCase):
+    """Several workers refuse to start with a cache of their own."""
+
+    @override_settings(CACHES=LOCMEM, THROTTLE_RATES={})
+    def test_local_cache_single_worker(self):
+        self.assertFalse(cache_is_shared())
+        check_shared_cache(1)
+
+    @override_settings(CACHES=LOCMEM)
+    def test_local_cache_several_workers(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'CACHE_URL'):
+            check_shared_cache(3)
+
+    @override_settings(CACHES=LOCMEM, THROTTLE_RATES={'contact': '5/h'})
+    def test_local_cache_throttling(self):
+        with self.assertLogs('developer_toolkit.caches', 'WARNING') as logs:
+            check_shared_cache(1)
+        self.assertIn('THROTTLE_RATES', logs.output[0])
+
+    @override_settings(CACHES=REDIS, THROTTLE_RATES={'contact': '5/h'})
+    def test_shared_cache(self):
+        self.assertTrue(cache_is_shared())
+        check_shared_cache(9)
@@ -0,0 +1,112 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from resources.models import Category
+from .metrics import HISTOGRAMS, QUERIES, Histogram
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=[\d.]+;desc="(\d+) queries", template;dur=[\d.]+, '
+    r'total;dur=[\d.]+$')
+
+
+class HistogramTests(SimpleTestCase):
+    """Histograms are exposed in the Prometheus text format."""
+
+    def test_samples(self):
+        histogram = Histogram('latency', 'Latency.', (1, 5))
+        for value in [0.5, 1, 3, 7]:
+            histogram.observe(value, view='index')
+        histogram.observe(2, view='say "hi"')
+        self.assertEqual(histogram.samples(), [
+            '# HELP latency Latency.',
+            '# TYPE latency histogram',
+            'latency_bucket{view="index",le="1"} 2',
+            'latency_bucket{view="index",le="5"} 3',
+            'latency_bucket{view="index",le="+Inf"} 4',
+            'latency_sum{view="index"} 11.5',
+            'latency_count{view="index"} 4',
+            'latency_bucket{view="say \\"hi\\"",le="1"} 0',
+            'latency_bucket{view="say \\"hi\\"",le="5"} 1',
+            'latency_bucket{view="say \\"hi\\"",le="+Inf"} 1',
+            'latency_sum{view="say \\"hi\\""} 2.0',
+            'latency_count{view="say \\"hi\\""} 1',
+        ])
+
+
+class InstrumentationTests(TestCase):
+    """The costs of every request are recorded by view."""
+
+    def setUp(self):
+        cache.clear()
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='pass')
+        Category.objects.create(
+            name='Python', author=self.admin, published=True)
+
+    def test_server_timing_for_staff(self):
+        response = self.client.get(reverse('index'))
+        self.assertNotIn('Server-Timing', response)
+        self.client.login(username='admin', password='pass')
+        response = self.client.get(reverse('index'))
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreater(int(match[1]), 0)
+
+    def test_server_timing_does_not_load_the_user(self):
+        self.client.login(username='admin', password='pass')
+        url = reverse('api_category_list')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertNotIn('Server-Timing', response)
+        self.assertFalse(
+            [q for q in queries if 'auth_user' in q['sql']])
+        self.client.cookies['server_timing'] = '1'
+        response = self.client.get(url)
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+
+    @override_settings(ROOT_URLCONF='resources.test_async_views')
+    def test_server_timing_of_async_views(self):
+        self.client.login(username='admin', password='pass')
+        response = self.client.get(reverse('index'))
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreater(int(match[1]), 0)
+        self.assertEqual(QUERIES.series[(('view', 'index'),)][2], 1)
+
+    def test_histograms_by_view(self):
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        self.client.get('/no-such-page/')
+        self.assertEqual(
+            sorted(key for key in QUERIES.series),
+            [(('view', '<unresolved>'),), (('view', 'index'),)])
+        self.assertEqual(QUERIES.series[(('view', 'index'),)][2], 2)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('index'))
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(
+                url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            response = self.client.get(
+                url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; version=0.0.4')
+        content = response.content.decode()
+        self.assertIn('# TYPE view_request_duration_seconds histogram',
+                      content)
+        self.assertIn('view_queries_count{view="index"} 1', content)
+        self.assertIn('# TYPE throttle_rejected_total counter', content)
+        self.client.login(username='admin', password='pass')
+        self.assertEqual(self.client.get(url).status_code, 200)
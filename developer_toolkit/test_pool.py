@@ -0,0 +1,133 @@
+import threading
+import time
+from unittest import mock
+
+from django.db import connections
+from django.db.backends.postgresql import base as postgresql
+from django.test import SimpleTestCase
+
+from .db import pool as pool_module
+from .db.backends.postgresql_pool.base import Database, DatabaseWrapper
+from .db.pool import ConnectionPool, PoolTimeout, get_pool, pool_stats
+
+
+class Connection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Connections are reused and bounded per process."""
+
+    def test_reuse(self):
+        pool = ConnectionPool(max_size=2)
+        conn = pool.getconn(Connection)
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(Connection), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['checked_out'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+
+    def test_wait_for_a_connection(self):
+        pool = ConnectionPool(max_size=1)
+        conn = pool.getconn(Connection)
+        timer = threading.Timer(0.05, pool.putconn, [conn])
+        timer.start()
+        self.assertIs(pool.getconn(Connection), conn)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_time'], 0)
+        self.assertEqual(stats['max_wait_time'], stats['wait_time'])
+
+    def test_timeout(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.getconn(Connection)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(Connection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_broken_connections_are_replaced(self):
+        pool = ConnectionPool(max_size=1)
+        conn = pool.getconn(Connection)
+        pool.putconn(conn)
+        new = pool.getconn(Connection, check=lambda conn: False)
+        self.assertIsNot(new, conn)
+        self.assertTrue(conn.closed)
+        pool.putconn(new, discard=True)
+        self.assertTrue(new.closed)
+        stats = pool.stats()
+        self.assertEqual(stats['reconnects'], 2)
+        self.assertEqual(stats['size'], 0)
+        self.assertEqual(stats['checked_out'], 0)
+
+    def test_failed_connect_frees_its_place(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+
+        def connect():
+            raise OSError('refused')
+        with self.assertRaises(OSError):
+            pool.getconn(connect)
+        pool.getconn(Connection)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_pools_are_per_process(self):
+        with mock.patch.dict(pool_module._pools, clear=True):
+            pool = get_pool('db', 2)
+            self.assertIs(get_pool('db', 2), pool)
+            self.assertEqual(list(pool_stats()), ['db'])
+            with mock.patch('os.getpid', return_value=pool.pid + 1):
+                self.assertEqual(pool_stats(), {})
+                self.assertIsNot(get_pool('db', 2), pool)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """The PostgreSQL backend checks connections out and back in."""
+
+    def setUp(self):
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'developer_toolkit.db.backends.postgresql_pool',
+            'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 0.01},
+        }
+        patcher = mock.patch.dict(pool_module._pools, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.wrapper = DatabaseWrapper(settings_dict, alias='pooled')
+
+    def check_out(self, status=Database.extensions.TRANSACTION_STATUS_IDLE):
+        conn = mock.MagicMock(closed=0)
+        conn.info.transaction_status = status
+        with mock.patch.object(
+            postgresql.DatabaseWrapper, 'get_new_connection',
+            return_value=conn,
+        ):
+            self.wrapper.connection = self.wrapper.get_new_connection({})
+        return self.wrapper.connection
+
+    def test_connections_are_returned_to_the_pool(self):
+        conn = self.check_out()
+        self.wrapper._close()
+        conn.close.assert_not_called()
+        self.assertIs(self.check_out(), conn)
+        with self.assertRaises(Database.OperationalError):
+            DatabaseWrapper(
+                self.wrapper.settings_dict, alias='pooled'
+            ).get_new_connection({})
+
+    def test_transactions_are_rolled_back(self):
+        conn = self.check_out(Database.extensions.TRANSACTION_STATUS_INERROR)
+        self.wrapper._close()
+        conn.rollback.assert_called_once()
+        self.assertEqual(self.wrapper.get_pool().stats()['idle'], 1)
+
+    def test_closed_connections_are_discarded(self):
+        conn = self.check_out()
+        conn.closed = 1
+        self.wrapper._close()
+        stats = self.wrapper.get_pool().stats()
+        self.assertEqual((stats['size'], stats['reconnects']), (0, 1))
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.template import engines
+from django.test import TestCase
+
+from resources.models import Category, Resource
+from .query_checks import NPlusOneError, detect_repeated_queries
+
+TEMPLATE = """<ul>
+{% for resource in resources %}
+  <li>{{ resource.name }} by {{ resource.uploader.username }}</li>
+{% endfor %}
+</ul>"""
+
+
+class RepeatedQueryDetectorTests(TestCase):
+    """Queries sent for each item of a template loop are reported."""
+
+    def setUp(self):
+        category = Category.objects.create(
+            name='Python',
+            author=User.objects.create_user(username='author'))
+        for i in range(3):
+            Resource.objects.create(
+                name=f'R{i}', description='d', url=f'https://r{i}.com',
+                category=category,
+                uploader=User.objects.create_user(username=f'u{i}'),
+            )
+        self.template = engines['django'].from_string(TEMPLATE)
+
+    def test_raise_with_the_template_line(self):
+        with self.assertRaisesMessage(
+            NPlusOneError,
+            'line 3: {{ resource.uploader.username }} sent 3 similar '
+            'queries in a loop',
+        ):
+            with detect_repeated_queries():
+                self.template.render(
+                    {'resources': Resource.objects.all()})
+
+    def test_log(self):
+        with self.assertLogs('developer_toolkit.query_checks') as logs:
+            with detect_repeated_queries('log'):
+                self.template.render(
+                    {'resources': Resource.objects.all()})
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('resource.uploader.username', logs.output[0])
+
+    def test_related_objects_loaded_up_front(self):
+        with detect_repeated_queries():
+            html = self.template.render({
+                'resources': Resource.objects.select_related('uploader'),
+            })
+        self.assertIn('R2 by u2', html)
+
+    def test_queries_outside_templates(self):
+        with detect_repeated_queries():
+            for resource in Resource.objects.all():
+                resource.uploader.username
@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from contact.models import Request
+from .throttling import parse_rate, shed_counts
+
+
+@override_settings(
+    THROTTLE_RATES={'contact': '2/m', 'favorite_resource': '3/h'},
+    THROTTLE_PROXY_COUNT=1,
+)
+class ThrottleTests(TestCase):
+    """Write endpoints are limited by token buckets in the cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.time = 1000.0
+        patcher = mock.patch(
+            'developer_toolkit.throttling.time.time', lambda: self.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, ip='1.2.3.4'):
+        return self.client.post(reverse('contact'), {
+            'name': 'N', 'email': 'n@example.com', 'message': 'm',
+        }, HTTP_X_FORWARDED_FOR=f'9.9.9.9, {ip}')
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('20/h'), (20, 3600))
+        self.assertEqual(parse_rate('5/min'), (5, 60))
+
+    def test_budget_exhausted(self):
+        """Requests over budget get 429 with Retry-After and are counted."""
+        self.assertEqual(self.submit().status_code, 200)
+        self.assertEqual(self.submit().status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.submit()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Request.objects.count(), 2)
+        self.assertEqual(shed_counts()['contact'], 1)
+        # Other clients have their own bucket
+        self.assertEqual(self.submit(ip='5.6.7.8').status_code, 200)
+
+    def test_tokens_refill(self):
+        """Tokens come back at the budgeted rate."""
+        self.submit()
+        self.submit()
+        self.time += 30
+        self.assertEqual(self.submit().status_code, 200)
+        self.assertEqual(self.submit().status_code, 429)
+
+    def test_reads_are_not_counted(self):
+        """Only the write methods of an endpoint use its budget."""
+        for _ in range(3):
+            self.assertEqual(
+                self.client.get(reverse('contact')).status_code, 200)
+        self.assertEqual(self.submit().status_code, 200)
+
+    def test_user_bucket_across_addresses(self):
+        """A signed-in user has one budget whatever their address."""
+        user = User.objects.create_user(username='u1', password='pass')
+        self.client.force_login(user)
+        url = reverse('toggle_favorite', args=[1])
+        for i in range(3):
+            self.client.post(url, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')
+        response = self.client.post(url, HTTP_X_FORWARDED_FOR='10.0.0.9')
+        self.assertEqual(response.status_code, 429)
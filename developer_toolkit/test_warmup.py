@@ -0,0 +1,111 @@
+import os
+import runpy
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+from django.urls import clear_url_caches, get_resolver
+
+from .warmup import compile_templates, resolve_urls, warm_up
+
+CONFIG = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+SETTINGS = os.path.join(settings.BASE_DIR, 'developer_toolkit', 'settings.py')
+
+
+class WarmUpTests(SimpleTestCase):
+    """Templates and URL patterns are ready before the first request."""
+
+    def test_templates_are_compiled_and_cached(self):
+        loader = engines['django'].engine.template_loaders[0]
+        loader.reset()
+        compiled, failed = compile_templates()
+        self.assertEqual(failed, [])
+        self.assertGreater(compiled, 0)
+        for name in ['base.html', 'resources/index.html',
+                     'contact/contact.html', 'account/login.html']:
+            self.assertIn(name, loader.get_template_cache)
+
+    def test_url_patterns_are_resolved(self):
+        clear_url_caches()
+        self.assertGreater(resolve_urls(), 0)
+        self.assertTrue(get_resolver()._populated)
+
+    def test_warm_up(self):
+        warmed = warm_up()
+        self.assertEqual(
+            sorted(warmed), ['failed', 'templates', 'urls'])
+
+
+class ServerConfigTests(SimpleTestCase):
+    """The server is configured from the environment."""
+
+    def load(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            for key in ['WEB_CONCURRENCY', 'ASYNC_VIEWS',
+                        'GUNICORN_WORKER_CLASS']:
+                if key not in environ:
+                    os.environ.pop(key, None)
+            with mock.patch('multiprocessing.cpu_count', return_value=2):
+                return runpy.run_path(CONFIG)
+
+    def test_defaults(self):
+        config = self.load()
+        self.assertTrue(config['preload_app'])
+        self.assertEqual(config['workers'], 5)
+        self.assertEqual(config['worker_class'], 'gthread')
+        self.assertEqual(
+            config['wsgi_app'], 'developer_toolkit.wsgi:application')
+
+    def test_environment(self):
+        config = self.load(WEB_CONCURRENCY='3', ASYNC_VIEWS='1')
+        self.assertEqual(config['workers'], 3)
+        self.assertEqual(
+            config['worker_class'], 'uvicorn.workers.UvicornWorker')
+        self.assertEqual(
+            config['wsgi_app'], 'developer_toolkit.asgi:application')
+        config = self.load(GUNICORN_WORKER_CLASS='sync')
+        self.assertEqual(config['worker_class'], 'sync')
+
+    def default_settings(self):
+        # The settings outside of tests, without any cache configured
+        with mock.patch.dict(os.environ), mock.patch('sys.argv', ['gunicorn']):
+            for key in ['CACHE_URL', 'REDIS_URL', 'THROTTLE_RATES']:
+                os.environ.pop(key, None)
+            defaults = runpy.run_path(SETTINGS)
+        return override_settings(
+            CACHES=defaults['CACHES'],
+            THROTTLE_RATES=defaults['THROTTLE_RATES'])
+
+    def test_single_worker_starts_with_default_settings(self):
+        config = self.load(WEB_CONCURRENCY='1')
+        server = mock.Mock()
+        server.cfg.workers = config['workers']
+        with self.default_settings(), self.assertLogs(
+                'developer_toolkit.caches', 'WARNING'):
+            config['on_starting'](server)
+        server.log.error.assert_not_called()
+
+    def test_several_workers_need_a_shared_cache(self):
+        config = self.load()
+        server = mock.Mock()
+        server.cfg.workers = config['workers']
+        with self.default_settings(), self.assertRaises(SystemExit):
+            config['on_starting'](server)
+        server.log.error.assert_called_once()
+
+    def test_spool_drainer_is_restarted(self):
+        config = self.load()
+        server = mock.Mock()
+        server.spool_drainer_lock = threading.Lock()
+        server.spool_drainer_stopping = threading.Event()
+        crashed, restarted = mock.Mock(), mock.Mock()
+        crashed.wait.return_value = 1
+        # The master shuts down while the new drainer runs
+        restarted.wait.side_effect = server.spool_drainer_stopping.set
+        server.spool_drainer = crashed
+        with mock.patch('subprocess.Popen', return_value=restarted):
+            config['supervise_spool_drainer'](server, delay=0)
+        self.assertIs(server.spool_drainer, restarted)
+        server.log.error.assert_called_once()
@@ -0,0 +1,126 @@
+"""
+Token-bucket rate limiting of the endpoints that write to the database.
+
+Every endpoint has a budget in the ``THROTTLE_RATES`` setting, such as
+``'20/h'`` for 20 requests an hour, keyed by the endpoint's scope name.
+Each client has a bucket per scope holding up to that many tokens, which
+refills continuously at the same rate. Requests take a token from the
+bucket of the signed-in user and from the bucket of the client's IP
+address, and are answered with 429 Too Many Requests when either is
+empty.
+
+Buckets live in the cache, so throttling costs no database query. The
+cache must be shared by the workers and outlive them, which
+:func:`developer_toolkit.caches.check_shared_cache` requires when gunicorn
+starts, or each worker would grant the whole budget. Reads and writes of
+a bucket aren't atomic, so concurrent requests can let a client slightly
+over budget.
+"""
+import math
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+BUCKET_KEY = 'throttle:{}:{}'
+SHED_KEY = 'throttle-shed:{}'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Return the ``(capacity, period)`` of a rate like ``'20/h'``, the
+    number of requests and the number of seconds they are allowed in.
+
+    :param rate: A number of requests, a slash and one of ``s``, ``m``,
+    ``h`` or ``d``.
+    """
+    requests, period = rate.split('/')
+    return int(requests), PERIODS[period[0]]
+
+
+def client_ip(request):
+    """
+    Return the IP address of the client of a request.
+
+    Behind ``THROTTLE_PROXY_COUNT`` trusted proxies, the address is the
+    one the outermost proxy added to ``X-Forwarded-For``.
+    """
+    proxies = getattr(settings, 'THROTTLE_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    addresses = [a.strip() for a in forwarded.split(',') if a.strip()]
+    if proxies and len(addresses) >= proxies:
+        return addresses[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def take_token(request, scope):
+    """
+    Take a token from the buckets of a request's client for a scope.
+
+    :param request: The HTTP request object.
+    :param scope: The name of the throttled endpoint.
+    :returns: ``0`` if the request is allowed, otherwise the number of
+    seconds until it would be.
+    """
+    rate = getattr(settings, 'THROTTLE_RATES', {}).get(scope)
+    if not rate:
+        return 0
+    capacity, period = parse_rate(rate)
+    idents = [f'ip:{client_ip(request)}']
+    if request.user.is_authenticated:
+        idents.append(f'user:{request.user.pk}')
+    keys = [BUCKET_KEY.format(scope, ident) for ident in idents]
+    now = time.time()
+    buckets = cache.get_many(keys)
+    tokens = {}
+    for key in keys:
+        left, updated = buckets.get(key, (capacity, now))
+        tokens[key] = min(capacity, left + (now - updated) * capacity / period)
+    emptiest = min(tokens.values())
+    if emptiest < 1:
+        try:
+            cache.incr(SHED_KEY.format(scope))
+        except ValueError:
+            cache.set(SHED_KEY.format(scope), 1, None)
+        return (1 - emptiest) * period / capacity
+    # A full bucket is the same as a missing one once a period is over
+    cache.set_many(
+        {key: (left - 1, now) for key, left in tokens.items()}, period)
+    return 0
+
+
+def shed_counts():
+    """
+    Return the number of requests rejected so far per throttled scope.
+    """
+    scopes = getattr(settings, 'THROTTLE_RATES', {})
+    counts = cache.get_many([SHED_KEY.format(scope) for scope in scopes])
+    return {
+        scope: counts.get(SHED_KEY.format(scope), 0) for scope in scopes
+    }
+
+
+def throttle(scope, methods=('POST',)):
+    """
+    Decorate a view to limit its requests to the budget of a scope.
+
+    :param scope: The name of the endpoint in ``THROTTLE_RATES``.
+    :param methods: The HTTP methods counted against the budget, or
+    ``None`` for all of them.
+    """
+    def decorator(view):
+        @wraps(view)
+        def throttled_view(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = take_token(request, scope)
+                if retry_after:
+                    response = HttpResponse(
+                        'Too many requests, please try again later.',
+                        status=429, content_type='text/plain')
+                    response['Retry-After'] = math.ceil(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return throttled_view
+    return decorator
@@ -18,10 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from resources import urls as resource_urls
 from contact import urls as contact_urls
+from . import views
 
 urlpatterns = [
     path('accounts/', include('allauth.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', views.metrics, name='metrics'),
     path('contact/', include(contact_urls), name='contact_urls'),
     path('', include(resource_urls), name='resources_urls'),
 ]
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+from .metrics import exposition
+
+
+@require_safe
+def metrics(request):
+    """
+    Expose the metrics of the process in the Prometheus text format.
+
+    Staff users can read them, and so can scrapers sending the
+    ``METRICS_TOKEN`` setting as a bearer token.
+
+    **Returns:**
+    A plain text response, or 403 Forbidden.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = request.user.is_staff or bool(
+        token and constant_time_compare(authorization, f'Bearer {token}'))
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,91 @@
+"""
+Warm-up of the application before it serves its first request.
+
+Django fills its URL resolver, compiles the regular expressions of the URL
+patterns and parses templates lazily, on the first request needing them.
+:func:`warm_up` does it all up front. Called in the gunicorn master before
+the workers are forked, see ``gunicorn.conf.py``, every worker starts warm
+and shares the compiled templates and patterns with the others.
+"""
+import os
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import URLResolver, get_resolver
+
+
+def template_names(engine):
+    """
+    Return the names of all the templates the loaders of an engine find.
+
+    :param engine: A :class:`django.template.Engine`.
+    """
+    names = set()
+    loaders = list(engine.template_loaders)
+    while loaders:
+        loader = loaders.pop()
+        # The cached loader wraps the loaders reading the files
+        loaders.extend(getattr(loader, 'loaders', []))
+        for directory in getattr(loader, 'get_dirs', list)():
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path = os.path.relpath(
+                        os.path.join(root, name), directory)
+                    names.add(path.replace(os.sep, '/'))
+    return sorted(names)
+
+
+def compile_templates():
+    """
+    Compile every template of the Django template engines.
+
+    With the cached template loader, the default unless ``DEBUG`` is on,
+    compiled templates are kept for the life of the process.
+
+    :returns: The number of templates compiled, and the names of those
+    failing to compile, which only fail when rendered.
+    """
+    compiled = 0
+    failed = []
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except (TemplateSyntaxError, UnicodeDecodeError):
+                failed.append(name)
+            else:
+                compiled += 1
+    return compiled, failed
+
+
+def resolve_urls(resolver=None):
+    """
+    Fill the URL resolvers and compile the patterns of every URL.
+
+    :param resolver: The resolver to warm up, the root one by default.
+    :returns: The number of URL patterns.
+    """
+    resolver = resolver or get_resolver()
+    # Filled on the first reverse() otherwise
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += resolve_urls(pattern)
+        else:
+            count += 1
+    return count
+
+
+def warm_up():
+    """
+    Warm up the URL patterns and templates of the application.
+
+    :returns: A dictionary of the number of ``urls`` and ``templates``
+    warmed up and the names of the templates ``failed`` to compile.
+    """
+    urls = resolve_urls()
+    templates, failed = compile_templates()
+    return {'urls': urls, 'templates': templates, 'failed': failed}
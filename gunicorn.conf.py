@@ -0,0 +1,133 @@
+"""
+Gunicorn configuration of the web process.
+
+The application is imported and warmed up once in the master process,
+before the workers are forked, so every worker starts with the URL
+patterns resolved and the templates compiled, instead of paying for them
+on its first requests after a deploy or restart.
+
+Settings come from the environment:
+
+- ``WEB_CONCURRENCY``: the number of workers, set by Heroku from the dyno
+  size, otherwise twice the number of CPUs plus one.
+- ``ASYNC_VIEWS``: ``1`` to serve the ASGI application with uvicorn
+  workers, see ``developer_toolkit/asgi.py``, instead of the WSGI
+  application with threaded workers.
+- ``GUNICORN_WORKER_CLASS``: a worker class overriding the above.
+- ``GUNICORN_THREADS``: the number of threads per threaded worker, 4 by
+  default.
+- ``PORT``: the port to listen on, read by gunicorn itself.
+- ``CONTACT_SPOOL_PATH``: when set, the master also runs the
+  ``drain_contact_spool`` command next to the workers, on the same disk as
+  the spool, restarts it if it exits, and stops it on shutdown once the
+  spool is empty.
+
+Several workers need the shared cache of ``CACHE_URL``, see
+``developer_toolkit/caches.py``, and gunicorn refuses to start them with
+the local memory cache.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+if os.environ.get('ASYNC_VIEWS') == '1':
+    wsgi_app = 'developer_toolkit.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'developer_toolkit.wsgi:application'
+    worker_class = 'gthread'
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', worker_class)
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+
+
+def warm_up_app(log):
+    from django.db import connections
+    from developer_toolkit.warmup import warm_up
+
+    start = time.perf_counter()
+    warmed = warm_up()
+    log.info(
+        'Warmed up %d URL patterns and %d templates in %.0f ms',
+        warmed['urls'], warmed['templates'],
+        (time.perf_counter() - start) * 1000)
+    for name in warmed['failed']:
+        log.warning('Template %s failed to compile', name)
+    # A connection opened in the master must not be shared by the workers
+    connections.close_all()
+
+
+def on_starting(server):
+    os.environ.setdefault(
+        'DJANGO_SETTINGS_MODULE', 'developer_toolkit.settings')
+    from django.core.exceptions import ImproperlyConfigured
+    from developer_toolkit.caches import check_shared_cache
+
+    try:
+        check_shared_cache(server.cfg.workers)
+    except ImproperlyConfigured as e:
+        server.log.error('%s', e)
+        sys.exit(1)
+
+
+def when_ready(server):
+    # The preloaded application is imported, the workers aren't forked yet
+    if server.cfg.preload_app:
+        warm_up_app(server.log)
+    if os.environ.get('CONTACT_SPOOL_PATH'):
+        server.log.info('Starting the contact spool drainer')
+        server.spool_drainer = start_spool_drainer()
+        server.spool_drainer_lock = threading.Lock()
+        server.spool_drainer_stopping = threading.Event()
+        threading.Thread(
+            target=supervise_spool_drainer, args=(server,), daemon=True,
+            name='spool-drainer-supervisor',
+        ).start()
+
+
+def start_spool_drainer():
+    return subprocess.Popen([
+        sys.executable,
+        os.path.join(os.path.dirname(__file__), 'manage.py'),
+        'drain_contact_spool',
+    ])
+
+
+def supervise_spool_drainer(server, delay=1):
+    # Restarts the drainer whenever it exits, until the master shuts down
+    while True:
+        returncode = server.spool_drainer.wait()
+        if server.spool_drainer_stopping.wait(delay):
+            return
+        with server.spool_drainer_lock:
+            if server.spool_drainer_stopping.is_set():
+                return
+            server.log.error(
+                'The contact spool drainer exited with status %s, '
+                'restarting it', returncode)
+            server.spool_drainer = start_spool_drainer()
+
+
+def on_exit(server):
+    if not hasattr(server, 'spool_drainer'):
+        return
+    with server.spool_drainer_lock:
+        server.spool_drainer_stopping.set()
+        drainer = server.spool_drainer
+    # The drainer empties the spool before exiting
+    drainer.terminate()
+    try:
+        drainer.wait(20)
+    except subprocess.TimeoutExpired:
+        server.log.warning('The contact spool drainer did not stop')
+        drainer.kill()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        warm_up_app(worker.log)
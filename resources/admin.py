@@ -1,6 +1,97 @@
+from django import forms
 from django.contrib import admin
+from .canonical import canonicalize_url, name_key, url_hash
 from .models import Resource, Category
+from .utils import set_approved, set_published
 
-# Register your models here.
-admin.site.register(Resource)
-admin.site.register(Category)
+
+class ResourceAdminForm(forms.ModelForm):
+    """
+    Reject URLs and names duplicating another resource, which the unique
+    keys computed on save would otherwise reject with an error page.
+    """
+
+    class Meta:
+        model = Resource
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        others = Resource.objects.exclude(pk=self.instance.pk)
+        adding = self.instance.pk is None
+        url = cleaned_data.get('url')
+        # Duplicates predating the unique keys may keep clashing
+        if url and (adding or self.instance.url_hash is not None) and (
+            others.filter(url_hash=url_hash(canonicalize_url(url))).exists()
+        ):
+            self.add_error(
+                'url', 'A resource with the same URL already exists.')
+        name = cleaned_data.get('name')
+        if name and (adding or self.instance.name_key is not None) and (
+            others.filter(name_key=name_key(name)).exists()
+        ):
+            self.add_error(
+                'name', 'A resource with the same name already exists.')
+        return cleaned_data
+
+
+@admin.register(Resource)
+class ResourceAdmin(admin.ModelAdmin):
+    """
+    Moderate resources.
+
+    The change list loads categories and uploaders with the resources and
+    skips counting the whole table. Users are picked with autocomplete and
+    raw ID widgets instead of selects listing every user. Resources
+    pending approval are listed with the approval filter and approved or
+    rejected in bulk with a single UPDATE. Duplicate URLs and names are
+    reported as form errors.
+    """
+    form = ResourceAdminForm
+    list_display = (
+        'name', 'category', 'uploader', 'approved', 'favorites_count',
+        'created_at',
+    )
+    list_filter = ('approved', 'category')
+    list_select_related = ('category', 'uploader')
+    search_fields = ('name', 'url')
+    date_hierarchy = 'created_at'
+    show_full_result_count = False
+    autocomplete_fields = ('category', 'uploader')
+    raw_id_fields = ('favorites',)
+    readonly_fields = ('favorites_count', 'created_at', 'updated_at')
+    actions = ('approve_resources', 'reject_resources')
+
+    @admin.action(description='Approve selected resources')
+    def approve_resources(self, request, queryset):
+        approved = set_approved(queryset, True)
+        self.message_user(request, f'{approved} resources approved.')
+
+    @admin.action(description='Reject selected resources')
+    def reject_resources(self, request, queryset):
+        rejected = set_approved(queryset, False)
+        self.message_user(request, f'{rejected} resources rejected.')
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    """
+    Moderate categories, publishing or unpublishing them in bulk with a
+    single UPDATE.
+    """
+    list_display = ('name', 'author', 'published')
+    list_filter = ('published',)
+    list_select_related = ('author',)
+    search_fields = ('name',)
+    autocomplete_fields = ('author',)
+    actions = ('publish_categories', 'unpublish_categories')
+
+    @admin.action(description='Publish selected categories')
+    def publish_categories(self, request, queryset):
+        published = set_published(queryset, True)
+        self.message_user(request, f'{published} categories published.')
+
+    @admin.action(description='Unpublish selected categories')
+    def unpublish_categories(self, request, queryset):
+        unpublished = set_published(queryset, False)
+        self.message_user(request, f'{unpublished} categories unpublished.')
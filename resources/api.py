@@ -0,0 +1,168 @@
+"""
+Read-only JSON API over published categories and approved resources.
+
+Clients pick the fields they need with the ``fields`` parameter, and only
+the columns and relations of those fields are loaded: keywords are
+prefetched only when requested, and the uploader is only joined for its
+username. Resource lists are paginated with the cursors of the listing
+pages and answer conditional requests with ETags.
+"""
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_safe
+from developer_toolkit.query_checks import query_budget
+from .conditional import (
+    api_category_validators, api_resource_validators, conditional_listing,
+)
+from .models import Resource
+from .pagination import get_ordering, paginate_keyset
+from .search import full_text_search
+from .utils import published_categories, sort_resources
+
+MAX_LIMIT = 100
+CATEGORY_FIELDS = ['id', 'name', 'resource_count', 'newest_resource']
+# Columns loaded for each resource field
+RESOURCE_FIELDS = {
+    'id': ['id'],
+    'name': ['name'],
+    'url': ['url'],
+    'description': ['description'],
+    'category': ['category'],
+    'uploader': ['uploader__username'],
+    'keywords': [],
+    'favorites_count': ['favorites_count'],
+    'created_at': ['created_at'],
+    'updated_at': ['updated_at'],
+}
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def selected_fields(request, fields):
+    """
+    Return the fields requested with the ``fields`` parameter, or all
+    fields if there is none.
+
+    :param request: The HTTP request object.
+    :param fields: The fields available, in their output order.
+    :raises ValueError: If an unknown field is requested.
+    """
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(fields)
+    requested = {field.strip() for field in requested.split(',')}
+    unknown = requested - set(fields)
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}.')
+    return [field for field in fields if field in requested]
+
+
+def serialize_resource(resource, fields):
+    data = {}
+    for field in fields:
+        if field == 'category':
+            data[field] = resource.category_id
+        elif field == 'uploader':
+            data[field] = resource.uploader.username
+        elif field == 'keywords':
+            data[field] = sorted(tag.name for tag in resource.keywords.all())
+        else:
+            data[field] = getattr(resource, field)
+    return data
+
+
+@query_budget(3)
+@require_safe
+@cache_control(no_cache=True)
+@conditional_listing(api_category_validators)
+def category_list(request):
+    """
+    List the published categories by name.
+
+    :param request: The HTTP request object, with an optional ``fields``
+    parameter selecting among ``CATEGORY_FIELDS``.
+
+    **Returns:**
+
+    A JSON object whose ``results`` are the categories, with their
+    number of approved resources and the creation date of the newest one.
+    """
+    try:
+        fields = selected_fields(request, CATEGORY_FIELDS)
+    except ValueError as e:
+        return error(str(e))
+    return JsonResponse({'results': [
+        {field: getattr(category, field) for field in fields}
+        for category in published_categories()
+    ]})
+
+
+@query_budget(5)
+@require_safe
+@cache_control(no_cache=True)
+@conditional_listing(api_resource_validators)
+def resource_list(request):
+    """
+    List approved resources, a page at a time.
+
+    :param request: The HTTP request object, with the optional parameters:
+
+    - ``category``: The ID of the category to list.
+    - ``q``: A full-text query, searched in the fields given by ``in``
+      (name by default) like the search page.
+    - ``sort_by``: An order of the listing pages, ``relevance`` by
+      default for queries and ``alphabetical`` otherwise.
+    - ``fields``: The comma separated fields to return, among
+      ``RESOURCE_FIELDS``.
+    - ``limit``: The number of resources per page, at most ``MAX_LIMIT``.
+    - ``cursor``: The cursor of the page, from ``next`` or ``previous``.
+
+    **Returns:**
+
+    A JSON object with the ``results`` of the page and the ``next`` and
+    ``previous`` page URLs, or ``null`` at either end.
+    """
+    try:
+        fields = selected_fields(request, RESOURCE_FIELDS)
+    except ValueError as e:
+        return error(str(e))
+    limit = request.GET.get('limit', '')
+    if limit and not limit.isdigit():
+        return error('The limit must be a positive number.')
+    resources = Resource.objects.filter(approved=True)
+    category_id = request.GET.get('category')
+    if category_id:
+        if not category_id.isdigit():
+            return error('The category must be an ID.')
+        resources = resources.filter(category_id=category_id)
+    query = request.GET.get('q')
+    if query:
+        resources = full_text_search(
+            resources, query, request.GET.getlist('in') or ['name'])
+    resources = sort_resources(
+        request, resources, default='relevance' if query else 'alphabetical')
+    if not resources.query.order_by:
+        resources = resources.order_by('name', 'id')
+    # Only load the selected fields and those of the cursors
+    columns = {'id'}
+    for field in fields:
+        columns.update(RESOURCE_FIELDS[field])
+    for field, _ in get_ordering(resources):
+        if field != 'search_rank':
+            columns.add(field)
+    resources = resources.only(*columns)
+    if 'uploader' in fields:
+        resources = resources.select_related('uploader')
+    if 'keywords' in fields:
+        resources = resources.prefetch_related('keywords')
+    page = paginate_keyset(
+        request, resources, per_page=min(int(limit or 0), MAX_LIMIT) or None)
+    return JsonResponse({
+        'results': [serialize_resource(r, fields) for r in page],
+        'next': page.has_next and f'{request.path}?{page.next_query}' or None,
+        'previous': (
+            page.has_previous and f'{request.path}?{page.previous_query}'
+            or None),
+    })
@@ -3,7 +3,12 @@ from django.apps import AppConfig
 
 class ResourcesConfig(AppConfig):
     """
-    Provides primary key type for the resources application.
+    Provides primary key type for the resources application
+    and connects its signal handlers.
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'resources'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
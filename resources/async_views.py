@@ -0,0 +1,249 @@
+"""
+Async versions of the read-only listing views, for ASGI deployments.
+
+They render the same pages as their counterparts in :mod:`resources.views`
+and are routed in their place when the ``ASYNC_VIEWS`` setting is on.
+Database queries go through the async ORM, so a slow query only holds
+the request waiting for it instead of a whole worker. Code that only
+exists as sync, such as loading the user and messages from the session,
+rendering pages with their context processors, the typo-tolerant search
+index and the cache, whose backends block, runs in a thread with
+``sync_to_async``.
+"""
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.http import HttpResponseRedirect, QueryDict
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.utils.safestring import mark_safe
+from developer_toolkit.query_checks import query_budget
+from .cache import (
+    get_category_list, get_category_listing, set_category_list,
+    set_category_listing,
+)
+from .conditional import (
+    async_conditional_listing, category_validators, index_validators,
+    search_validators,
+)
+from .fuzzy import fuzzy_search, suggest_query
+from .models import Category, Resource
+from .pagination import CURSOR_PARAM, apaginate_keyset
+from .search import full_text_search
+from .utils import (
+    add_resource_actions, listing_queryset, published_categories_queryset,
+    sort_resources,
+)
+
+arender = sync_to_async(render)
+arender_to_string = sync_to_async(render_to_string)
+# Cached pages are looked up under their versions in a single thread hop
+aget_category_list = sync_to_async(get_category_list)
+aset_category_list = sync_to_async(set_category_list)
+aget_category_listing = sync_to_async(get_category_listing)
+aset_category_listing = sync_to_async(set_category_listing)
+
+
+def listing_view(validators):
+    """
+    Decorate an async listing view like the sync listing views, which are
+    revalidated on every visit and differ per user.
+
+    Django's ``cache_control`` and ``condition`` decorators only wrap sync
+    views.
+
+    :param validators: A function returning the ``(etag, last_modified)``
+    of the page.
+    """
+    def decorator(view):
+        view = async_conditional_listing(validators)(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            response = await view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
+
+
+async def is_authenticated(request):
+    """
+    Return whether the user of a request is signed in.
+
+    The user is loaded from the session on first access, which is sync
+    only, and is then available to the async view as ``request.user``.
+    """
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+@query_budget(3)
+@listing_view(index_validators)
+async def index(request):
+    """
+    Display the homepage with a list of published categories.
+
+    See :func:`resources.views.index`.
+    """
+    categories = await aget_category_list()
+    if categories is None:
+        categories = [
+            category async for category in published_categories_queryset()
+        ]
+        await aset_category_list(categories)
+    context = {
+        'categories': categories,
+    }
+    return await arender(request, 'resources/index.html', context)
+
+
+@query_budget(8)
+@listing_view(category_validators)
+async def category_detail(request, category_id):
+    """
+    Display details of a specific category along with its approved resources.
+
+    See :func:`resources.views.category_detail`.
+    """
+    category = await Category.objects.aget(id=category_id, published=True)
+    sort_by = request.GET.get('sort_by', 'alphabetical')
+    cursor = request.GET.get(CURSOR_PARAM)
+    listing = await aget_category_listing(category.id, sort_by, cursor)
+    if listing is None:
+        resources = category.resources.filter(approved=True)
+        resources = resources.order_by('-created_at')
+        # Page links only keep the sort order, the key of the cached page
+        params = QueryDict(mutable=True)
+        if 'sort_by' in request.GET:
+            params['sort_by'] = sort_by
+        page = await apaginate_keyset(
+            request, sort_resources(request, listing_queryset(resources)),
+            params=params,
+        )
+        listing = {
+            'html': await arender_to_string(
+                'resources/includes/category_listing.html',
+                {'resources': page},
+            ),
+            'pagination': await arender_to_string(
+                'resources/includes/pagination.html', {'page': page},
+            ),
+            'resource_count': await resources.acount(),
+            'resources': page.items,
+        }
+        await aset_category_listing(category.id, sort_by, cursor, listing)
+    html = listing['html']
+    if await is_authenticated(request):
+        unapproved_resources = [
+            resource async for resource in listing_queryset(
+                category.resources.filter(
+                    approved=False, uploader=request.user)
+            )
+        ]
+        favorite_resources = [
+            resource async for resource in Resource.objects.filter(
+                favorites=request.user,
+                pk__in=[r.pk for r in listing['resources']],
+            )
+        ]
+        html = add_resource_actions(
+            request.user, html, listing['resources'], favorite_resources)
+    else:
+        unapproved_resources = []
+        favorite_resources = []
+
+    context = {
+        'category': category,
+        'listing': mark_safe(html),
+        'pagination': mark_safe(listing['pagination']),
+        'resource_count': listing['resource_count'],
+        'favorite_resources': favorite_resources,
+        'unapproved_resources': unapproved_resources,
+    }
+    return await arender(request, 'resources/category_detail.html', context)
+
+
+@query_budget(4)
+async def view_favorites(request):
+    """
+    Display the user's favorite resources.
+
+    See :func:`resources.views.view_favorites`.
+    """
+    if not await is_authenticated(request):
+        await sync_to_async(messages.add_message)(
+            request, messages.ERROR,
+            'You must be logged in to view your favorite resources.')
+        return HttpResponseRedirect('/accounts/login/')
+    favorite_resources = request.user.favorite_resources.all()
+    favorite_resources = favorite_resources.order_by('-created_at')
+    favorite_count = await favorite_resources.acount()
+    page = await apaginate_keyset(
+        request, sort_resources(request, listing_queryset(favorite_resources))
+    )
+
+    context = {
+        'favorite_resources': page,
+        'favorite_count': favorite_count,
+    }
+    return await arender(
+        request, 'resources/favorite_resources.html', context)
+
+
+@query_budget(7)
+@listing_view(search_validators)
+async def search_resources(request):
+    """
+    Search for resources based on a query and selected fields.
+
+    See :func:`resources.views.search_resources`.
+    """
+    query = request.GET.get('q', '')
+    search_in = request.GET.getlist('in') or ['name']
+    fuzzy = request.GET.get('fuzzy') == 'on'
+    favorite_resources = []
+    suggestion = None
+    suggestion_query = ''
+    resources = []
+    resource_count = 0
+    if query:
+        resources = Resource.objects.filter(approved=True).order_by(
+            '-created_at'
+        )
+        if fuzzy:
+            # The in-process trigram index is loaded with the sync ORM
+            resources = await sync_to_async(fuzzy_search)(
+                resources, query, search_in)
+        else:
+            resources = full_text_search(resources, query, search_in)
+        resource_count = await resources.acount()
+        page = await apaginate_keyset(request, sort_resources(
+            request, listing_queryset(resources), default='relevance'
+        ))
+        if await is_authenticated(request):
+            favorite_resources = [
+                resource async for resource in resources.filter(
+                    favorites=request.user, pk__in=[r.pk for r in page]
+                )
+            ]
+        resources = page
+        if not resource_count:
+            # Suggest a correction of misspelled words
+            suggestion = await sync_to_async(suggest_query)(query)
+            if suggestion:
+                params = request.GET.copy()
+                params['q'] = suggestion
+                suggestion_query = params.urlencode()
+
+    context = {
+        'resources': resources,
+        'resource_count': resource_count,
+        'favorite_resources': favorite_resources,
+        'query': query,
+        'search_in': search_in,
+        'fuzzy': fuzzy,
+        'suggestion': suggestion,
+        'suggestion_query': suggestion_query,
+    }
+    return await arender(request, 'resources/search_results.html', context)
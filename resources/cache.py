@@ -0,0 +1,219 @@
+"""
+Cache keys and invalidation for rendered resource content.
+
+Resource details are cached under fixed keys and deleted when they change.
+Category listings are cached under keys containing a version number per
+category, which is bumped instead, so every page and sort order of a
+category is invalidated at once.
+
+Versions are the time of the last change in nanoseconds, so they also
+tell when content was last modified for conditional requests.
+"""
+import datetime
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+CATEGORY_LIST_KEY = 'category-list'
+CATEGORY_LIST_VERSION_KEY = 'category-list-version'
+CONTENT_VERSION_KEY = 'content-version'
+FAVORITES_VERSION_KEY = 'favorites-version:{}'
+RESOURCE_DETAIL_KEY = 'resource-detail:{}'
+CATEGORY_LISTING_KEY = 'category-listing:{}:{}:{}'
+CATEGORY_LISTING_VERSION_KEY = 'category-listing-version:{}'
+
+
+def get_version(key):
+    """
+    Return the version stored under a key, starting it at the current
+    time if it is missing.
+
+    Starting from the current time means a version lost from the cache
+    never falls back to one that older entries were stored under.
+
+    :param key: The cache key of the version.
+    """
+    return cache.get_or_set(key, time.time_ns, None)
+
+
+def bump_version(key):
+    """
+    Advance the version stored under a key to the current time.
+
+    :param key: The cache key of the version.
+    """
+    cache.set(key, max(time.time_ns(), cache.get(key, 0) + 1), None)
+
+
+def version_datetime(version):
+    """
+    Return the time a version was set as an aware datetime.
+
+    :param version: A version returned by :func:`get_version`.
+    """
+    return datetime.datetime.fromtimestamp(
+        version / 1e9, tz=datetime.timezone.utc)
+
+
+def content_version():
+    """
+    Return the version of all resources and categories.
+    """
+    return get_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version():
+    """
+    Record a change to any resource or category.
+    """
+    bump_version(CONTENT_VERSION_KEY)
+
+
+def favorites_version(user_id):
+    """
+    Return the version of the favorites of a user.
+
+    :param user_id: The ID of the user.
+    """
+    return get_version(FAVORITES_VERSION_KEY.format(user_id))
+
+
+def bump_favorites_versions(user_ids):
+    """
+    Record a change to the favorites of users.
+
+    :param user_ids: The IDs of the users.
+    """
+    for user_id in set(user_ids):
+        bump_version(FAVORITES_VERSION_KEY.format(user_id))
+
+
+def get_category_list():
+    """
+    Return the cached published categories of the homepage, or ``None``
+    if not cached.
+    """
+    return cache.get(CATEGORY_LIST_KEY)
+
+
+def set_category_list(categories):
+    """
+    Cache the published categories of the homepage.
+
+    :param categories: A list of :model:`Category` objects.
+    """
+    cache.set(CATEGORY_LIST_KEY, categories,
+              getattr(settings, 'CATEGORY_LIST_CACHE_TIMEOUT', 3600))
+
+
+def category_list_version():
+    """
+    Return the version of the published categories of the homepage.
+    """
+    return get_version(CATEGORY_LIST_VERSION_KEY)
+
+
+def invalidate_category_list():
+    """
+    Remove the cached published categories of the homepage.
+    """
+    cache.delete(CATEGORY_LIST_KEY)
+    bump_version(CATEGORY_LIST_VERSION_KEY)
+
+
+def resource_detail_key(resource_id):
+    """
+    Return the cache key of the rendered detail of a resource.
+
+    :param resource_id: The ID of the :model:`Resource`.
+    """
+    return RESOURCE_DETAIL_KEY.format(resource_id)
+
+
+def get_resource_detail(resource_id):
+    """
+    Return the cached detail of a resource, or ``None`` if not cached.
+
+    :param resource_id: The ID of the :model:`Resource`.
+    """
+    return cache.get(resource_detail_key(resource_id))
+
+
+def set_resource_detail(resource_id, detail):
+    """
+    Cache the rendered detail of a resource.
+
+    :param resource_id: The ID of the :model:`Resource`.
+    :param detail: A dict with the rendered ``html`` and the ``approved``
+    and ``uploader_id`` values used for permission checks.
+    """
+    cache.set(resource_detail_key(resource_id), detail,
+              getattr(settings, 'RESOURCE_DETAIL_CACHE_TIMEOUT', 3600))
+
+
+def invalidate_resource_details(resource_ids):
+    """
+    Remove the cached details of resources.
+
+    :param resource_ids: The IDs of the :model:`Resource` objects.
+    """
+    cache.delete_many([resource_detail_key(pk) for pk in resource_ids])
+
+
+def category_listing_version(category_id):
+    """
+    Return the current version of the cached listings of a category.
+
+    :param category_id: The ID of the :model:`Category`.
+    """
+    return get_version(CATEGORY_LISTING_VERSION_KEY.format(category_id))
+
+
+def category_listing_key(category_id, sort_by, cursor):
+    """
+    Return the cache key of a rendered page of a category listing.
+
+    :param category_id: The ID of the :model:`Category`.
+    :param sort_by: The sort order of the listing.
+    :param cursor: The pagination cursor of the page.
+    """
+    page = hashlib.md5(f'{sort_by}:{cursor}'.encode()).hexdigest()
+    return CATEGORY_LISTING_KEY.format(
+        category_id, category_listing_version(category_id), page)
+
+
+def get_category_listing(category_id, sort_by, cursor):
+    """
+    Return a cached page of a category listing, or ``None`` if not cached.
+
+    :param category_id: The ID of the :model:`Category`.
+    :param sort_by: The sort order of the listing.
+    :param cursor: The pagination cursor of the page.
+    """
+    return cache.get(category_listing_key(category_id, sort_by, cursor))
+
+
+def set_category_listing(category_id, sort_by, cursor, listing):
+    """
+    Cache a rendered page of a category listing.
+
+    :param category_id: The ID of the :model:`Category`.
+    :param sort_by: The sort order of the listing.
+    :param cursor: The pagination cursor of the page.
+    :param listing: A dict with the rendered ``html`` and ``pagination``,
+    the ``resource_count`` of the category and the ``resources`` on the
+    page.
+    """
+    cache.set(category_listing_key(category_id, sort_by, cursor), listing,
+              getattr(settings, 'CATEGORY_LISTING_CACHE_TIMEOUT', 3600))
+
+
+def invalidate_category_listings(category_ids):
+    """
+    Bump the listing versions of categories, orphaning their cached pages.
+
+    :param category_ids: The IDs of the :model:`Category` objects.
+    """
+    for category_id in set(category_ids):
+        bump_version(CATEGORY_LISTING_VERSION_KEY.format(category_id))
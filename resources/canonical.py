@@ -0,0 +1,67 @@
+"""
+Canonical forms of resource URLs and names used to detect duplicates.
+
+Two URLs are duplicates when they only differ by scheme, letter case of the
+host, a ``www.`` prefix, a default port, trailing or repeated slashes, the
+order of query parameters, tracking parameters or a fragment. Two names are
+duplicates when they only differ by letter case or whitespace.
+"""
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DEFAULT_PORTS = (80, 443)
+# Query parameters added by analytics and ad tracking
+TRACKING_PARAMS = ('fbclid', 'gclid', 'mc_cid', 'mc_eid')
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+
+def canonicalize_url(url):
+    """
+    Return the canonical form of a URL, without its scheme.
+
+    :param url: The URL to canonicalize.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[len('www.'):]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port not in DEFAULT_PORTS:
+        host = f'{host}:{port}'
+    path = re.sub(r'/{2,}', '/', parts.path).rstrip('/')
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(key)
+    )
+    canonical = host + path
+    if query:
+        canonical += '?' + urlencode(query)
+    return canonical
+
+
+def _is_tracking_param(key):
+    key = key.lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def url_hash(canonical_url):
+    """
+    Return the SHA-256 hex digest of a canonical URL.
+
+    :param canonical_url: A URL canonicalized by :func:`canonicalize_url`.
+    """
+    return hashlib.sha256(canonical_url.encode()).hexdigest()
+
+
+def name_key(name):
+    """
+    Return the case-folded form of a name with whitespace collapsed.
+
+    :param name: The name of a resource.
+    """
+    return ' '.join(name.split()).casefold()
@@ -0,0 +1,176 @@
+"""
+Validators answering conditional requests for the listing pages.
+
+The ETag and Last-Modified date of a page are built from:
+
+- the newest ``updated_at`` of the resources it lists, from one indexed
+  aggregate query;
+- the version of the content it shows, bumped by signals on every change,
+  which also covers deletions and favorites;
+- for signed-in users, their ID and the version of their favorites.
+
+Pages with pending messages are never answered with 304 Not Modified, as
+their messages are only shown once. The responses of the JSON API are the
+same for every user and skip the per-user parts.
+"""
+import hashlib
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from .cache import (
+    category_list_version, category_listing_version, content_version,
+    favorites_version, version_datetime,
+)
+from .models import Resource
+
+
+def listing_validators(request, versions, newest_update=None,
+                       per_user=True):
+    """
+    Return the ``(etag, last_modified)`` validators of a listing page, or
+    ``(None, None)`` if the page must be rendered.
+
+    The validators are computed once per request.
+
+    :param request: The HTTP request object.
+    :param versions: The versions of the content shown on the page.
+    :param newest_update: A function returning the newest ``updated_at``
+    of the listed resources, if any.
+    :param per_user: Whether the page shows the favorites and messages of
+    the current user, which the API responses don't.
+    """
+    validators = getattr(request, '_listing_validators', None)
+    if validators is not None:
+        return validators
+    if per_user and len(get_messages(request)):
+        validators = (None, None)
+    else:
+        versions = list(versions)
+        parts = []
+        if per_user and request.user.is_authenticated:
+            versions.append(favorites_version(request.user.pk))
+            # Pages embed a CSRF token for the favorite toggles
+            parts += [request.user.pk, request.META.get('CSRF_COOKIE', '')]
+        last_modified = version_datetime(max(versions))
+        updated_at = newest_update() if newest_update else None
+        if updated_at:
+            last_modified = max(last_modified, updated_at)
+        parts += versions + [updated_at and updated_at.isoformat()]
+        etag = hashlib.md5(repr(parts).encode()).hexdigest()
+        validators = (etag, last_modified)
+    request._listing_validators = validators
+    return validators
+
+
+def newest_update(resources):
+    """
+    Return a function fetching the newest ``updated_at`` of resources.
+
+    :param resources: A queryset of :model:`Resource` objects.
+    """
+    return lambda: resources.aggregate(newest=Max('updated_at'))['newest']
+
+
+def index_validators(request):
+    """
+    Return the validators of the homepage, which needs no query.
+    """
+    return listing_validators(request, [category_list_version()])
+
+
+def category_validators(request, category_id):
+    """
+    Return the validators of a category page.
+    """
+    return listing_validators(
+        request, [category_listing_version(category_id)],
+        newest_update(Resource.objects.filter(
+            category_id=category_id, approved=True)),
+    )
+
+
+def search_validators(request):
+    """
+    Return the validators of the search results.
+    """
+    return listing_validators(
+        request, [content_version()],
+        newest_update(Resource.objects.filter(approved=True)),
+    )
+
+
+def api_category_validators(request):
+    """
+    Return the validators of the category list of the API.
+    """
+    return listing_validators(
+        request, [category_list_version()], per_user=False)
+
+
+def api_resource_validators(request):
+    """
+    Return the validators of the resource list of the API.
+
+    Unlike the category pages, the API lists keywords, so it follows the
+    version of all content.
+    """
+    resources = Resource.objects.filter(approved=True)
+    category_id = request.GET.get('category', '')
+    if category_id.isdigit():
+        resources = resources.filter(category_id=category_id)
+    return listing_validators(
+        request, [content_version()], newest_update(resources),
+        per_user=False,
+    )
+
+
+def conditional_listing(validators):
+    """
+    Decorate a view to answer conditional requests using validators.
+
+    :param validators: A function taking the view arguments and returning
+    ``(etag, last_modified)``.
+    """
+    def etag(request, *args, **kwargs):
+        return validators(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return validators(request, *args, **kwargs)[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def async_conditional_listing(validators):
+    """
+    Decorate an async view to answer conditional requests using
+    validators, like :func:`conditional_listing` does for sync views.
+
+    :param validators: A function taking the view arguments and returning
+    ``(etag, last_modified)``, run in a thread as it may query the
+    database.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(validators)(
+                request, *args, **kwargs)
+            etag = quote_etag(etag) if etag else None
+            last_modified = (
+                int(last_modified.timestamp()) if last_modified else None)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(
+                        last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
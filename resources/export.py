@@ -0,0 +1,103 @@
+"""
+Streaming export of the approved catalog as CSV or JSON Lines.
+
+Resources are read in chunks through ``QuerySet.iterator()``, which uses a
+server-side cursor on PostgreSQL, and the keywords of each chunk are
+fetched in one query, so memory use does not grow with the table.
+"""
+import csv
+import json
+from itertools import islice
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from taggit.models import TaggedItem
+from .models import Resource
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/jsonl',
+}
+EXPORT_FIELDS = [
+    'id', 'name', 'description', 'url', 'category', 'uploader',
+    'keywords', 'favorites_count', 'created_at', 'updated_at',
+]
+# Columns loaded for each exported field
+COLUMNS = {
+    'category': 'category__name',
+    'uploader': 'uploader__username',
+}
+
+
+def export_rows(batch_size=2000):
+    """
+    Yield the approved resources as dicts of ``EXPORT_FIELDS``, by ID.
+
+    :param batch_size: The number of resources fetched per chunk of the
+    cursor and per keyword query.
+    """
+    fields = [field for field in EXPORT_FIELDS if field != 'keywords']
+    rows = Resource.objects.filter(approved=True).order_by('pk').values_list(
+        *[COLUMNS.get(field, field) for field in fields]
+    ).iterator(chunk_size=batch_size)
+    content_type = ContentType.objects.get_for_model(Resource)
+    while True:
+        chunk = [dict(zip(fields, row)) for row in islice(rows, batch_size)]
+        if not chunk:
+            return
+        keywords = {}
+        for object_id, name in TaggedItem.objects.filter(
+            content_type=content_type,
+            object_id__in=[row['id'] for row in chunk],
+        ).order_by('tag__name').values_list('object_id', 'tag__name'):
+            keywords.setdefault(object_id, []).append(name)
+        for row in chunk:
+            row['keywords'] = keywords.get(row['id'], [])
+            yield {field: row[field] for field in EXPORT_FIELDS}
+
+
+class Echo:
+    """
+    A file-like object returning what is written to it, so ``csv.writer``
+    can format one line at a time.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """
+    Yield a header line and a CSV line per row, keywords comma separated.
+
+    :param rows: Dicts of ``EXPORT_FIELDS``.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['keywords'] = ','.join(row['keywords'])
+        row['created_at'] = row['created_at'].isoformat()
+        row['updated_at'] = row['updated_at'].isoformat()
+        yield writer.writerow(row.values())
+
+
+def jsonl_lines(rows):
+    """
+    Yield a JSON object line per row.
+
+    :param rows: Dicts of ``EXPORT_FIELDS``.
+    """
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(export_format, batch_size=2000):
+    """
+    Yield the lines of an export of the approved catalog.
+
+    :param export_format: One of ``EXPORT_FORMATS``.
+    :param batch_size: The number of resources fetched per chunk.
+    """
+    rows = export_rows(batch_size)
+    if export_format == 'csv':
+        return csv_lines(rows)
+    return jsonl_lines(rows)
@@ -0,0 +1,385 @@
+"""
+Typo-tolerant search over resource names and keywords.
+
+Similarity is measured with trigrams, like PostgreSQL's ``pg_trgm``: the
+similarity of two words is the number of trigrams they share divided by
+the number of distinct trigrams in both. On PostgreSQL the search uses
+``pg_trgm`` and trigram GIN indexes on the resource and keyword names, on
+other databases it uses an in-process trigram index built from the table.
+
+Only approved resources and their keywords are indexed and suggested, so
+searches never reveal the names of resources awaiting approval.
+"""
+import heapq
+import itertools
+import re
+import threading
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import BooleanField, Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+from django.dispatch import receiver
+from .models import Resource
+
+INDEX_VERSION_KEY = 'fuzzy-index-version'
+# Maximum number of results of a search with the in-process index
+MAX_RESULTS = 100
+MAX_WORDS = 5
+
+# Keyword names of each resource
+KEYWORD_SQL = """
+    SELECT {select}
+    FROM taggit_taggeditem ti
+    JOIN taggit_tag t ON t.id = ti.tag_id
+    JOIN django_content_type ct ON ct.id = ti.content_type_id
+    WHERE ct.app_label = 'resources' AND ct.model = 'resource'
+"""
+# Keywords of approved resources
+APPROVED_KEYWORD_SQL = KEYWORD_SQL + """
+    AND ti.object_id IN (SELECT id FROM {table} WHERE approved)
+"""
+
+
+def similarity_threshold():
+    """
+    Return the minimum similarity for a word to count as a match.
+    """
+    return getattr(settings, 'FUZZY_SEARCH_THRESHOLD', 0.3)
+
+
+def words(text):
+    """
+    Split text into lowercase alphanumeric words.
+
+    :param text: The text to split.
+    """
+    return re.findall(r'[^\W_]+', text.lower())
+
+
+def trigrams(word):
+    """
+    Return the set of trigrams of a word, padded as ``pg_trgm`` does.
+
+    :param word: A lowercase word.
+    """
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """
+    Return the trigram similarity of two sets of trigrams.
+    """
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+class TrigramIndex:
+    """
+    In-process trigram index from words to the resources containing them.
+
+    Words come from resource names and keyword names. A query word is
+    matched against indexed words through a posting list per trigram.
+    """
+
+    def __init__(self, name_rows, keyword_rows):
+        """
+        :param name_rows: ``(resource_id, name)`` pairs.
+        :param keyword_rows: ``(resource_id, keyword)`` pairs.
+        """
+        self.word_ids = {}
+        self.words = []
+        self.word_trigram_counts = []
+        self.name_resources = []
+        self.keyword_resources = []
+        self.postings = defaultdict(list)
+        for resource_id, name in name_rows:
+            for word in words(name):
+                self.name_resources[self._add_word(word)].add(resource_id)
+        for resource_id, keyword in keyword_rows:
+            for word in words(keyword):
+                self.keyword_resources[self._add_word(word)].add(
+                    resource_id)
+
+    def _add_word(self, word):
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = self.word_ids[word] = len(self.words)
+            grams = trigrams(word)
+            self.words.append(word)
+            self.word_trigram_counts.append(len(grams))
+            self.name_resources.append(set())
+            self.keyword_resources.append(set())
+            for gram in grams:
+                self.postings[gram].append(word_id)
+        return word_id
+
+    def similar_words(self, word, threshold):
+        """
+        Return ``(similarity, word_id)`` pairs of indexed words similar
+        to a word, most similar first.
+
+        :param word: A lowercase query word.
+        :param threshold: The minimum similarity of returned words.
+        """
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        matches = []
+        for word_id, count in shared.items():
+            score = count / (
+                len(grams) + self.word_trigram_counts[word_id] - count)
+            if score >= threshold:
+                matches.append((score, word_id))
+        matches.sort(reverse=True)
+        return matches
+
+    def search(self, query, names=True, keywords=True, threshold=0.3):
+        """
+        Return ``(similarity, resource_ids)`` pairs grouping the resources
+        matching a query by their similarity to it, most similar first.
+
+        The score of a resource is the average, over the query words, of
+        the best similarity of the word to a word of the resource. The
+        resources are grouped with set operations, never one at a time,
+        as a common misspelling matches a large part of the index.
+
+        :param query: The search query string.
+        :param names: Whether to match resource names.
+        :param keywords: Whether to match keyword names.
+        :param threshold: The minimum similarity of matched words.
+        """
+        query_words = words(query)[:MAX_WORDS]
+        word_levels = []
+        matched_any = set()
+        for word in query_words:
+            # The resources matched by each similar word and no closer one
+            levels, matched = [], set()
+            for score, word_id in self.similar_words(word, threshold):
+                ids = set()
+                if names:
+                    ids |= self.name_resources[word_id]
+                if keywords:
+                    ids |= self.keyword_resources[word_id]
+                ids -= matched
+                if ids:
+                    matched |= ids
+                    levels.append((score, ids))
+            word_levels.append((levels, matched))
+            matched_any |= matched
+        # Split the matched resources by their total score word by word
+        groups = {0.0: matched_any}
+        for levels, matched in word_levels:
+            split = defaultdict(set)
+            for total, ids in groups.items():
+                unmatched = ids - matched
+                if unmatched:
+                    split[total] |= unmatched
+                for score, level in levels:
+                    common = ids & level
+                    if common:
+                        split[total + score] |= common
+            groups = split
+        return [
+            (total / len(query_words), groups[total])
+            for total in sorted(groups, reverse=True)
+            if total
+        ]
+
+    def suggest(self, word, threshold=0.3):
+        """
+        Return the indexed word most similar to a word, or ``None``.
+
+        :param word: A lowercase query word.
+        :param threshold: The minimum similarity of the suggestion.
+        """
+        matches = self.similar_words(word, threshold)
+        return self.words[matches[0][1]] if matches else None
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def invalidate_index():
+    """
+    Mark the in-process trigram index as stale in every process sharing
+    the cache, which is all of them in production, see
+    ``developer_toolkit/caches.py``.
+    """
+    try:
+        cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_KEY, 1, None)
+
+
+def get_index():
+    """
+    Return the in-process trigram index of approved resources, rebuilding
+    it if it is stale.
+    """
+    global _index, _index_version
+    version = cache.get(INDEX_VERSION_KEY, 0)
+    with _index_lock:
+        if _index is None or _index_version != version:
+            with connection.cursor() as cursor:
+                cursor.execute(APPROVED_KEYWORD_SQL.format(
+                    select='ti.object_id, t.name',
+                    table=Resource._meta.db_table))
+                keyword_rows = cursor.fetchall()
+            _index = TrigramIndex(
+                Resource.objects.filter(approved=True).values_list(
+                    'pk', 'name').iterator(),
+                keyword_rows,
+            )
+            _index_version = version
+        return _index
+
+
+@receiver(connection_created)
+def set_trigram_threshold(sender, connection, **kwargs):
+    """
+    Use the configured similarity threshold for ``pg_trgm`` operators.
+    """
+    if connection.vendor == 'postgresql':
+        threshold = similarity_threshold()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SET pg_trgm.similarity_threshold = %s; '
+                'SET pg_trgm.strict_word_similarity_threshold = %s',
+                [threshold, threshold])
+
+
+def fuzzy_search(resources, query, search_in):
+    """
+    Filter resources whose names or keywords are similar to a query.
+
+    Matching resources are annotated with ``search_rank``, their
+    similarity to the query (higher is better).
+
+    :param resources: A queryset of :model:`Resource` objects.
+    :param query: The search query string.
+    :param search_in: A list of fields to search within
+    (name, keywords).
+    """
+    names = 'name' in search_in
+    keywords = 'keywords' in search_in
+    query = ' '.join(words(query)[:MAX_WORDS])
+    if not query or not (names or keywords):
+        return _no_results(resources)
+    if connection.vendor == 'postgresql':
+        return _postgresql_search(resources, query, names, keywords)
+    groups = get_index().search(
+        query, names=names, keywords=keywords,
+        threshold=similarity_threshold())
+    candidates = ((pk, score) for score, ids in groups for pk in ids)
+    # The best candidates are looked up among the resources first, in
+    # slices widened until enough of them pass the filters of the caller
+    scores = {}
+    size = MAX_RESULTS
+    while len(scores) < MAX_RESULTS:
+        candidate_slice = dict(itertools.islice(candidates, size))
+        if not candidate_slice:
+            break
+        for pk in resources.filter(pk__in=candidate_slice).values_list(
+                'pk', flat=True):
+            scores[pk] = candidate_slice[pk]
+        size *= 2
+    scores = {
+        pk: scores[pk]
+        for pk in heapq.nlargest(MAX_RESULTS, scores, key=scores.get)
+    }
+    if not scores:
+        return _no_results(resources)
+    return resources.filter(pk__in=scores).annotate(search_rank=Case(
+        *[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    ))
+
+
+def _no_results(resources):
+    # An empty queryset with the same annotation as the search results
+    return resources.annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    ).none()
+
+
+def _postgresql_search(resources, query, names, keywords):
+    # <<% uses the trigram GIN indexes on resource and keyword names
+    conditions, ranks, params = [], [], []
+    if names:
+        conditions.append('%s <<%% resources_resource.name')
+        ranks.append('strict_word_similarity(%s, resources_resource.name)')
+        params.append(query)
+    if keywords:
+        keyword_sql = KEYWORD_SQL + ' AND ti.object_id = resources_resource.id'
+        conditions.append(
+            'EXISTS (' + keyword_sql.format(select='1') +
+            ' AND %s <<%% t.name)')
+        ranks.append(
+            'coalesce((' + keyword_sql.format(
+                select='max(strict_word_similarity(%s, t.name))') +
+            '), 0)')
+        params.append(query)
+    return resources.filter(RawSQL(
+        ' OR '.join(conditions), params, output_field=BooleanField(),
+    )).annotate(search_rank=RawSQL(
+        'greatest(' + ', '.join(ranks) + ')', params,
+        output_field=FloatField(),
+    ))
+
+
+def suggest_query(query):
+    """
+    Suggest a corrected query from the words of names and keywords.
+
+    :param query: The search query string.
+    :returns: The suggested query, or ``None`` if no word was corrected.
+    """
+    query_words = words(query)[:MAX_WORDS]
+    threshold = similarity_threshold()
+    suggested = []
+    for word in query_words:
+        if connection.vendor == 'postgresql':
+            suggestion = _postgresql_suggest(word, threshold)
+        else:
+            suggestion = get_index().suggest(word, threshold)
+        suggested.append(suggestion or word)
+    if suggested == query_words:
+        return None
+    return ' '.join(suggested)
+
+
+def _postgresql_suggest(word, threshold):
+    # Candidate names and keywords of approved resources come from the
+    # trigram indexes, the most similar word within them is picked here
+    table = Resource._meta.db_table
+    keyword_sql = APPROVED_KEYWORD_SQL.format(select='1', table=table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '(SELECT name FROM taggit_tag WHERE %s <<%% name '
+            ' AND EXISTS (' + keyword_sql + ' AND ti.tag_id = taggit_tag.id)'
+            ' ORDER BY strict_word_similarity(%s, name) DESC LIMIT 5) '
+            'UNION ALL '
+            '(SELECT name FROM ' + table + ' WHERE %s <<%% name '
+            ' AND approved'
+            ' ORDER BY strict_word_similarity(%s, name) DESC LIMIT 5)',
+            [word, word, word, word])
+        candidates = {
+            candidate
+            for (name,) in cursor.fetchall()
+            for candidate in words(name)
+        }
+    grams = trigrams(word)
+    scored = [
+        (similarity(grams, trigrams(candidate)), candidate)
+        for candidate in candidates
+    ]
+    scored = [item for item in scored if item[0] >= threshold]
+    return max(scored)[1] if scored else None
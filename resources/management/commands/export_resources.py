@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from resources.export import EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    """
+    Export the approved catalog as CSV or JSON Lines.
+
+    Rows are written as they are read from the database, so memory use
+    stays flat whatever the size of the catalog.
+    """
+    help = 'Export approved resources as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=list(EXPORT_FORMATS), default='csv',
+            help='Format of the export.')
+        parser.add_argument(
+            '--output',
+            help='Path of the file to write, standard output by default.')
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Number of resources to fetch per query.')
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['format'], options['batch_size'])
+        if options['output']:
+            # The csv module writes its own line endings
+            with open(options['output'], 'w', newline='') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,366 @@
+import csv
+import io
+import json
+import os
+import time
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from taggit.models import Tag, TaggedItem
+from resources import fuzzy
+from resources.cache import (
+    bump_content_version, invalidate_category_list,
+    invalidate_category_listings,
+)
+from resources.canonical import canonicalize_url, name_key, url_hash
+from resources.models import Category, Resource
+from resources.search import index_resources
+from resources.utils import update_favorites_count
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on')
+URL_MAX_LENGTH = Resource._meta.get_field('url').max_length
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+# The validator of the URL field of the submission form
+validate_url = URLValidator()
+
+
+def split_list(value):
+    """
+    Return a list of names from a JSON list or a comma separated string.
+
+    :param value: The value of a ``keywords`` or ``favorites`` field.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+class Command(BaseCommand):
+    """
+    Import resources from a JSON Lines or CSV file.
+
+    The file is streamed and imported in batches, each inserted with
+    ``bulk_create`` in its own transaction, so memory stays bounded
+    whatever the size of the file. Every row has a ``name``, ``url`` and
+    ``category``, and optionally a ``description``, ``uploader``,
+    ``keywords``, ``favorites`` and ``approved``. In CSV files keywords
+    and favorites are comma separated.
+
+    Missing categories and users are created. Rows without a valid URL,
+    or with usernames or keywords too long for their fields, are skipped
+    as invalid, and rows whose canonical URL or case-folded name matches
+    an existing resource or an earlier row as duplicates.
+
+    The position after the last committed batch is written to a checkpoint
+    file, and running the command again after a crash resumes from it.
+    """
+    help = 'Import resources from a JSON Lines or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the file to import.')
+        parser.add_argument(
+            '--format', choices=['jsonl', 'csv'],
+            help='Format of the file, guessed from its extension by default.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows to import per transaction.')
+        parser.add_argument(
+            '--uploader',
+            help='Username of the uploader of rows without one.')
+        parser.add_argument(
+            '--approved', action='store_true',
+            help='Approve the resources of rows without an approved field.')
+        parser.add_argument(
+            '--checkpoint',
+            help='Path of the checkpoint file, the imported file followed '
+                 'by .checkpoint by default.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore the checkpoint and import from the first row.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'File "{path}" does not exist.')
+        file_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl')
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        self.batch_size = options['batch_size']
+        self.default_uploader = options['uploader']
+        self.approved = options['approved']
+        self.content_type = ContentType.objects.get_for_model(Resource)
+        self.counts = {'imported': 0, 'duplicates': 0, 'invalid': 0}
+
+        position = {'rows': 0, 'offset': 0, 'categories': []}
+        if os.path.exists(checkpoint_path) and not options['restart']:
+            with open(checkpoint_path) as f:
+                position = json.load(f)
+            self.stdout.write(f'Resuming after row {position["rows"]}.')
+        # Categories of every batch so far, including those committed
+        # before a crash, have their cached listings invalidated
+        self.category_ids = set(position['categories'])
+        start_rows = position['rows']
+        start = time.monotonic()
+        with open(path, 'rb') as f:
+            rows = self.read_rows(f, file_format, position)
+            while True:
+                batch = []
+                for row, offset in rows:
+                    batch.append(row)
+                    if len(batch) == self.batch_size:
+                        break
+                if not batch:
+                    break
+                self.import_batch(batch)
+                # Only committed batches are skipped when resuming
+                position = {
+                    'rows': position['rows'] + len(batch),
+                    'offset': offset,
+                    'categories': sorted(self.category_ids),
+                }
+                self.write_checkpoint(checkpoint_path, position)
+                rate = self.rate(position['rows'] - start_rows, start)
+                self.stdout.write(
+                    f'{position["rows"]} rows read, '
+                    f'{self.counts["imported"]} imported ({rate:.0f} rows/s).')
+        self.finish()
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.monotonic() - start
+        rate = self.rate(position['rows'] - start_rows, start)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.counts["imported"]} resources, skipped '
+            f'{self.counts["duplicates"]} duplicates and '
+            f'{self.counts["invalid"]} invalid rows in {elapsed:.1f}s '
+            f'({rate:.0f} rows/s).'))
+
+    def rate(self, rows, start):
+        # Rows per second since the start of the import
+        return rows / max(time.monotonic() - start, 1e-6)
+
+    def read_rows(self, f, file_format, position):
+        """
+        Yield the rows of a file after a position with the position
+        following each of them.
+
+        JSON Lines files are resumed by seeking to the byte offset, CSV
+        files, whose quoted values may span lines, by skipping rows.
+        """
+        if file_format == 'jsonl':
+            f.seek(position['offset'])
+            for line in iter(f.readline, b''):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield row if isinstance(row, dict) else None, f.tell()
+        else:
+            text = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+            for i, row in enumerate(csv.DictReader(text)):
+                if i >= position['rows']:
+                    yield row, 0
+
+    def write_checkpoint(self, path, position):
+        # Replace the checkpoint atomically so a crash never leaves it
+        # half written
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(position, f)
+        os.replace(f'{path}.tmp', path)
+
+    def import_batch(self, rows):
+        """
+        Import a batch of rows in a single transaction.
+
+        :param rows: A list of row dicts, ``None`` for unparseable rows.
+        """
+        valid = []
+        for row in rows:
+            row = self.clean_row(row)
+            if row is None:
+                self.counts['invalid'] += 1
+            else:
+                valid.append(row)
+        with transaction.atomic():
+            valid = self.exclude_duplicates(valid)
+            if not valid:
+                return
+            users = self.get_users({
+                username for row in valid
+                for username in [row['uploader'], *row['favorites']]
+            })
+            categories = self.get_categories(valid, users)
+            resources = Resource.objects.bulk_create([
+                Resource(
+                    name=row['name'],
+                    description=row['description'],
+                    url=row['url'],
+                    category_id=categories[row['category'].lower()],
+                    uploader_id=users[row['uploader']],
+                    approved=row['approved'],
+                    # bulk_create bypasses save(), which sets these
+                    canonical_url=row['canonical_url'],
+                    url_hash=row['url_hash'],
+                    name_key=row['name_key'],
+                )
+                for row in valid
+            ])
+            self.add_keywords(resources, valid)
+            self.add_favorites(resources, valid, users)
+            resource_ids = [resource.pk for resource in resources]
+            update_favorites_count(resource_ids)
+            index_resources(resource_ids)
+        self.category_ids.update(categories.values())
+        self.counts['imported'] += len(resources)
+
+    def clean_row(self, row):
+        # Normalize a row, or return None if it lacks a required field or
+        # a value doesn't fit its field, which would fail the whole batch
+        # again on every resume
+        if not row:
+            return None
+        name = str(row.get('name') or '').strip()
+        url = str(row.get('url') or '').strip()
+        category = str(row.get('category') or '').strip()
+        uploader = str(row.get('uploader') or '').strip() or \
+            self.default_uploader
+        if not (name and url and category and uploader):
+            return None
+        keywords = split_list(row.get('keywords'))[:50]
+        favorites = split_list(row.get('favorites'))
+        if (
+            len(url) > URL_MAX_LENGTH
+            or any(len(username) > USERNAME_MAX_LENGTH
+                   for username in [uploader, *favorites])
+            or any(len(keyword) > TAG_MAX_LENGTH for keyword in keywords)
+        ):
+            return None
+        try:
+            validate_url(url)
+        except ValidationError:
+            return None
+        approved = row.get('approved')
+        if approved is None or approved == '':
+            approved = self.approved
+        elif isinstance(approved, str):
+            approved = approved.strip().lower() in TRUE_VALUES
+        canonical_url = canonicalize_url(url)
+        return {
+            'name': name[:200],
+            'description': str(row.get('description') or ''),
+            'url': url,
+            'category': category[:100],
+            'uploader': uploader,
+            'approved': bool(approved),
+            'keywords': keywords,
+            'favorites': favorites,
+            'canonical_url': canonical_url,
+            'url_hash': url_hash(canonical_url),
+            'name_key': name_key(name[:200]),
+        }
+
+    def exclude_duplicates(self, rows):
+        # Drop rows matching an existing resource or an earlier row
+        existing = Resource.objects.filter(
+            Q(url_hash__in=[row['url_hash'] for row in rows]) |
+            Q(name_key__in=[row['name_key'] for row in rows])
+        ).values_list('url_hash', 'name_key')
+        seen_urls, seen_names = set(), set()
+        for existing_url, existing_name in existing:
+            seen_urls.add(existing_url)
+            seen_names.add(existing_name)
+        unique = []
+        for row in rows:
+            if row['url_hash'] in seen_urls or row['name_key'] in seen_names:
+                self.counts['duplicates'] += 1
+                continue
+            seen_urls.add(row['url_hash'])
+            seen_names.add(row['name_key'])
+            unique.append(row)
+        return unique
+
+    def get_users(self, usernames):
+        # Map usernames to user IDs, creating missing users without a
+        # usable password
+        users = dict(User.objects.filter(
+            username__in=usernames).values_list('username', 'pk'))
+        missing = [
+            User(username=username, password='!')
+            for username in usernames if username not in users
+        ]
+        for user in User.objects.bulk_create(missing):
+            users[user.username] = user.pk
+        return users
+
+    def get_categories(self, rows, users):
+        # Map lowercase category names to category IDs, creating missing
+        # categories authored by the uploader of their first row
+        names = {row['category'].lower(): row for row in reversed(rows)}
+        categories = {}
+        for pk, lower in Category.objects.annotate(
+            name_lower=Lower('name')
+        ).filter(name_lower__in=names).values_list('pk', 'name_lower'):
+            categories.setdefault(lower, pk)
+        missing = [
+            Category(
+                name=row['category'],
+                author_id=users[row['uploader']],
+                published=row['approved'],
+            )
+            for lower, row in names.items() if lower not in categories
+        ]
+        for category in Category.objects.bulk_create(missing):
+            categories[category.name.lower()] = category.pk
+        return categories
+
+    def add_keywords(self, resources, rows):
+        # Match keywords to tags case-insensitively like taggit does with
+        # TAGGIT_CASE_INSENSITIVE
+        names = {}
+        for row in rows:
+            for keyword in row['keywords']:
+                names.setdefault(keyword.lower(), keyword)
+        if not names:
+            return
+        tags = {}
+        for tag in Tag.objects.annotate(
+            name_lower=Lower('name')
+        ).filter(name_lower__in=names):
+            tags.setdefault(tag.name_lower, tag.pk)
+        for lower, name in names.items():
+            if lower not in tags:
+                # save() generates a unique slug, which bulk_create doesn't
+                tags[lower] = Tag.objects.create(name=name).pk
+        TaggedItem.objects.bulk_create([
+            TaggedItem(
+                content_type=self.content_type,
+                object_id=resource.pk,
+                tag_id=tags[lower],
+            )
+            for resource, row in zip(resources, rows)
+            for lower in {keyword.lower() for keyword in row['keywords']}
+        ], ignore_conflicts=True)
+
+    def add_favorites(self, resources, rows, users):
+        Favorite = Resource.favorites.through
+        Favorite.objects.bulk_create([
+            Favorite(resource_id=resource.pk, user_id=users[username])
+            for resource, row in zip(resources, rows)
+            for username in set(row['favorites'])
+        ], ignore_conflicts=True)
+
+    def finish(self):
+        # bulk_create sends no signals, so invalidate once for the import
+        fuzzy.invalidate_index()
+        invalidate_category_list()
+        invalidate_category_listings(self.category_ids)
+        bump_content_version()
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from resources.models import Resource
+from resources.search import index_resources
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the full-text search documents of every resource.
+
+    Resources are indexed in batches of primary keys so each statement only
+    touches a bounded number of rows.
+    """
+    help = 'Rebuild the full-text search index of resources.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of resources to index per statement.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        indexed = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Resource.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            index_resources(ids)
+            indexed += len(ids)
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} resources.'))
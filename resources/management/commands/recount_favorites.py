@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from resources.models import Resource
+from resources.utils import update_favorites_count
+
+
+class Command(BaseCommand):
+    """
+    Backfill or repair the stored favorites count of every resource.
+
+    Resources are recounted in batches of primary keys so each UPDATE only
+    locks a bounded number of rows.
+    """
+    help = 'Recount Resource.favorites_count from the favorites relation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of resources to recount per UPDATE.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Resource.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += update_favorites_count(ids)
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted favorites for {updated} resources.'))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.26 on 2026-10-18 10:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_favorites_count(apps, schema_editor):
+    # Count the existing favorites of every resource in a single UPDATE
+    Resource = apps.get_model('resources', 'Resource')
+    favorites = Resource.favorites.through.objects.filter(
+        resource=OuterRef('pk')
+    ).order_by().values('resource').annotate(
+        count=Count('*')
+    ).values('count')
+    Resource.objects.update(
+        favorites_count=Coalesce(Subquery(favorites), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0004_resource_favorites'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_favorites_count,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from resources import search
+
+
+def install_search(apps, schema_editor):
+    # tsvector column and GIN index on PostgreSQL, FTS5 table on SQLite
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('resources', '0005_resource_favorites_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
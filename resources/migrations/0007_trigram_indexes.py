@@ -0,0 +1,33 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Other databases use the in-process trigram index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX resources_resource_name_trgm '
+        'ON resources_resource USING gin (name gin_trgm_ops)')
+    schema_editor.execute(
+        'CREATE INDEX resources_taggit_tag_name_trgm '
+        'ON taggit_tag USING gin (name gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX resources_resource_name_trgm')
+    schema_editor.execute('DROP INDEX resources_taggit_tag_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0006_resource_search_document'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.26 on 2026-10-18 10:32
+
+from django.db import migrations, models
+from resources.canonical import canonicalize_url, name_key, url_hash
+
+
+def backfill_duplicate_keys(apps, schema_editor):
+    # Compute the keys of existing resources. Resources duplicating an
+    # older one keep empty keys, so the unique constraints can be added
+    Resource = apps.get_model('resources', 'Resource')
+    seen_urls, seen_names, batch = set(), set(), []
+    for resource in Resource.objects.order_by('pk').only(
+            'pk', 'url', 'name').iterator(chunk_size=1000):
+        resource.canonical_url = canonicalize_url(resource.url)
+        resource.url_hash = url_hash(resource.canonical_url)
+        resource.name_key = name_key(resource.name)
+        if resource.url_hash in seen_urls:
+            resource.url_hash = None
+        if resource.name_key in seen_names:
+            resource.name_key = None
+        seen_urls.add(resource.url_hash)
+        seen_names.add(resource.name_key)
+        batch.append(resource)
+        if len(batch) >= 1000:
+            Resource.objects.bulk_update(
+                batch, ['canonical_url', 'url_hash', 'name_key'])
+            batch = []
+    Resource.objects.bulk_update(
+        batch, ['canonical_url', 'url_hash', 'name_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0007_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='canonical_url',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='name_key',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='url_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_duplicate_keys,
+                             migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='resource',
+            name='name_key',
+            field=models.TextField(editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='url_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.26 on 2026-10-18 10:35
+
+from django.db import migrations, models
+import django.db.models.functions.text
+import developer_toolkit.db.operations
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL builds the indexes concurrently, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('resources', '0008_resource_duplicate_keys'),
+    ]
+
+    operations = [
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='category',
+            index=models.Index(fields=['published', 'name'], name='category_published_name_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='category',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='category_name_lower_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='resource',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['category', 'name', 'id'], name='resource_category_name_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='resource',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['category', '-created_at', '-id'], name='resource_category_newest_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='resource',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['category', '-favorites_count', '-id'], name='resource_category_fav_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='resource',
+            index=models.Index(fields=['category', 'approved', 'created_at'], name='resource_category_approved_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='resource',
+            index=models.Index(condition=models.Q(('approved', False)), fields=['category', 'uploader'], name='resource_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.26 on 2026-10-18 10:41
+
+from django.db import migrations, models
+import developer_toolkit.db.operations
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL builds the indexes concurrently, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('resources', '0009_listing_indexes'),
+    ]
+
+    operations = [
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='resource',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['updated_at'], name='resource_updated_idx'),
+        ),
+        developer_toolkit.db.operations.AddIndexConcurrently(
+            model_name='resource',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['category', 'updated_at'], name='resource_category_updated_idx'),
+        ),
+    ]
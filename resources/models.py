@@ -1,10 +1,59 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from taggit.managers import TaggableManager
+from .canonical import canonicalize_url, name_key, url_hash
+
+
+class ChangeTrackingModel(models.Model):
+    """
+    Abstract model remembering the field values it was loaded with, so
+    signal receivers can tell which fields a save changed.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values so changes can be detected on save
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # The saved values are the ones later saves are compared with
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def loaded_value(self, field, default=None):
+        """
+        Return the value a field had when the object was loaded or last
+        saved, or ``default`` if it is not known.
+
+        :param field: The attribute name of the field.
+        """
+        return getattr(self, '_loaded_values', {}).get(field, default)
+
+    def has_changed(self, field):
+        """
+        Return whether a field differs from its loaded or last saved value.
+        Fields whose previous value is not known count as changed.
+
+        :param field: The attribute name of the field.
+        """
+        loaded_values = getattr(self, '_loaded_values', {})
+        return (field not in loaded_values or
+                loaded_values[field] != getattr(self, field))
 
 
 # Create your models here.
-class Resource(models.Model):
+class Resource(ChangeTrackingModel):
     """
     Model for a developer resource related to :model:`Category` by
     :model:`auth.User`.
@@ -23,6 +72,12 @@ class Resource(models.Model):
     been approved.
     - favorites (ManyToManyField): Many-to-many relationship with users who
     have favorited the resource.
+    - favorites_count (PositiveIntegerField): The number of users who have
+    favorited the resource, kept in sync with ``favorites`` by signals.
+    - canonical_url (TextField): The URL without its scheme, ``www.``
+    prefix, trailing slashes and tracking parameters.
+    - url_hash (CharField): The unique SHA-256 hash of ``canonical_url``.
+    - name_key (TextField): The unique case-folded name.
     """
     name = models.CharField(max_length=200)
     description = models.TextField()
@@ -41,13 +96,78 @@ class Resource(models.Model):
     favorites = models.ManyToManyField(User,
                                        related_name='favorite_resources',
                                        blank=True)
+    # Denormalized favorites count used for sorting and display
+    favorites_count = models.PositiveIntegerField(default=0,
+                                                  editable=False,
+                                                  db_index=True)
+    # Canonical URL and name, unique to reject duplicate resources
+    canonical_url = models.TextField(editable=False, blank=True)
+    url_hash = models.CharField(max_length=64,
+                                unique=True,
+                                null=True,
+                                editable=False)
+    name_key = models.TextField(unique=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Approved resources of a category in each listing order, as
+            # partial indexes which match the approved filter on every
+            # database
+            models.Index(fields=['category', 'name', 'id'],
+                         condition=models.Q(approved=True),
+                         name='resource_category_name_idx'),
+            models.Index(fields=['category', '-created_at', '-id'],
+                         condition=models.Q(approved=True),
+                         name='resource_category_newest_idx'),
+            models.Index(fields=['category', '-favorites_count', '-id'],
+                         condition=models.Q(approved=True),
+                         name='resource_category_fav_idx'),
+            # Newest update of the approved resources, overall and per
+            # category, for conditional requests
+            models.Index(fields=['updated_at'],
+                         condition=models.Q(approved=True),
+                         name='resource_updated_idx'),
+            models.Index(fields=['category', 'updated_at'],
+                         condition=models.Q(approved=True),
+                         name='resource_category_updated_idx'),
+            # Approved counts and newest dates of the homepage categories
+            models.Index(fields=['category', 'approved', 'created_at'],
+                         name='resource_category_approved_idx'),
+            # Resources of an uploader awaiting approval in a category
+            models.Index(fields=['category', 'uploader'],
+                         condition=models.Q(approved=False),
+                         name='resource_pending_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the duplicate detection keys in sync with the URL and name
+        deferred = self.get_deferred_fields()
+        if 'url' not in deferred:
+            self.canonical_url = canonicalize_url(self.url)
+            self.url_hash = self._duplicate_key(
+                'url_hash', url_hash(self.canonical_url))
+        if 'name' not in deferred:
+            self.name_key = self._duplicate_key(
+                'name_key', name_key(self.name))
+        super().save(*args, **kwargs)
+
+    def _duplicate_key(self, field, key):
+        # Duplicates predating the unique keys were left without them by
+        # migration 0008, and keep none while they still clash
+        if (
+            self.pk is not None and getattr(self, field) is None
+            and Resource.objects.filter(**{field: key}).exclude(
+                pk=self.pk).exists()
+        ):
+            return None
+        return key
 
     def __str__(self):
         # Return the name of the resource
         return self.name
 
 
-class Category(models.Model):
+class Category(ChangeTrackingModel):
     """
     Model for a resource category related to :model:`auth.User`.
 
@@ -66,6 +186,13 @@ class Category(models.Model):
     class Meta:
         # Set plural name for the Category model
         verbose_name_plural = "Categories"
+        indexes = [
+            # Published categories ordered by name
+            models.Index(fields=['published', 'name'],
+                         name='category_published_name_idx'),
+            # Case-insensitive name lookups
+            models.Index(Lower('name'), name='category_name_lower_idx'),
+        ]
 
     def __str__(self):
         # Return the name of the category
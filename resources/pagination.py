@@ -0,0 +1,204 @@
+import base64
+import json
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from developer_toolkit.serialization import json_default
+
+CURSOR_PARAM = 'cursor'
+
+
+class KeysetPage:
+    """
+    A page of results fetched by keyset (cursor) pagination.
+
+    Attributes:
+    - items (list): The objects on the page.
+    - has_next (bool): Whether a page follows this one.
+    - has_previous (bool): Whether a page precedes this one.
+    - next_cursor (str): The cursor of the following page.
+    - previous_cursor (str): The cursor of the preceding page.
+    - next_query (str): The query string of the following page.
+    - previous_query (str): The query string of the preceding page.
+    """
+
+    def __init__(self, items, has_next, has_previous, ordering, params):
+        self.items = items
+        self.has_next = has_next and bool(items)
+        self.has_previous = has_previous and bool(items)
+        self.next_cursor = self.previous_cursor = None
+        self.next_query = self.previous_query = ''
+        if self.has_next:
+            self.next_cursor = encode_cursor('next', items[-1], ordering)
+            self.next_query = _query(params, self.next_cursor)
+        if self.has_previous:
+            self.previous_cursor = encode_cursor(
+                'previous', items[0], ordering)
+            self.previous_query = _query(params, self.previous_cursor)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+
+def _query(params, cursor):
+    params = params.copy()
+    params[CURSOR_PARAM] = cursor
+    return params.urlencode()
+
+
+def get_ordering(queryset):
+    """
+    Return the ordering of a queryset as ``(field, descending)`` pairs.
+
+    The primary key is appended as a tie-breaker when the ordering does
+    not already end with it, so every position in the ordering is unique.
+
+    :param queryset: An ordered queryset.
+    """
+    ordering = []
+    for field in queryset.query.order_by or ('-pk',):
+        ordering.append((field.lstrip('-'), field.startswith('-')))
+    if ordering[-1][0] not in ('id', 'pk'):
+        ordering.append(('id', ordering[-1][1]))
+    return ordering
+
+
+def encode_cursor(direction, obj, ordering):
+    """
+    Encode the position of an object in an ordering as an opaque cursor.
+
+    :param direction: ``'next'`` to continue after the object or
+    ``'previous'`` to continue before it.
+    :param obj: The object at the edge of the current page.
+    :param ordering: The ``(field, descending)`` pairs of the ordering.
+    """
+    values = [getattr(obj, field) for field, _ in ordering]
+    data = json.dumps([direction, values], default=json_default)
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor, queryset, ordering):
+    """
+    Decode a cursor into its direction and the values of its position.
+
+    :returns: A ``(direction, values)`` pair, or ``None`` if the cursor is
+    missing or invalid.
+    """
+    if not cursor:
+        return None
+    try:
+        direction, values = json.loads(base64.urlsafe_b64decode(cursor))
+        if (direction not in ('next', 'previous') or
+                len(values) != len(ordering)):
+            return None
+        opts = queryset.model._meta
+        decoded = []
+        for (field, _), value in zip(ordering, values):
+            try:
+                # Convert serialized values such as dates back to Python
+                value = opts.get_field(field).to_python(value)
+            except FieldDoesNotExist:
+                pass
+            decoded.append(value)
+    except (ValueError, TypeError, ValidationError):
+        return None
+    return direction, decoded
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Build the condition selecting rows after a position in an ordering.
+
+    For an ordering ``(a, b)`` this is ``a > x OR (a = x AND b > y)``, with
+    each comparison flipped for descending fields.
+
+    :param ordering: The ``(field, descending)`` pairs of the ordering.
+    :param values: The values of the position.
+    :param reverse: Select the rows before the position instead.
+    """
+    condition = Q()
+    for i, (field, descending) in enumerate(ordering):
+        lookup = 'lt' if descending != reverse else 'gt'
+        equal = {f: v for (f, _), v in zip(ordering[:i], values[:i])}
+        condition |= Q(**equal, **{f'{field}__{lookup}': values[i]})
+    return condition
+
+
+def paginate_keyset(request, queryset, per_page=None, params=None):
+    """
+    Fetch one page of an ordered queryset using keyset pagination.
+
+    Pages are selected with a condition on the ordering fields instead of
+    an OFFSET, so a deep page costs the same as the first one.
+
+    :param request: The HTTP request object containing the cursor.
+    :param queryset: An ordered queryset.
+    :param per_page: The number of objects per page, defaulting to the
+    ``RESOURCES_PER_PAGE`` setting.
+    :param params: The query parameters kept in the page links, defaulting
+    to those of the request.
+    :returns: A :class:`KeysetPage`.
+    """
+    page_queryset, make_page = _keyset_query(
+        request, queryset, per_page, params)
+    return make_page(list(page_queryset))
+
+
+async def apaginate_keyset(request, queryset, per_page=None, params=None):
+    """
+    Fetch one page of an ordered queryset using keyset pagination, with
+    the async ORM. See :func:`paginate_keyset`.
+    """
+    page_queryset, make_page = _keyset_query(
+        request, queryset, per_page, params)
+    return make_page([obj async for obj in page_queryset])
+
+
+def _keyset_query(request, queryset, per_page, params):
+    # Return the query fetching a page and one more object, and a
+    # function building the page from its results
+    per_page = per_page or getattr(settings, 'RESOURCES_PER_PAGE', 20)
+    ordering = get_ordering(queryset)
+    params = (request.GET if params is None else params).copy()
+    params.pop(CURSOR_PARAM, None)
+    cursor = decode_cursor(
+        request.GET.get(CURSOR_PARAM), queryset, ordering)
+    if cursor is None:
+        return (
+            queryset.order_by(*_order_by(ordering))[:per_page + 1],
+            lambda items: KeysetPage(
+                items[:per_page], len(items) > per_page, False, ordering,
+                params),
+        )
+    direction, values = cursor
+    if direction == 'next':
+        return (
+            queryset.filter(
+                keyset_filter(ordering, values)
+            ).order_by(*_order_by(ordering))[:per_page + 1],
+            lambda items: KeysetPage(
+                items[:per_page], len(items) > per_page, True, ordering,
+                params),
+        )
+    # Walk the ordering backwards and restore the order of the page
+    return (
+        queryset.filter(
+            keyset_filter(ordering, values, reverse=True)
+        ).order_by(*_order_by(ordering, reverse=True))[:per_page + 1],
+        lambda items: KeysetPage(
+            items[:per_page][::-1], True, len(items) > per_page, ordering,
+            params),
+    )
+
+
+def _order_by(ordering, reverse=False):
+    return [
+        f'-{field}' if descending != reverse else field
+        for field, descending in ordering
+    ]
@@ -0,0 +1,264 @@
+"""
+Full-text search over resources.
+
+Every resource has a precomputed search document built from its name,
+description and keywords. On PostgreSQL the document is a weighted
+``tsvector`` column on ``resources_resource`` with a GIN index, on SQLite
+it is a row in an FTS5 virtual table keyed by the resource ID.
+"""
+import re
+import threading
+from contextlib import contextmanager
+from django.db import connection
+from django.db.models import BooleanField, FloatField, TextField, Value
+from django.db.models.expressions import RawSQL
+
+# Searchable fields, their PostgreSQL weights and SQLite bm25 weights
+SEARCH_FIELDS = {
+    'name': ('A', 10.0),
+    'description': ('B', 4.0),
+    'keywords': ('C', 2.0),
+}
+FTS_TABLE = 'resources_resource_fts'
+# Control characters marking highlighted terms in snippets
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+MAX_TERMS = 10
+
+# Space separated keyword names of each resource
+KEYWORDS_SQL = """
+    SELECT {concat}
+    FROM taggit_taggeditem ti
+    JOIN taggit_tag t ON t.id = ti.tag_id
+    JOIN django_content_type ct ON ct.id = ti.content_type_id
+    WHERE ct.app_label = 'resources' AND ct.model = 'resource'
+    AND ti.object_id = r.id
+"""
+
+
+def install(conn):
+    """
+    Create the search document storage and index all resources.
+
+    :param conn: The database connection to install into.
+    """
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(
+                'ALTER TABLE resources_resource '
+                'ADD COLUMN search_document tsvector')
+            cursor.execute(
+                'CREATE INDEX resources_resource_search_gin '
+                'ON resources_resource USING gin (search_document)')
+        elif conn.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                "name, description, keywords, tokenize='porter unicode61')")
+    index_resources(conn=conn)
+
+
+def uninstall(conn):
+    """
+    Drop the search document storage.
+
+    :param conn: The database connection to uninstall from.
+    """
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(
+                'ALTER TABLE resources_resource DROP COLUMN search_document')
+        elif conn.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_indexing():
+    """
+    Index the resources scheduled by :func:`schedule_index` in a block once
+    at its end, instead of once per change.
+
+    Saving a resource and then its keywords would otherwise rebuild its
+    search document on the save and again on each change of keywords.
+    Nothing is indexed if the block raises, as its transaction is rolled
+    back.
+    """
+    if getattr(_deferred, 'resource_ids', None) is not None:
+        # Indexed at the end of the outer block
+        yield
+        return
+    _deferred.resource_ids = set()
+    try:
+        yield
+        resource_ids = _deferred.resource_ids
+    finally:
+        _deferred.resource_ids = None
+    index_resources(resource_ids)
+
+
+def schedule_index(resource_ids):
+    """
+    Rebuild the search documents of resources, at the end of the current
+    :func:`deferred_indexing` block if any, otherwise immediately.
+
+    :param resource_ids: The IDs of the :model:`Resource` objects to index.
+    """
+    pending = getattr(_deferred, 'resource_ids', None)
+    if pending is None:
+        index_resources(resource_ids)
+    else:
+        pending.update(resource_ids)
+
+
+def index_resources(resource_ids=None, conn=connection):
+    """
+    Rebuild the search documents of resources from their current data.
+
+    :param resource_ids: The IDs of the :model:`Resource` objects to index,
+    or ``None`` to index every resource.
+    :param conn: The database connection to use.
+    """
+    if resource_ids is not None:
+        resource_ids = list(resource_ids)
+        if not resource_ids:
+            return
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            keywords = KEYWORDS_SQL.format(concat="string_agg(t.name, ' ')")
+            sql = f"""
+                UPDATE resources_resource r SET search_document =
+                setweight(to_tsvector('english', r.name), 'A') ||
+                setweight(to_tsvector('english', r.description), 'B') ||
+                setweight(to_tsvector('english',
+                                      coalesce(({keywords}), '')), 'C')
+            """
+            if resource_ids is None:
+                cursor.execute(sql)
+            else:
+                cursor.execute(sql + ' WHERE r.id = ANY(%s)', [resource_ids])
+        elif conn.vendor == 'sqlite':
+            keywords = KEYWORDS_SQL.format(concat="group_concat(t.name, ' ')")
+            sql = f"""
+                INSERT INTO {FTS_TABLE}(rowid, name, description, keywords)
+                SELECT r.id, r.name, r.description, ({keywords})
+                FROM resources_resource r
+            """
+            if resource_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+                cursor.execute(sql)
+            else:
+                placeholders = ', '.join(['%s'] * len(resource_ids))
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} '
+                    f'WHERE rowid IN ({placeholders})', resource_ids)
+                cursor.execute(
+                    sql + f' WHERE r.id IN ({placeholders})', resource_ids)
+
+
+def unindex_resources(resource_ids, conn=connection):
+    """
+    Remove the search documents of deleted resources.
+
+    PostgreSQL documents are stored on the resource row itself and are
+    removed along with it.
+
+    :param resource_ids: The IDs of the deleted :model:`Resource` objects.
+    :param conn: The database connection to use.
+    """
+    resource_ids = list(resource_ids)
+    if conn.vendor == 'sqlite' and resource_ids:
+        placeholders = ', '.join(['%s'] * len(resource_ids))
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                resource_ids)
+
+
+def search_terms(query):
+    """
+    Split a user query into at most ``MAX_TERMS`` lowercase word terms.
+
+    :param query: The raw search query string.
+    """
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def full_text_search(resources, query, search_in):
+    """
+    Filter resources by a full-text query and rank them by relevance.
+
+    Every term of the query must match, as a prefix, a word in one of the
+    selected fields. Matching resources are annotated with ``search_rank``
+    (higher is better) and ``search_snippet``, an excerpt of the
+    description with matched terms wrapped in ``HIGHLIGHT_START`` and
+    ``HIGHLIGHT_END``.
+
+    :param resources: A queryset of :model:`Resource` objects.
+    :param query: The search query string.
+    :param search_in: A list of fields to search within
+    (name, description, keywords).
+    """
+    terms = search_terms(query)
+    fields = [field for field in SEARCH_FIELDS if field in search_in]
+    if not terms or not fields:
+        # An empty queryset with the same annotations as the results
+        return resources.annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Value('', output_field=TextField()),
+        ).none()
+    if connection.vendor == 'postgresql':
+        return _postgresql_search(resources, terms, fields)
+    return _sqlite_search(resources, terms, fields)
+
+
+def _postgresql_search(resources, terms, fields):
+    # Restrict the document to the weights of the selected fields
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    weights = '{%s}' % ','.join(SEARCH_FIELDS[f][0].lower() for f in fields)
+    document = 'ts_filter(resources_resource.search_document, %s)'
+    ts_query = "to_tsquery('english', %s)"
+    headline_options = (
+        f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_END}", '
+        'MaxWords=25, MinWords=10')
+    return resources.filter(RawSQL(
+        f'{document} @@ {ts_query}', [weights, tsquery],
+        output_field=BooleanField(),
+    )).annotate(
+        search_rank=RawSQL(
+            f'ts_rank({document}, {ts_query})', [weights, tsquery],
+            output_field=FloatField(),
+        ),
+        search_snippet=RawSQL(
+            f"ts_headline('english', resources_resource.description, "
+            f'{ts_query}, %s)', [tsquery, headline_options],
+            output_field=TextField(),
+        ),
+    )
+
+
+def _sqlite_search(resources, terms, fields):
+    # FTS5 column filter over a conjunction of prefix terms
+    match = '{%s} : (%s)' % (
+        ' '.join(fields),
+        ' AND '.join(f'"{term}"*' for term in terms),
+    )
+    weights = ', '.join(str(SEARCH_FIELDS[f][1]) for f in SEARCH_FIELDS)
+    correlated = (
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        f'AND {FTS_TABLE}.rowid = resources_resource.id')
+    return resources.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+    )).annotate(
+        # bm25 scores are negative, lower is better
+        search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) {correlated}', [match],
+            output_field=FloatField(),
+        ),
+        search_snippet=RawSQL(
+            f"SELECT snippet({FTS_TABLE}, 1, '{HIGHLIGHT_START}', "
+            f"'{HIGHLIGHT_END}', '…', 16) {correlated}", [match],
+            output_field=TextField(),
+        ),
+    )
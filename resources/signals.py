@@ -0,0 +1,215 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+from . import fuzzy
+from .cache import (
+    bump_content_version, bump_favorites_versions, invalidate_category_list,
+    invalidate_category_listings, invalidate_resource_details,
+)
+from .models import Category, Resource
+from .search import schedule_index, unindex_resources
+from .utils import update_favorites_count
+
+
+@receiver(m2m_changed, sender=Resource.favorites.through)
+def favorites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep ``Resource.favorites_count`` in sync with the favorites relation,
+    drop the cached details showing the old count and record the change
+    of the users' favorites.
+
+    Handles changes made from either side of the relation, e.g.
+    ``resource.favorites.add(user)`` and ``user.favorite_resources.clear()``.
+    """
+    if action == 'pre_clear':
+        # The cleared objects are unknown once the rows are deleted
+        if reverse:
+            instance._cleared_favorite_ids = list(
+                instance.favorite_resources.values_list('pk', flat=True)
+            )
+        else:
+            instance._cleared_favorite_ids = list(
+                instance.favorites.values_list('pk', flat=True)
+            )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_favorite_ids', [])
+    if reverse:
+        resource_ids, user_ids = pk_set, [instance.pk]
+    else:
+        resource_ids, user_ids = [instance.pk], pk_set
+    if resource_ids and user_ids:
+        update_favorites_count(resource_ids)
+        invalidate_resource_details(resource_ids)
+        invalidate_resource_listings(resource_ids)
+        bump_favorites_versions(user_ids)
+        bump_content_version()
+
+
+@receiver(pre_delete, sender=User)
+def remember_user_favorites(sender, instance, **kwargs):
+    """
+    Record the resources favorited by a user before the user is deleted.
+
+    Deleting a user cascades to the favorites relation without sending
+    ``m2m_changed``, so the affected counts are refreshed after deletion.
+    """
+    instance._deleted_favorite_ids = list(
+        instance.favorite_resources.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=User)
+def recount_user_favorites(sender, instance, **kwargs):
+    """
+    Refresh the favorites count of resources favorited by a deleted user.
+    """
+    resource_ids = getattr(instance, '_deleted_favorite_ids', [])
+    if resource_ids:
+        update_favorites_count(resource_ids)
+        invalidate_resource_details(resource_ids)
+        invalidate_resource_listings(resource_ids)
+        bump_content_version()
+
+
+def invalidate_resource_listings(resource_ids):
+    """
+    Bump the listing versions of the categories of resources whose
+    favorites changed, as the most favorited order depends on them.
+    """
+    invalidate_category_listings(
+        Resource.objects.filter(pk__in=resource_ids)
+        .values_list('category_id', flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=Resource)
+def index_saved_resource(sender, instance, created, **kwargs):
+    """
+    Rebuild the search documents of a created, edited or approved resource,
+    and the fuzzy search index when the approved names change.
+    """
+    schedule_index([instance.pk])
+    if created:
+        changed = instance.approved
+    else:
+        changed = instance.has_changed('approved') or (
+            instance.approved and instance.has_changed('name'))
+    if changed:
+        fuzzy.invalidate_index()
+
+
+@receiver(post_delete, sender=Resource)
+def unindex_deleted_resource(sender, instance, **kwargs):
+    """
+    Remove the search documents of a deleted resource.
+    """
+    unindex_resources([instance.pk])
+    if instance.approved:
+        fuzzy.invalidate_index()
+
+
+@receiver(m2m_changed, sender=Resource.keywords.through)
+def keywords_changed(sender, instance, action, **kwargs):
+    """
+    Rebuild the search documents and drop the cached detail of a resource
+    when its keywords change.
+    """
+    if (isinstance(instance, Resource) and
+            action in ('post_add', 'post_remove', 'post_clear')):
+        schedule_index([instance.pk])
+        if instance.approved:
+            fuzzy.invalidate_index()
+        invalidate_resource_details([instance.pk])
+        bump_content_version()
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def invalidate_resource_detail(sender, instance, **kwargs):
+    """
+    Drop the cached detail of an edited, approved or deleted resource.
+    """
+    invalidate_resource_details([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_resource_details(sender, instance, created,
+                                         **kwargs):
+    """
+    Drop the cached details showing the name of a renamed category.
+    """
+    if not created:
+        invalidate_resource_details(
+            instance.resources.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def invalidate_resource_category_listing(sender, instance, **kwargs):
+    """
+    Bump the listing version of the category of a changed resource, and of
+    the category it was moved from.
+    """
+    invalidate_category_listings([
+        instance.category_id,
+        instance.loaded_value('category_id', instance.category_id),
+    ])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_listing(sender, instance, **kwargs):
+    """
+    Bump the listing version of a changed category.
+    """
+    invalidate_category_listings([instance.pk])
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def invalidate_category_list_on_approval(sender, instance, **kwargs):
+    """
+    Drop the cached homepage categories when the approved resources they
+    count change, i.e. when a resource is approved or unapproved, or an
+    approved resource is added, moved or deleted.
+    """
+    if kwargs.get('created') or 'created' not in kwargs:
+        changed = instance.approved
+    else:
+        changed = instance.has_changed('approved') or (
+            instance.approved and instance.has_changed('category_id'))
+    if changed:
+        invalidate_category_list()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_list_on_publish(sender, instance, **kwargs):
+    """
+    Drop the cached homepage categories when a category is published,
+    unpublished or renamed, or a published category is deleted.
+    """
+    if kwargs.get('created') or 'created' not in kwargs:
+        changed = instance.published
+    else:
+        changed = instance.has_changed('published') or (
+            instance.published and instance.has_changed('name'))
+    if changed:
+        invalidate_category_list()
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def record_content_change(sender, instance, **kwargs):
+    """
+    Record a change to a resource or category for conditional requests.
+    """
+    bump_content_version()
@@ -0,0 +1,20 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from resources.search import HIGHLIGHT_END, HIGHLIGHT_START
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+    """
+    Escape a search snippet and wrap its matched terms in ``<mark>`` tags.
+
+    :param snippet: A snippet returned by the full-text search.
+    """
+    escaped = escape(snippet)
+    return mark_safe(
+        escaped.replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
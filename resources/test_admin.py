@@ -0,0 +1,161 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from . import fuzzy
+from .models import Category, Resource
+from .utils import published_categories
+
+
+class ResourceAdminTests(TestCase):
+    """The resource admin scales to many resources and users."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='pass')
+        self.category = Category.objects.create(
+            name='Python', author=self.admin, published=True
+        )
+        self.resources = [
+            Resource.objects.create(
+                name=f'R{i}',
+                description='d',
+                url=f'https://r{i}.com',
+                category=self.category,
+                uploader=User.objects.create_user(username=f'u{i}'),
+            )
+            for i in range(5)
+        ]
+        self.client.login(username='admin', password='pass')
+        self.url = reverse('admin:resources_resource_changelist')
+
+    def test_changelist_loads_related_objects_up_front(self):
+        """The change list costs the same whatever the number of rows."""
+        with CaptureQueriesContext(connection) as five:
+            self.client.get(self.url)
+        for i in range(5, 10):
+            Resource.objects.create(
+                name=f'R{i}', description='d', url=f'https://r{i}.com',
+                category=Category.objects.create(
+                    name=f'C{i}', author=self.admin),
+                uploader=User.objects.create_user(username=f'u{i}'),
+            )
+        with self.assertNumQueries(len(five)):
+            self.client.get(self.url)
+
+    def test_change_form_does_not_list_users(self):
+        """Users are picked without rendering a choice per user."""
+        response = self.client.get(reverse(
+            'admin:resources_resource_change', args=[self.resources[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, '>u4</option>')
+
+    def test_approve_and_reject_in_one_update(self):
+        """Bulk actions use a single UPDATE and refresh the caches."""
+        self.assertEqual(published_categories()[0].resource_count, 0)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'action': 'approve_resources',
+                '_selected_action': [r.pk for r in self.resources[:3]],
+            })
+        self.assertEqual(response.status_code, 302)
+        updates = [q for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            Resource.objects.filter(approved=True).count(), 3)
+        self.assertEqual(published_categories()[0].resource_count, 3)
+
+        self.client.post(self.url, {
+            'action': 'reject_resources',
+            '_selected_action': [self.resources[0].pk],
+        })
+        self.assertEqual(published_categories()[0].resource_count, 2)
+
+    def test_approved_resources_are_fuzzy_searchable(self):
+        """Bulk approval refreshes the typo-tolerant search index."""
+        resource = self.resources[0]
+        Resource.objects.filter(pk=resource.pk).update(name='Kubernetes')
+        search = fuzzy.fuzzy_search(
+            Resource.objects.filter(approved=True), 'kubernets', ['name'])
+        self.assertFalse(search.exists())
+
+        self.client.post(self.url, {
+            'action': 'approve_resources',
+            '_selected_action': [resource.pk],
+        })
+        search = fuzzy.fuzzy_search(
+            Resource.objects.filter(approved=True), 'kubernets', ['name'])
+        self.assertEqual(list(search), [resource])
+
+        self.client.post(self.url, {
+            'action': 'reject_resources',
+            '_selected_action': [resource.pk],
+        })
+        search = fuzzy.fuzzy_search(
+            Resource.objects.all(), 'kubernets', ['name'])
+        self.assertFalse(search.exists())
+
+    def test_pending_filter(self):
+        """Resources pending approval can be listed on their own."""
+        self.resources[0].approved = True
+        self.resources[0].save()
+        response = self.client.get(self.url, {'approved__exact': '0'})
+        self.assertNotContains(response, '>R0<')
+        self.assertContains(response, '>R1<')
+
+    def change(self, resource, **data):
+        return self.client.post(reverse(
+            'admin:resources_resource_change', args=[resource.pk]), {
+            'name': resource.name,
+            'description': resource.description,
+            'url': resource.url,
+            'category': resource.category_id,
+            'uploader': resource.uploader_id,
+            'keywords': 'a',
+            **data,
+        })
+
+    def test_duplicates_are_form_errors(self):
+        """Duplicate URLs and names are reported on the change form."""
+        response = self.change(
+            self.resources[1], url='http://www.r0.com/', name='r0')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'same URL already exists')
+        self.assertContains(response, 'same name already exists')
+
+    def test_legacy_duplicates_can_be_changed(self):
+        """Duplicates left without keys by the migration can be saved."""
+        legacy = self.resources[1]
+        Resource.objects.filter(pk=legacy.pk).update(
+            url='https://r0.com', url_hash=None)
+        legacy.refresh_from_db()
+        response = self.change(legacy, description='edited')
+        self.assertEqual(response.status_code, 302)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.description, 'edited')
+        self.assertIsNone(legacy.url_hash)
+
+
+class CategoryAdminTests(TestCase):
+    """Categories are published in bulk."""
+
+    def test_publish_in_bulk(self):
+        cache.clear()
+        admin = User.objects.create_superuser(
+            username='admin', password='pass')
+        for name in ['A', 'B']:
+            Category.objects.create(name=name, author=admin)
+        self.assertEqual(published_categories(), [])
+        self.client.login(username='admin', password='pass')
+        self.client.post(reverse('admin:resources_category_changelist'), {
+            'action': 'publish_categories',
+            '_selected_action': list(
+                Category.objects.values_list('pk', flat=True)),
+        })
+        self.assertEqual(
+            [category.name for category in published_categories()],
+            ['A', 'B'])
@@ -0,0 +1,121 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import Category, Resource
+
+
+class ApiTests(TestCase):
+    """The JSON API lists categories and approved resources."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.category = Category.objects.create(
+            name='Python', author=self.user, published=True
+        )
+        self.other_category = Category.objects.create(
+            name='Rust', author=self.user, published=True
+        )
+        Category.objects.create(
+            name='Draft', author=self.user, published=False
+        )
+        self.resources = []
+        for name in ['Django', 'Flask', 'Pyramid']:
+            resource = Resource.objects.create(
+                name=name,
+                description=f'{name} web framework',
+                url=f'https://{name.lower()}.com',
+                category=self.category,
+                uploader=self.user,
+                approved=True,
+            )
+            resource.keywords.add('web')
+            self.resources.append(resource)
+        self.tokio = Resource.objects.create(
+            name='Tokio', description='d', url='https://tokio.rs',
+            category=self.other_category, uploader=self.user, approved=True,
+        )
+        Resource.objects.create(
+            name='Pending', description='d', url='https://pending.com',
+            category=self.category, uploader=self.user, approved=False,
+        )
+        self.url = reverse('api_resource_list')
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_categories(self):
+        """Published categories are listed with their resource counts."""
+        data = self.get(
+            reverse('api_category_list'), fields='name,resource_count')
+        self.assertEqual(data['results'], [
+            {'name': 'Python', 'resource_count': 3},
+            {'name': 'Rust', 'resource_count': 1},
+        ])
+
+    def test_resources(self):
+        """Resources of a category are listed with all their fields."""
+        data = self.get(self.url, category=self.category.pk)
+        self.assertEqual(
+            [r['name'] for r in data['results']],
+            ['Django', 'Flask', 'Pyramid'])
+        self.assertEqual(data['results'][0]['uploader'], 'u1')
+        self.assertEqual(data['results'][0]['keywords'], ['web'])
+        self.assertEqual(
+            data['results'][0]['category'], self.category.pk)
+        self.assertIsNone(data['next'])
+
+    def test_sparse_fields_skip_joins(self):
+        """Selecting fields skips the uploader and keyword lookups."""
+        with self.assertNumQueries(2):
+            # The ETag aggregate and the page
+            data = self.get(self.url, fields='id,name,url', sort_by='newest')
+        self.assertEqual(data['results'][0], {
+            'id': self.tokio.pk,
+            'name': 'Tokio',
+            'url': 'https://tokio.rs',
+        })
+        with self.assertNumQueries(3):
+            # The keywords are prefetched for the whole page
+            self.get(self.url, fields='name,keywords')
+
+    def test_unknown_field(self):
+        """Unknown fields are rejected."""
+        response = self.client.get(self.url, {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['error'], 'Unknown fields: password.')
+
+    def test_cursor_pagination(self):
+        """Pages link to each other with cursors."""
+        first = self.get(self.url, fields='name', limit=2)
+        self.assertEqual(
+            [r['name'] for r in first['results']], ['Django', 'Flask'])
+        self.assertIsNone(first['previous'])
+        second = self.get(first['next'])
+        self.assertEqual(
+            [r['name'] for r in second['results']], ['Pyramid', 'Tokio'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            self.get(second['previous'])['results'], first['results'])
+
+    def test_search(self):
+        """Queries are searched and ranked like the search page."""
+        data = self.get(
+            self.url, q='flask', fields='name', **{'in': 'name'})
+        self.assertEqual(data['results'], [{'name': 'Flask'}])
+
+    def test_etag(self):
+        """Unchanged responses are answered with 304 Not Modified."""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.resources[0].keywords.add('python')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
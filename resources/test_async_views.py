@@ -0,0 +1,113 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+
+from . import async_views
+from .models import Category, Resource
+
+# The site with the listing pages served by the async views
+urlpatterns = [
+    path('', async_views.index, name='index'),
+    path('category/<int:category_id>/', async_views.category_detail,
+         name='category_detail'),
+    path('favorites/', async_views.view_favorites, name='view_favorites'),
+    path('search/', async_views.search_resources, name='search_resources'),
+    path('', include('developer_toolkit.urls')),
+]
+CSRF_TOKEN = re.compile(r'(csrf[\w-]*" (?:content|value)=)"[^"]*"')
+
+
+class AsyncViewTests(TestCase):
+    """The async listing views render the same pages as the sync ones."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.category = Category.objects.create(
+            name='Python', author=self.user, published=True
+        )
+        for i, name in enumerate(['Django', 'Flask', 'Pyramid']):
+            resource = Resource.objects.create(
+                name=name,
+                description=f'{name} is a web framework',
+                url=f'https://{name.lower()}.com',
+                category=self.category,
+                uploader=self.user,
+                approved=True,
+            )
+            if i:
+                resource.favorites.add(self.user)
+        Resource.objects.create(
+            name='Pending', description='d', url='https://pending.com',
+            category=self.category, uploader=self.user, approved=False,
+        )
+
+    def assert_same_page(self, url, status_code=200):
+        sync = self.client.get(url)
+        cache.clear()
+        with override_settings(ROOT_URLCONF=__name__):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(response.status_code, sync.status_code)
+        self.assertEqual(
+            CSRF_TOKEN.sub(r'\1""', response.content.decode()),
+            CSRF_TOKEN.sub(r'\1""', sync.content.decode()))
+        return response
+
+    def test_pages(self):
+        """Anonymous visitors get the same pages."""
+        category_url = reverse('category_detail', args=[self.category.pk])
+        for url in [
+            reverse('index'),
+            category_url,
+            category_url + '?sort_by=most_favorited',
+            reverse('search_resources') + '?q=framework&in=description',
+            reverse('search_resources') + '?q=flsk&fuzzy=on',
+            reverse('search_resources') + '?q=djnago',
+        ]:
+            with self.subTest(url=url):
+                response = self.assert_same_page(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertIn('private', response['Cache-Control'])
+        self.assert_same_page(reverse('view_favorites'), status_code=302)
+
+    def test_pages_of_signed_in_user(self):
+        """Signed-in users get the same pages, with their favorites."""
+        self.client.login(username='u1', password='pass')
+        for url in [
+            reverse('category_detail', args=[self.category.pk]),
+            reverse('search_resources') + '?q=web&in=description',
+            reverse('view_favorites') + '?sort_by=newest',
+        ]:
+            with self.subTest(url=url):
+                self.assert_same_page(url)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_not_modified(self):
+        """Unchanged pages are answered with 304 Not Modified."""
+        url = reverse('category_detail', args=[self.category.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Resource.objects.filter(name='Pending').get().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_cached_pages(self):
+        """Cached categories and listings are shared with the sync views."""
+        category_url = reverse('category_detail', args=[self.category.pk])
+        for url in [reverse('index'), category_url]:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.settings(ROOT_URLCONF='developer_toolkit.urls'):
+                    sync = self.client.get(url)
+                self.assertEqual(
+                    CSRF_TOKEN.sub(r'\1""', sync.content.decode()),
+                    CSRF_TOKEN.sub(r'\1""', first.content.decode()))
+        # Only the category itself is loaded for the cached listing
+        with self.assertNumQueries(2):
+            self.client.get(category_url)
@@ -0,0 +1,139 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .canonical import canonicalize_url, name_key
+from .models import Category, Resource
+from .utils import find_duplicate
+
+
+class CanonicalizeUrlTests(SimpleTestCase):
+    """URLs differing only in insignificant parts share a canonical form."""
+
+    def test_equivalent_urls(self):
+        """Scheme, www., case, ports, slashes and tracking are ignored."""
+        canonical = canonicalize_url('https://example.com/docs?a=1&b=2')
+        for url in [
+            'http://example.com/docs?a=1&b=2',
+            'https://www.example.com/docs/?a=1&b=2',
+            'HTTPS://EXAMPLE.COM:443/docs?b=2&a=1',
+            'https://example.com//docs/?a=1&b=2&utm_source=x#top',
+            '  https://example.com/docs?a=1&utm_medium=y&b=2&fbclid=z  ',
+        ]:
+            self.assertEqual(canonicalize_url(url), canonical, url)
+
+    def test_significant_differences(self):
+        """Paths, query values and other ports stay distinct."""
+        canonical = canonicalize_url('https://example.com/docs')
+        for url in [
+            'https://example.com/Docs',
+            'https://example.com/docs?page=2',
+            'https://example.com:8080/docs',
+            'https://docs.example.com/docs',
+        ]:
+            self.assertNotEqual(canonicalize_url(url), canonical, url)
+
+    def test_name_key(self):
+        """Names are case-folded with whitespace collapsed."""
+        self.assertEqual(name_key('  Django   DOCS '), 'django docs')
+        self.assertEqual(name_key('Straße'), name_key('STRASSE'))
+
+
+class DuplicateDetectionTests(TestCase):
+    """Duplicates are found by one query and rejected by constraints."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.resource = Resource.objects.create(
+            name='Django Docs',
+            description='d',
+            url='https://www.djangoproject.com/docs/',
+            category=self.category,
+            uploader=self.user,
+        )
+
+    def build(self, name, url):
+        return Resource(name=name, description='d', url=url,
+                        category=self.category, uploader=self.user)
+
+    def test_save_sets_keys(self):
+        """Saving stores the canonical URL, its hash and the name key."""
+        self.assertEqual(self.resource.canonical_url,
+                         'djangoproject.com/docs')
+        self.assertEqual(len(self.resource.url_hash), 64)
+        self.assertEqual(self.resource.name_key, 'django docs')
+
+    def test_find_duplicate_in_one_query(self):
+        """URL duplicates take precedence over name duplicates."""
+        with self.assertNumQueries(1):
+            self.assertEqual(find_duplicate(self.build(
+                'django docs', 'http://djangoproject.com/docs')), 'url')
+        self.assertEqual(find_duplicate(self.build(
+            'DJANGO DOCS', 'https://other.com')), 'name')
+        self.assertIsNone(find_duplicate(self.build(
+            'Other', 'https://other.com')))
+        self.assertIsNone(find_duplicate(self.resource))
+
+    def test_constraints_reject_duplicates(self):
+        """The unique keys reject duplicates that skipped the check."""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.build('Other', 'http://djangoproject.com/docs').save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.build('django  docs', 'https://other.com').save()
+
+    def test_legacy_duplicates_save_without_keys(self):
+        """Duplicates left without keys by the migration can be saved."""
+        legacy = self.build('Django Docs (copy)', 'https://other.com')
+        legacy.save()
+        Resource.objects.filter(pk=legacy.pk).update(
+            url='http://djangoproject.com/docs', name='django docs',
+            url_hash=None, name_key=None)
+        legacy.refresh_from_db()
+        legacy.description = 'edited'
+        legacy.save()
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.description, 'edited')
+        self.assertIsNone(legacy.url_hash)
+        self.assertIsNone(legacy.name_key)
+        # Keys are set again once the resource no longer clashes
+        legacy.url = 'https://other.com'
+        legacy.save()
+        legacy.refresh_from_db()
+        self.assertIsNotNone(legacy.url_hash)
+        self.assertIsNone(legacy.name_key)
+
+    def submit(self, name, url):
+        self.client.login(username='u1', password='pass')
+        resp = self.client.post(reverse('add_resource'), {
+            'name': name,
+            'url': url,
+            'description': 'd',
+            'category': str(self.category.id),
+            'keywords': 'a',
+        }, follow=True)
+        return [m.message for m in get_messages(resp.wsgi_request)]
+
+    def test_submit_rejects_equivalent_url(self):
+        """Submitting the same page over http with tracking is rejected."""
+        msgs = self.submit(
+            'New', 'http://djangoproject.com/docs?utm_source=news')
+        self.assertIn('A resource with the URL '
+                      '"http://djangoproject.com/docs?utm_source=news" '
+                      'already exists.', msgs)
+        self.assertEqual(Resource.objects.count(), 1)
+
+    def test_submit_handles_concurrent_duplicate(self):
+        """A duplicate saved after the check is caught by the constraint."""
+        with mock.patch('resources.views.find_duplicate',
+                        side_effect=[None, 'name']):
+            msgs = self.submit('DJANGO DOCS', 'https://other.com')
+        self.assertIn(
+            'A resource with the name "DJANGO DOCS" already exists.', msgs)
+        self.assertEqual(Resource.objects.count(), 1)
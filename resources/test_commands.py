@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from .canonical import canonicalize_url, url_hash
+from .management.commands.import_resources import Command as ImportCommand
+from .models import Category, Resource
+from .search import full_text_search
+
+
+class ImportResourcesTests(TestCase):
+    """The import command streams resources from JSON Lines and CSV."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.category = Category.objects.create(
+            name='Python', author=self.user, published=True
+        )
+        Resource.objects.create(
+            name='Existing',
+            description='d',
+            url='https://existing.com/',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, filename, content):
+        path = os.path.join(self.directory.name, filename)
+        with open(path, 'w', newline='') as f:
+            f.write(content)
+        return path
+
+    def write_jsonl(self, rows):
+        return self.write(
+            'resources.jsonl', ''.join(json.dumps(row) + '\n' for row in rows))
+
+    def test_imports_jsonl(self):
+        """Rows are imported with their categories, users, keywords and
+        favorites."""
+        path = self.write_jsonl([
+            {'name': 'Django docs', 'url': 'https://djangoproject.com/',
+             'description': 'Docs', 'category': 'python', 'uploader': 'u1',
+             'keywords': ['Web', 'docs'], 'favorites': ['u1', 'u3'],
+             'approved': True},
+            {'name': 'Rust book', 'url': 'https://rust-lang.org/book',
+             'category': 'Rust', 'uploader': 'u2', 'keywords': ['web']},
+        ])
+        call_command('import_resources', path, stdout=StringIO())
+        django = Resource.objects.get(name='Django docs')
+        self.assertEqual(django.category, self.category)
+        self.assertTrue(django.approved)
+        self.assertEqual(django.favorites_count, 2)
+        self.assertEqual(django.url_hash, url_hash(
+            canonicalize_url('https://djangoproject.com/')))
+        self.assertEqual(
+            sorted(django.keywords.names()), ['Web', 'docs'])
+        rust = Resource.objects.get(name='Rust book')
+        self.assertEqual(rust.category.name, 'Rust')
+        self.assertEqual(rust.category.author.username, 'u2')
+        self.assertFalse(rust.approved)
+        self.assertFalse(rust.uploader.has_usable_password())
+        self.assertEqual(list(rust.keywords.names()), ['Web'])
+        self.assertEqual(
+            list(full_text_search(Resource.objects.all(), 'rust', ['name'])),
+            [rust])
+
+    def test_skips_duplicate_and_invalid_rows(self):
+        """Duplicates of existing or earlier rows, incomplete rows and rows
+        with invalid URLs or values too long for their fields are
+        skipped."""
+        path = self.write_jsonl([
+            {'name': 'Copy', 'url': 'http://www.existing.com',
+             'category': 'Python', 'uploader': 'u1'},
+            {'name': 'EXISTING', 'url': 'https://other.com',
+             'category': 'Python', 'uploader': 'u1'},
+            {'name': 'New', 'url': 'https://new.com',
+             'category': 'Python', 'uploader': 'u1'},
+            {'name': 'New again', 'url': 'https://new.com/?utm_source=x',
+             'category': 'Python', 'uploader': 'u1'},
+            {'name': 'No URL', 'category': 'Python', 'uploader': 'u1'},
+            {'name': 'Script', 'url': 'javascript:alert(1)',
+             'category': 'Python', 'uploader': 'u1'},
+            {'name': 'Long URL', 'url': 'https://long.com/' + 'a' * 200,
+             'category': 'Python', 'uploader': 'u1'},
+            {'name': 'Long user', 'url': 'https://user.com',
+             'category': 'Python', 'uploader': 'u' * 151},
+            {'name': 'Long tag', 'url': 'https://tag.com',
+             'category': 'Python', 'uploader': 'u1',
+             'keywords': ['k' * 101]},
+        ])
+        with open(path, 'a') as f:
+            f.write('not json\n')
+        stdout = StringIO()
+        call_command('import_resources', path, batch_size=2, stdout=stdout)
+        self.assertEqual(
+            sorted(Resource.objects.values_list('name', flat=True)),
+            ['Existing', 'New'])
+        self.assertIn(
+            'Imported 1 resources, skipped 3 duplicates and 6 invalid rows',
+            stdout.getvalue())
+        self.assertIn('rows/s', stdout.getvalue())
+
+    def test_imports_csv(self):
+        """CSV rows have comma separated keywords and favorites."""
+        path = self.write('resources.csv', (
+            'name,url,category,description,keywords,favorites,approved\n'
+            'Flask,https://flask.com,Python,"A\nmicro framework",'
+            '"web, micro",u1,yes\n'
+        ))
+        call_command(
+            'import_resources', path, uploader='u1', stdout=StringIO())
+        flask = Resource.objects.get(name='Flask')
+        self.assertEqual(flask.description, 'A\nmicro framework')
+        self.assertEqual(sorted(flask.keywords.names()), ['micro', 'web'])
+        self.assertEqual(flask.favorites_count, 1)
+        self.assertTrue(flask.approved)
+
+    def test_resumes_from_checkpoint(self):
+        """An interrupted import resumes after its last committed batch."""
+        rows = [
+            {'name': f'R{i}', 'url': f'https://r{i}.com',
+             'category': 'Python', 'uploader': 'u1'}
+            for i in range(5)
+        ]
+        for filename in ('resources.jsonl', 'resources.csv'):
+            with self.subTest(filename=filename):
+                Resource.objects.filter(name__startswith='R').delete()
+                if filename.endswith('.csv'):
+                    path = self.write(filename, ''.join(
+                        ['name,url,category\n'] +
+                        [f'{row["name"]},{row["url"]},Python\n'
+                         for row in rows]))
+                else:
+                    path = self.write_jsonl(rows)
+                import_batch = ImportCommand.import_batch
+                calls = []
+
+                def crash_on_second_batch(command, batch):
+                    calls.append(batch)
+                    if len(calls) == 2:
+                        raise RuntimeError('crash')
+                    import_batch(command, batch)
+
+                with mock.patch.object(
+                    ImportCommand, 'import_batch', crash_on_second_batch
+                ), self.assertRaises(RuntimeError):
+                    call_command(
+                        'import_resources', path, batch_size=2,
+                        uploader='u1', stdout=StringIO())
+                self.assertTrue(os.path.exists(path + '.checkpoint'))
+                stdout = StringIO()
+                call_command(
+                    'import_resources', path, batch_size=2, uploader='u1',
+                    stdout=stdout)
+                self.assertIn('Resuming after row 2.', stdout.getvalue())
+                self.assertIn('Imported 3 resources', stdout.getvalue())
+                self.assertEqual(Resource.objects.filter(
+                    name__startswith='R').count(), 5)
+                self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+
+class ExportResourcesTests(TestCase):
+    """The export command writes approved resources in batches."""
+
+    def test_exports_in_batches(self):
+        user = User.objects.create_user(username='u1', password='pass')
+        category = Category.objects.create(
+            name='Python', author=user, published=True
+        )
+        for i in range(5):
+            resource = Resource.objects.create(
+                name=f'R{i}', description='d', url=f'https://r{i}.com',
+                category=category, uploader=user, approved=True,
+            )
+            resource.keywords.add(f'k{i}')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'resources.jsonl')
+            # One cursor over the resources and a keyword query per batch
+            with self.assertNumQueries(4):
+                call_command(
+                    'export_resources', format='jsonl', output=path,
+                    batch_size=2)
+            with open(path) as f:
+                rows = [json.loads(line) for line in f]
+        self.assertEqual(
+            [row['keywords'] for row in rows],
+            [['k0'], ['k1'], ['k2'], ['k3'], ['k4']])
@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import Category, Resource
+
+
+class FavoritesCountTests(TestCase):
+    """The stored favorites count follows the favorites relation."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.other = User.objects.create_user(username='u2', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.resource = Resource.objects.create(
+            name='R1',
+            description='d',
+            url='https://r1.com',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+
+    def assert_count(self, expected):
+        self.resource.refresh_from_db()
+        self.assertEqual(self.resource.favorites_count, expected)
+
+    def test_add_and_remove_update_count(self):
+        """Adding and removing favorites updates the count."""
+        self.resource.favorites.add(self.user, self.other)
+        self.assert_count(2)
+        # Adding an existing favorite again does not change the count
+        self.resource.favorites.add(self.user)
+        self.assert_count(2)
+        self.resource.favorites.remove(self.user)
+        self.assert_count(1)
+        self.resource.favorites.clear()
+        self.assert_count(0)
+
+    def test_reverse_changes_update_count(self):
+        """Changes made from the user side update the count."""
+        self.user.favorite_resources.add(self.resource)
+        self.other.favorite_resources.add(self.resource)
+        self.assert_count(2)
+        self.user.favorite_resources.clear()
+        self.assert_count(1)
+
+    def test_deleting_user_updates_count(self):
+        """Deleting a user removes their favorites from the count."""
+        self.resource.favorites.add(self.user, self.other)
+        self.other.delete()
+        self.assert_count(1)
+
+    def test_favorite_view_updates_count(self):
+        """The favorite toggle view keeps the count in sync."""
+        self.client.login(username='u2', password='pass')
+        fav_url = reverse('favorite_resource', args=[self.resource.id])
+        self.client.post(fav_url)
+        self.assert_count(1)
+        self.client.post(fav_url)
+        self.assert_count(0)
+
+    def test_recount_favorites_command_repairs_count(self):
+        """The recount command repairs counts that drifted."""
+        self.resource.favorites.add(self.user, self.other)
+        Resource.objects.update(favorites_count=7)
+        call_command('recount_favorites', batch_size=1, stdout=StringIO())
+        self.assert_count(2)
@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Category, Resource
+from .utils import sort_resources
+
+
+@override_settings(RESOURCES_PER_PAGE=4)
+class KeysetPaginationTests(TestCase):
+    """Tests for cursor-based pagination of resource listings."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.other = User.objects.create_user(username='u2', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        for i in range(11):
+            # Duplicate favorite counts exercise the tie-breakers, names
+            # are unique
+            r = Resource.objects.create(
+                name=f'Resource {i % 3}-{i}',
+                description='d',
+                url=f'https://r{i}.com',
+                category=self.category,
+                uploader=self.user,
+                approved=True,
+            )
+            if i % 2:
+                r.favorites.add(self.user)
+        self.url = reverse('category_detail', args=[self.category.id])
+
+    def expected_order(self, sort_by):
+        request = RequestFactory().get(self.url, {'sort_by': sort_by})
+        return list(sort_resources(
+            request, self.category.resources.filter(approved=True)
+        ))
+
+    def walk(self, sort_by):
+        params = {'sort_by': sort_by}
+        pages = []
+        while True:
+            resp = self.client.get(self.url, params)
+            page = resp.context['resources']
+            pages.append(list(page))
+            if not page.has_next:
+                return pages, page
+            params = {'sort_by': sort_by, 'cursor': page.next_cursor}
+
+    def test_pages_cover_every_ordering_without_gaps(self):
+        """Walking the pages visits every resource once, in order."""
+        for sort_by in ('alphabetical', 'newest', 'oldest',
+                        'most_favorited'):
+            with self.subTest(sort_by=sort_by):
+                pages, _ = self.walk(sort_by)
+                self.assertEqual([len(p) for p in pages], [4, 4, 3])
+                self.assertEqual(
+                    [r for p in pages for r in p],
+                    self.expected_order(sort_by),
+                )
+
+    def test_previous_cursor_returns_preceding_page(self):
+        """The previous cursor walks back to the preceding page."""
+        pages, last = self.walk('most_favorited')
+        resp = self.client.get(self.url, {
+            'sort_by': 'most_favorited', 'cursor': last.previous_cursor,
+        })
+        page = resp.context['resources']
+        self.assertEqual(list(page), pages[1])
+        self.assertTrue(page.has_next)
+        self.assertTrue(page.has_previous)
+
+    def test_count_comes_from_the_whole_listing(self):
+        """The header count covers all pages."""
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.context['resource_count'], 11)
+        self.assertContains(resp, '11 Resources under')
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        """A page reached by cursor runs the same queries as page one."""
+        with CaptureQueriesContext(connection) as first:
+            resp = self.client.get(self.url)
+        cursor = resp.context['resources'].next_cursor
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(self.url, {'cursor': cursor})
+        self.assertEqual(len(first.captured_queries),
+                         len(deep.captured_queries))
+
+    def test_invalid_cursor_shows_first_page(self):
+        """A malformed cursor falls back to the first page."""
+        resp = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.context['resources'].has_previous)
@@ -0,0 +1,149 @@
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from contact import urls as contact_urls
+from contact.models import Request
+from . import urls as resource_urls
+from .models import Category, Resource
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Views stay within their query budget on a populated database, with
+    cold caches, so that a query per listed item fails the tests.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'u{i}', password='pass')
+            for i in range(5)
+        ]
+        cls.user = cls.users[0]
+        cls.user.is_staff = True
+        cls.user.save()
+        cls.categories = [
+            Category.objects.create(
+                name=f'Category {i}', author=cls.user, published=True)
+            for i in range(3)
+        ]
+        Category.objects.create(name='Draft', author=cls.user)
+        for category in cls.categories:
+            for i in range(25):
+                resource = Resource.objects.create(
+                    name=f'{category.name} resource {i}',
+                    description=f'Resource number {i} about {category.name}',
+                    url=f'https://example.com/{category.pk}/{i}',
+                    category=category,
+                    uploader=cls.users[i % 5],
+                    approved=i != 0,
+                )
+                resource.keywords.add(f'tag{i % 4}', f'tag{i % 7}')
+                resource.favorites.add(*cls.users[:i % 4])
+        for i in range(30):
+            Request.objects.create(
+                name=f'Visitor {i}', email=f'v{i}@example.com',
+                message='Hello')
+
+    def resource(self, name):
+        return Resource.objects.get(name=name)
+
+    def read_cases(self):
+        category = self.categories[0]
+        resource = self.resource('Category 0 resource 5')
+        return [
+            ('get', reverse('index')),
+            ('get', reverse('category_detail', args=[category.pk])),
+            ('get', reverse('category_detail', args=[category.pk])
+             + '?sort_by=most_favorited'),
+            ('get', reverse('resource_detail', args=[resource.pk])),
+            ('get', reverse('view_favorites')),
+            ('get', reverse('search_resources') + '?q=resource&in=name'
+             '&in=description'),
+            ('get', reverse('search_resources') + '?q=resourse&fuzzy=on'),
+            ('get', reverse('search_resources') + '?q=resourse'),
+            ('get', reverse('api_category_list')),
+            ('get', reverse('api_resource_list')
+             + '?fields=name,category,uploader,keywords,favorites_count'),
+            ('get', reverse('export_resources') + '?format=jsonl'),
+            ('get', reverse('add_resource')),
+            ('get', reverse('edit_resource', args=[resource.pk])),
+            ('get', reverse('suggest_category')),
+            ('get', reverse('contact')),
+        ]
+
+    def write_cases(self):
+        category = self.categories[1]
+        own = self.resource('Category 1 resource 5')
+        return [
+            ('post', reverse('add_resource'), {
+                'name': 'New resource',
+                'description': 'A new resource',
+                'url': 'https://example.com/new',
+                'category': category.pk,
+                'keywords': 'tag1, new-tag',
+            }),
+            ('post', reverse('edit_resource', args=[own.pk]), {
+                'name': own.name,
+                'description': 'Edited',
+                'url': own.url,
+                'category': category.pk,
+                'keywords': 'tag2, edited-tag',
+            }),
+            ('post', reverse('favorite_resource', args=[own.pk])),
+            ('post', reverse('toggle_favorite', args=[own.pk])),
+            ('post', reverse('delete_resource', args=[
+                self.resource('Category 1 resource 10').pk])),
+            ('post', reverse('suggest_category'), {'name': 'New category'}),
+            ('post', reverse('contact'), {
+                'name': 'Visitor', 'email': 'v@example.com',
+                'message': 'Hello',
+            }),
+        ]
+
+    def assert_within_budget(self, method, url, data=None):
+        cache.clear()
+        match = resolve(urlsplit(url).path)
+        budget = getattr(match.func, 'query_budget', None)
+        self.assertIsNotNone(budget, f'{match.view_name} has no budget')
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data or {})
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+        self.assertLessEqual(
+            len(queries), budget, '\n'.join(q['sql'] for q in queries))
+
+    def test_every_view_has_a_budget(self):
+        for pattern in (
+            resource_urls.urlpatterns + contact_urls.urlpatterns
+        ):
+            with self.subTest(view=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_anonymous(self):
+        for method, url in self.read_cases():
+            if url.startswith((reverse('view_favorites'),
+                               reverse('export_resources'))):
+                continue
+            with self.subTest(url=url):
+                self.assert_within_budget(method, url)
+
+    def test_signed_in(self):
+        self.client.force_login(self.user)
+        for method, url, *data in self.read_cases() + self.write_cases():
+            with self.subTest(method=method, url=url):
+                self.assert_within_budget(method, url, *data)
+
+    @override_settings(ROOT_URLCONF='resources.test_async_views')
+    def test_async_views(self):
+        self.client.force_login(self.user)
+        for method, url in self.read_cases()[:8]:
+            with self.subTest(url=url):
+                self.assert_within_budget(method, url)
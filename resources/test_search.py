@@ -0,0 +1,256 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Category, Resource
+from .fuzzy import (
+    INDEX_VERSION_KEY, MAX_RESULTS, TrigramIndex, fuzzy_search,
+    invalidate_index, suggest_query,
+)
+from .search import FTS_TABLE, deferred_indexing, full_text_search
+
+
+class FullTextSearchTests(TestCase):
+    """Tests for the full-text search index and ranking."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.in_name = Resource.objects.create(
+            name='Django Guide',
+            description='A guide to the web framework',
+            url='https://guide.com',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+        self.in_description = Resource.objects.create(
+            name='Web Tips',
+            description='Tips for building sites with Django templates',
+            url='https://tips.com',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+
+    def search(self, query, search_in):
+        return list(full_text_search(
+            Resource.objects.all(), query, search_in
+        ).order_by('-search_rank'))
+
+    def test_name_matches_rank_above_description_matches(self):
+        """Matches in the name are weighted above the description."""
+        results = self.search('django', ['name', 'description'])
+        self.assertEqual(results, [self.in_name, self.in_description])
+
+    def test_search_is_scoped_to_selected_fields(self):
+        """Only the selected fields are searched."""
+        self.assertEqual(self.search('django', ['name']), [self.in_name])
+        self.assertEqual(self.search('templates', ['name']), [])
+
+    def test_terms_match_word_prefixes(self):
+        """Every term must match the start of a word."""
+        self.assertEqual(self.search('djan gui', ['name']), [self.in_name])
+        self.assertEqual(self.search('jango', ['name']), [])
+
+    def test_index_follows_edits_keywords_and_deletes(self):
+        """Edits, keyword changes and deletions update the index."""
+        self.in_name.name = 'Flask Guide'
+        self.in_name.save()
+        self.assertEqual(self.search('flask', ['name']), [self.in_name])
+        self.in_name.keywords.add('python')
+        self.assertEqual(self.search('python', ['keywords']), [self.in_name])
+        self.in_name.keywords.remove('python')
+        self.assertEqual(self.search('python', ['keywords']), [])
+        self.in_name.delete()
+        self.assertEqual(self.search('flask', ['name']), [])
+
+    def test_resource_and_keywords_indexed_once(self):
+        """Saving a resource and its keywords builds its document once."""
+        with CaptureQueriesContext(connection) as queries:
+            with deferred_indexing():
+                self.in_name.name = 'Flask Guide'
+                self.in_name.save()
+                self.in_name.keywords.set(['python', 'web'])
+        rebuilds = [
+            q for q in queries
+            if q['sql'].startswith(f'DELETE FROM {FTS_TABLE}')
+            or 'SET search_document' in q['sql']
+        ]
+        self.assertEqual(len(rebuilds), 1)
+        self.assertEqual(self.search('python', ['keywords']), [self.in_name])
+        self.assertEqual(self.search('flask', ['name']), [self.in_name])
+
+    def test_search_view_ranks_and_highlights_results(self):
+        """The search view defaults to relevance and shows snippets."""
+        resp = self.client.get(
+            reverse('search_resources'),
+            {'q': 'django', 'in': ['name', 'description']},
+        )
+        self.assertEqual(
+            list(resp.context['resources']),
+            [self.in_name, self.in_description],
+        )
+        self.assertContains(resp, '<mark>Django</mark> templates')
+
+    def test_search_view_hides_unapproved_resources(self):
+        """Unapproved resources are indexed but not returned."""
+        Resource.objects.create(
+            name='Django Pending',
+            description='d',
+            url='https://pending.com',
+            category=self.category,
+            uploader=self.user,
+            approved=False,
+        )
+        resp = self.client.get(
+            reverse('search_resources'), {'q': 'django', 'in': ['name']}
+        )
+        self.assertEqual(list(resp.context['resources']), [self.in_name])
+
+
+class FuzzySearchTests(TestCase):
+    """Tests for typo-tolerant search and query suggestions."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.django = Resource.objects.create(
+            name='Django REST Framework',
+            description='d',
+            url='https://drf.com',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+        self.k8s = Resource.objects.create(
+            name='Container Orchestration',
+            description='d',
+            url='https://k8s.com',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+        self.k8s.keywords.add('kubernetes')
+
+    def search(self, query, search_in):
+        return list(fuzzy_search(
+            Resource.objects.all(), query, search_in
+        ).order_by('-search_rank'))
+
+    def test_misspelled_names_and_keywords_match(self):
+        """Misspelled words match names and keywords."""
+        self.assertEqual(self.search('djnago', ['name']), [self.django])
+        self.assertEqual(self.search('kubernets', ['keywords']), [self.k8s])
+        self.assertEqual(self.search('kubernets', ['name']), [])
+
+    def test_index_follows_changes(self):
+        """The trigram index is rebuilt after resources change."""
+        self.assertEqual(self.search('flsk', ['name']), [])
+        self.django.name = 'Flask Guide'
+        self.django.save()
+        self.assertEqual(self.search('flsk', ['name']), [self.django])
+
+    def test_index_ignores_unapproved_changes(self):
+        """Pending submissions don't force a rebuild of the index."""
+        version = cache.get(INDEX_VERSION_KEY)
+        pending = Resource.objects.create(
+            name='Flask Guide', description='d', url='https://flask.com',
+            category=self.category, uploader=self.user, approved=False)
+        pending.keywords.add('flask')
+        pending.name = 'Flask Handbook'
+        pending.save()
+        pending.delete()
+        self.django.description = 'Edited'
+        self.django.save()
+        self.assertEqual(cache.get(INDEX_VERSION_KEY), version)
+
+    def test_suggest_query_corrects_misspelled_words(self):
+        """Suggestions replace unknown words with similar indexed words."""
+        self.assertEqual(suggest_query('djnago kubernets'),
+                         'django kubernetes')
+        self.assertIsNone(suggest_query('django'))
+        self.assertIsNone(suggest_query('zzzz'))
+
+    def test_unapproved_resources_are_not_indexed(self):
+        """Names and keywords awaiting approval are never suggested."""
+        secret = Resource.objects.create(
+            name='Confidential Roadmap', description='d',
+            url='https://secret.com', category=self.category,
+            uploader=self.user, approved=False)
+        secret.keywords.add('embargoed')
+        self.assertEqual(self.search('confidental', ['name']), [])
+        self.assertIsNone(suggest_query('confidental'))
+        self.assertIsNone(suggest_query('embargoes'))
+        secret.approved = True
+        secret.save()
+        self.assertEqual(suggest_query('confidental'), 'confidential')
+
+    def test_results_are_capped_after_filtering(self):
+        """The cap keeps the best matches among the filtered resources."""
+        other = Category.objects.create(
+            name='Other', author=self.user, published=True)
+        Resource.objects.bulk_create([
+            Resource(
+                name=f'Django {i}', description='d', url=f'https://{i}.com',
+                category=other, uploader=self.user, approved=True,
+                url_hash=str(i), name_key=str(i))
+            for i in range(MAX_RESULTS)
+        ])
+        invalidate_index()
+        results = fuzzy_search(
+            Resource.objects.filter(category=self.category), 'django',
+            ['name'])
+        self.assertEqual(list(results), [self.django])
+
+    def test_results_widen_past_filtered_candidates(self):
+        """Weaker matches are looked up when better ones are filtered."""
+        other = Category.objects.create(
+            name='Other', author=self.user, published=True)
+        Resource.objects.bulk_create([
+            Resource(
+                name=f'Django {i}', description='d', url=f'https://{i}.com',
+                category=other, uploader=self.user, approved=True,
+                url_hash=str(i), name_key=str(i))
+            for i in range(2 * MAX_RESULTS)
+        ])
+        Resource.objects.filter(pk=self.django.pk).update(name='Djangonaut')
+        invalidate_index()
+        results = fuzzy_search(
+            Resource.objects.filter(category=self.category), 'django',
+            ['name'])
+        self.assertEqual(list(results), [self.django])
+
+    def test_similarity_ranking(self):
+        """Closer matches rank first in the trigram index."""
+        index = TrigramIndex([(1, 'Reactive'), (2, 'React')], [])
+        results = index.search('react', threshold=0.25)
+        self.assertEqual([ids for score, ids in results], [{2}, {1}])
+
+    def test_scores_average_the_query_words(self):
+        """Resources matching more query words rank first."""
+        index = TrigramIndex(
+            [(1, 'Django Guide'), (2, 'Django'), (3, 'Guide')], [])
+        results = index.search('django guide', threshold=0.25)
+        self.assertEqual(results, [(1.0, {1}), (0.5, {2, 3})])
+
+    def test_search_view_fuzzy_mode_and_suggestion(self):
+        """The view supports fuzzy mode and suggests corrections."""
+        resp = self.client.get(
+            reverse('search_resources'),
+            {'q': 'djnago', 'in': ['name'], 'fuzzy': 'on'},
+        )
+        self.assertEqual(list(resp.context['resources']), [self.django])
+        resp = self.client.get(
+            reverse('search_resources'), {'q': 'djnago', 'in': ['name']}
+        )
+        self.assertEqual(list(resp.context['resources']), [])
+        self.assertEqual(resp.context['suggestion'], 'django')
+        self.assertContains(resp, 'Did you mean')
@@ -1,8 +1,18 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import re
+from html import unescape
+from django.db import connection
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.contrib.messages import get_messages
 
+from .cache import CATEGORY_LISTING_VERSION_KEY, CONTENT_VERSION_KEY
 from .models import Category, Resource
 
 
@@ -280,3 +290,613 @@ class ResourceViewTests(TestCase):
             reverse('search_resources'), {'q': 'django', 'in': ['keywords']}
         )
         self.assertIn(r, resp3.context['resources'])
+
+
+class ListingQueryCountTests(TestCase):
+    """Listings should cost a constant number of queries."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.other = User.objects.create_user(username='u2', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+
+    def create_resources(self, count):
+        for i in range(count):
+            r = Resource.objects.create(
+                name=f'Resource {self.category.resources.count()}',
+                description='shared description',
+                url=f'https://r{self.category.resources.count()}.com',
+                category=self.category,
+                uploader=self.user if i % 2 else self.other,
+                approved=True,
+            )
+            r.keywords.add('shared', f'tag{i}')
+            r.favorites.add(self.user, self.other)
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url, params or {})
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assert_constant_queries(self, url, params=None):
+        self.create_resources(2)
+        small = self.count_queries(url, params)
+        self.create_resources(10)
+        large = self.count_queries(url, params)
+        self.assertEqual(small, large)
+
+    def test_category_detail_query_count_is_constant(self):
+        """Category detail queries don't grow with the number of rows."""
+        self.client.login(username='u1', password='pass')
+        url = reverse('category_detail', args=[self.category.id])
+        self.assert_constant_queries(url)
+
+    def test_search_query_count_is_constant(self):
+        """Search results queries don't grow with the number of rows."""
+        self.client.login(username='u1', password='pass')
+        self.assert_constant_queries(
+            reverse('search_resources'),
+            {'q': 'shared', 'in': ['description', 'keywords'],
+             'sort_by': 'most_favorited'},
+        )
+
+    def test_view_favorites_query_count_is_constant(self):
+        """Favorites page queries don't grow with the number of rows."""
+        self.client.login(username='u1', password='pass')
+        self.assert_constant_queries(reverse('view_favorites'))
+
+    def test_favorite_counts_are_not_constrained_by_filters(self):
+        """Favorites page shows the total favorites of each resource."""
+        self.create_resources(1)
+        self.client.login(username='u1', password='pass')
+        resp = self.client.get(reverse('view_favorites'))
+        resource = resp.context['favorite_resources'][0]
+        self.assertEqual(resource.favorites_count, 2)
+
+
+class ResourceDetailTests(TestCase):
+    """Resource details are loaded on demand and cached."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.other = User.objects.create_user(username='u2', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.resource = Resource.objects.create(
+            name='Detail Resource',
+            description='A long description only shown in the detail',
+            url='https://detail.com',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+        self.resource.keywords.add('python')
+        self.url = reverse('resource_detail', args=[self.resource.id])
+
+    def test_detail_fragment(self):
+        """The detail fragment contains the resource fields."""
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'A long description only shown')
+        self.assertContains(resp, 'data-visit-url="https://detail.com"')
+        self.assertContains(resp, 'python')
+        self.assertNotContains(resp, '<html')
+
+    def test_unapproved_detail_only_shown_to_uploader(self):
+        """Unapproved resources are hidden from other users."""
+        self.resource.approved = False
+        self.resource.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.login(username='u2', password='pass')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.login(username='u1', password='pass')
+        resp = self.client.get(self.url)
+        self.assertContains(resp, 'pending approval')
+
+    def test_missing_resource_returns_404(self):
+        """Unknown resource IDs return 404."""
+        resp = self.client.get(reverse('resource_detail', args=[0]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_cached_detail_needs_no_queries(self):
+        """A cached detail is served without database queries."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            resp = self.client.get(self.url)
+        self.assertContains(resp, 'A long description only shown')
+
+    def test_cache_invalidated_on_edit(self):
+        """Editing a resource refreshes its cached detail."""
+        self.client.get(self.url)
+        self.resource.description = 'An updated description'
+        self.resource.save()
+        self.assertContains(self.client.get(self.url),
+                            'An updated description')
+
+    def test_cache_invalidated_on_keyword_change(self):
+        """Changing keywords refreshes the cached detail."""
+        self.client.get(self.url)
+        self.resource.keywords.add('django')
+        self.assertContains(self.client.get(self.url), 'django')
+
+    def test_cache_invalidated_on_favorite(self):
+        """Favoriting a resource refreshes its favorites count."""
+        self.client.get(self.url)
+        self.resource.favorites.add(self.other)
+        resp = self.client.get(self.url)
+        self.assertContains(
+            resp, '<span class="resource-favorites-count">1</span>')
+
+    def test_listing_does_not_render_details(self):
+        """Category listings link to the detail instead of embedding it."""
+        resp = self.client.get(
+            reverse('category_detail', args=[self.category.id]))
+        self.assertNotContains(resp, 'A long description only shown')
+        self.assertContains(resp, 'data-bs-target="#resourceModal"')
+        self.assertContains(resp, self.url)
+
+
+class CategoryListingCacheTests(TestCase):
+    """Rendered category listings are cached and invalidated."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.other = User.objects.create_user(username='u2', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.first = self.create_resource('First', self.user)
+        self.second = self.create_resource('Second', self.other)
+        self.url = reverse('category_detail', args=[self.category.id])
+
+    def create_resource(self, name, uploader, approved=True):
+        return Resource.objects.create(
+            name=name,
+            description=f'{name} description',
+            url=f'https://{name.lower()}.com',
+            category=self.category,
+            uploader=uploader,
+            approved=approved,
+        )
+
+    def test_cached_listing_costs_two_queries(self):
+        """Once cached, anonymous visitors only query the category and
+        the newest update used to validate the page."""
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            resp = self.client.get(self.url)
+        self.assertContains(resp, 'Second')
+        self.assertContains(resp, '2 Resources')
+
+    def test_user_actions_added_to_cached_listing(self):
+        """Favorite icons and edit buttons are specific to each user."""
+        self.first.favorites.add(self.other)
+        self.client.get(self.url)
+        self.client.login(username='u1', password='pass')
+        resp = self.client.get(self.url)
+        self.assertContains(resp, 'Add First to favorites')
+        self.assertContains(
+            resp, reverse('edit_resource', args=[self.first.id]))
+        self.assertNotContains(
+            resp, reverse('edit_resource', args=[self.second.id]))
+        self.client.login(username='u2', password='pass')
+        resp = self.client.get(self.url)
+        self.assertContains(resp, 'Remove First from favorites')
+        self.assertContains(
+            resp, reverse('edit_resource', args=[self.second.id]))
+        self.assertNotContains(resp, '<!-- resource-actions:')
+
+    def test_pending_resources_not_cached(self):
+        """Pending resources are only listed for their uploader."""
+        self.create_resource('Pending', self.user, approved=False)
+        self.client.get(self.url)
+        self.client.login(username='u1', password='pass')
+        self.assertContains(self.client.get(self.url), 'Pending')
+        self.client.login(username='u2', password='pass')
+        self.assertNotContains(self.client.get(self.url), 'Pending')
+
+    def test_listing_invalidated_on_resource_changes(self):
+        """Approving, editing and deleting resources refresh the listing."""
+        self.client.get(self.url)
+        third = self.create_resource('Third', self.user)
+        self.assertContains(self.client.get(self.url), 'Third')
+        third.name = 'Renamed'
+        third.save()
+        resp = self.client.get(self.url)
+        self.assertContains(resp, 'Renamed')
+        self.assertNotContains(resp, 'Third')
+        third.delete()
+        self.assertNotContains(self.client.get(self.url), 'Renamed')
+
+    def test_listing_invalidated_when_resource_moves(self):
+        """Moving a resource refreshes the listing it left."""
+        other_category = Category.objects.create(
+            name='Other', author=self.user, published=True
+        )
+        self.client.get(self.url)
+        resource = Resource.objects.get(pk=self.second.pk)
+        resource.category = other_category
+        resource.save()
+        self.assertNotContains(self.client.get(self.url), 'Second')
+
+    def test_listing_invalidated_on_favorite(self):
+        """Favoriting a resource reorders the most favorited listing."""
+        params = {'sort_by': 'most_favorited'}
+        resp = self.client.get(self.url, params)
+        self.assertLess(resp.content.index(b'Second'),
+                        resp.content.index(b'First'))
+        self.first.favorites.add(self.other)
+        resp = self.client.get(self.url, params)
+        self.assertLess(resp.content.index(b'First'),
+                        resp.content.index(b'Second'))
+
+    @override_settings(RESOURCES_PER_PAGE=1)
+    def test_pages_cached_separately(self):
+        """Each page and sort order has its own cache entry."""
+        resp = self.client.get(self.url, {'sort_by': 'newest'})
+        self.assertContains(resp, 'Second')
+        self.assertContains(resp, 'sort_by=newest')
+        next_url = re.search(r'href="\?([^"]+)">Next', resp.content.decode())
+        resp = self.client.get(f'{self.url}?{unescape(next_url[1])}')
+        self.assertContains(resp, 'First')
+        self.assertNotContains(resp, 'Second')
+        resp = self.client.get(self.url)
+        self.assertContains(resp, 'First')
+        self.assertNotContains(resp, 'Second')
+
+
+class HomepageCacheTests(TestCase):
+    """The homepage categories are counted in one query and cached."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.resource = self.create_resource('First', approved=True)
+        self.create_resource('Pending', approved=False)
+        self.url = reverse('index')
+
+    def create_resource(self, name, approved):
+        return Resource.objects.create(
+            name=name,
+            description='description',
+            url=f'https://{name.lower()}.com',
+            category=self.category,
+            uploader=self.user,
+            approved=approved,
+        )
+
+    def get_category(self, name='Published'):
+        resp = self.client.get(self.url)
+        for category in resp.context['categories']:
+            if category.name == name:
+                return category
+        return None
+
+    def test_counts_approved_resources_in_one_query(self):
+        """Categories are listed with approved counts in one query."""
+        Category.objects.create(name='Empty', author=self.user,
+                                published=True)
+        with self.assertNumQueries(1):
+            resp = self.client.get(self.url)
+        published, empty = (
+            sorted(resp.context['categories'], key=lambda c: c.name,
+                   reverse=True))
+        self.assertEqual(published.resource_count, 1)
+        self.assertEqual(published.newest_resource, self.resource.created_at)
+        self.assertEqual(empty.resource_count, 0)
+        self.assertIsNone(empty.newest_resource)
+        self.assertContains(resp, '1 Resource<')
+
+    def test_cached_homepage_needs_no_queries(self):
+        """Once cached, the homepage doesn't touch the database."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_invalidated_on_approval_change(self):
+        """Approving or unapproving a resource refreshes the counts."""
+        self.client.get(self.url)
+        pending = Resource.objects.get(name='Pending')
+        pending.approved = True
+        pending.save()
+        self.assertEqual(self.get_category().resource_count, 2)
+        pending.approved = False
+        pending.save()
+        self.assertEqual(self.get_category().resource_count, 1)
+
+    def test_not_invalidated_by_unrelated_changes(self):
+        """Edits keeping the approval state keep the cache."""
+        self.client.get(self.url)
+        self.resource.description = 'changed'
+        self.resource.save()
+        self.create_resource('Another pending', approved=False)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_invalidated_on_publish_and_rename(self):
+        """Publishing or renaming a category refreshes the list."""
+        draft = Category.objects.create(name='Draft', author=self.user)
+        self.client.get(self.url)
+        draft.published = True
+        draft.save()
+        self.assertIsNotNone(self.get_category('Draft'))
+        draft.name = 'Renamed'
+        draft.save()
+        self.assertIsNotNone(self.get_category('Renamed'))
+        draft.delete()
+        self.assertIsNone(self.get_category('Renamed'))
+
+    def test_invalidated_on_approved_resource_delete(self):
+        """Deleting an approved resource refreshes the counts."""
+        self.client.get(self.url)
+        self.resource.delete()
+        self.assertEqual(self.get_category().resource_count, 0)
+
+
+class ToggleFavoriteTests(TestCase):
+    """The JSON endpoint flips favorites without a page reload."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.other = User.objects.create_user(username='u2', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.resource = Resource.objects.create(
+            name='Toggle',
+            description='d',
+            url='https://toggle.com',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+        self.resource.favorites.add(self.other)
+        self.url = reverse('toggle_favorite', args=[self.resource.id])
+
+    def test_toggle_adds_and_removes(self):
+        """Each POST flips the favorite and returns the new count."""
+        self.client.login(username='u1', password='pass')
+        resp = self.client.post(self.url)
+        self.assertEqual(resp.json(),
+                         {'favorited': True, 'favorites_count': 2})
+        self.assertTrue(self.resource.favorites.filter(
+            pk=self.user.pk).exists())
+        resp = self.client.post(self.url)
+        self.assertEqual(resp.json(),
+                         {'favorited': False, 'favorites_count': 1})
+        self.assertFalse(self.resource.favorites.filter(
+            pk=self.user.pk).exists())
+
+    def test_toggle_refreshes_cached_detail(self):
+        """The cached detail shows the new favorites count."""
+        detail_url = reverse('resource_detail', args=[self.resource.id])
+        self.client.get(detail_url)
+        self.client.login(username='u1', password='pass')
+        self.client.post(self.url)
+        self.assertContains(
+            self.client.get(detail_url),
+            '<span class="resource-favorites-count">2</span>')
+
+    def test_toggle_does_not_load_the_resource(self):
+        """A toggle costs a handful of small queries."""
+        self.client.login(username='u1', password='pass')
+        self.client.get(reverse('index'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.url)
+        resource_selects = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT "resources_resource"."id", '
+                                   '"resources_resource"."name"')
+        ]
+        self.assertEqual(resource_selects, [])
+        self.assertLessEqual(len(ctx.captured_queries), 8)
+
+    def test_toggle_requires_login_and_post(self):
+        """Anonymous users and GET requests are rejected."""
+        self.assertEqual(self.client.post(self.url).status_code, 401)
+        self.client.login(username='u1', password='pass')
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_toggle_unknown_resource(self):
+        """Unknown resources return 404."""
+        self.client.login(username='u1', password='pass')
+        resp = self.client.post(reverse('toggle_favorite', args=[0]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_favorite_links_carry_toggle_url(self):
+        """List icons link to the endpoint, and pages carry a CSRF token."""
+        self.client.login(username='u1', password='pass')
+        resp = self.client.get(
+            reverse('category_detail', args=[self.category.id]))
+        self.assertContains(resp, f'data-toggle-url="{self.url}"')
+        self.assertContains(resp, 'name="csrf-token"')
+
+
+class ConditionalGetTests(TestCase):
+    """Listing pages answer repeat visits with 304 Not Modified."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.other = User.objects.create_user(username='u2', password='pass')
+        self.category = Category.objects.create(
+            name='Published', author=self.user, published=True
+        )
+        self.resource = Resource.objects.create(
+            name='Conditional',
+            description='d',
+            url='https://conditional.com',
+            category=self.category,
+            uploader=self.user,
+            approved=True,
+        )
+        self.urls = [
+            reverse('index'),
+            reverse('category_detail', args=[self.category.id]),
+            reverse('search_resources') + '?q=conditional',
+        ]
+
+    def revalidate(self, url, resp):
+        return self.client.get(
+            url, HTTP_IF_NONE_MATCH=resp['ETag'],
+            HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+
+    def test_unchanged_pages_are_not_modified(self):
+        """Matching validators return 304 with a private no-cache."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                resp = self.client.get(url)
+                self.assertEqual(resp.status_code, 200)
+                self.assertIn('private', resp['Cache-Control'])
+                self.assertIn('no-cache', resp['Cache-Control'])
+                self.assertEqual(self.revalidate(url, resp).status_code, 304)
+
+    def test_not_modified_category_costs_one_query(self):
+        """A 304 for a category costs one indexed query."""
+        url = self.urls[1]
+        resp = self.client.get(url)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, resp).status_code, 304)
+
+    def test_changes_invalidate_validators(self):
+        """Editing, deleting and favoriting resources change validators."""
+        first = [self.client.get(url) for url in self.urls]
+        Resource.objects.create(
+            name='Second', description='d', url='https://second.com',
+            category=self.category, uploader=self.user, approved=True)
+        for url, resp in zip(self.urls, first):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, resp).status_code, 200)
+        second = [self.client.get(url) for url in self.urls[1:]]
+        self.resource.delete()
+        for url, resp in zip(self.urls[1:], second):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, resp).status_code, 200)
+
+    def test_deletions_and_favorites_bump_versions(self):
+        """Deletions and favorites by anyone bump the validated versions."""
+        url = self.urls[1]
+        other = Resource.objects.create(
+            name='Other', description='d', url='https://other.com',
+            category=self.category, uploader=self.user, approved=True)
+        keys = [
+            CONTENT_VERSION_KEY,
+            CATEGORY_LISTING_VERSION_KEY.format(self.category.id),
+        ]
+        for change in (other.delete,
+                       lambda: self.resource.favorites.add(self.other)):
+            etag = self.client.get(url)['ETag']
+            versions = [cache.get(key) for key in keys]
+            change()
+            for key, version in zip(keys, versions):
+                self.assertNotEqual(cache.get(key), version)
+            self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_favorites_change_validators_of_the_user(self):
+        """A user's favorites only change that user's validators."""
+        self.client.login(username='u1', password='pass')
+        url = self.urls[1]
+        resp = self.client.get(url)
+        self.client.post(reverse('toggle_favorite', args=[self.resource.id]))
+        self.assertEqual(self.revalidate(url, resp).status_code, 200)
+        resp = self.client.get(url)
+        self.client.login(username='u2', password='pass')
+        self.assertNotEqual(self.client.get(url)['ETag'], resp['ETag'])
+
+    def test_pending_messages_skip_validation(self):
+        """Pages showing messages are always rendered."""
+        self.client.login(username='u1', password='pass')
+        url = self.urls[1]
+        resp = self.client.get(url)
+        self.client.get(reverse('favorite_resource', args=[self.resource.id]))
+        resp = self.revalidate(url, resp)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.has_header('ETag'))
+
+
+class ExportTests(TestCase):
+    """The catalog export streams approved resources to staff."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='pass')
+        self.staff = User.objects.create_user(
+            username='staff', password='pass', is_staff=True)
+        category = Category.objects.create(
+            name='Python', author=self.user, published=True
+        )
+        self.resources = []
+        for i in range(3):
+            resource = Resource.objects.create(
+                name=f'R{i}',
+                description='d',
+                url=f'https://r{i}.com',
+                category=category,
+                uploader=self.user,
+                approved=True,
+            )
+            resource.keywords.add('web', f'k{i}')
+            self.resources.append(resource)
+        self.resources[0].favorites.add(self.user, self.staff)
+        Resource.objects.create(
+            name='Pending', description='d', url='https://pending.com',
+            category=category, uploader=self.user, approved=False,
+        )
+        self.url = reverse('export_resources')
+
+    def export(self, **params):
+        self.client.login(username='staff', password='pass')
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_requires_staff(self):
+        """Anonymous users and non-staff members can't export."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.client.login(username='u1', password='pass')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_exports_csv(self):
+        """The CSV export has a header and a line per approved resource."""
+        rows = list(csv.DictReader(io.StringIO(self.export().decode())))
+        self.assertEqual([row['name'] for row in rows], ['R0', 'R1', 'R2'])
+        self.assertEqual(rows[0]['category'], 'Python')
+        self.assertEqual(rows[0]['uploader'], 'u1')
+        self.assertEqual(rows[0]['keywords'], 'k0,web')
+        self.assertEqual(rows[0]['favorites_count'], '2')
+
+    def test_exports_jsonl(self):
+        """The JSON Lines export has an object per approved resource."""
+        content = self.export(format='jsonl')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [resource.pk for resource in self.resources])
+        self.assertEqual(rows[1]['keywords'], ['k1', 'web'])
+        self.assertEqual(rows[1]['favorites_count'], 0)
+
+    def test_gzip(self):
+        """The export is compressed for clients accepting gzip."""
+        self.client.login(username='staff', password='pass')
+        response = self.client.get(
+            self.url, {'format': 'jsonl'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(content.splitlines()), 3)
+
+    def test_unknown_format(self):
+        """Unknown formats are rejected."""
+        self.client.login(username='staff', password='pass')
+        response = self.client.get(self.url, {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
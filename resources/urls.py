@@ -1,17 +1,28 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# The listing pages are served by async views on ASGI deployments
+listing_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.index, name='index'),
+    path('', listing_views.index, name='index'),
     path('add/', views.submit_resource, name='add_resource'),
-    path('category/<int:category_id>/', views.category_detail,
+    path('category/<int:category_id>/', listing_views.category_detail,
          name='category_detail'),
+    path('resource/<int:resource_id>/', views.resource_detail,
+         name='resource_detail'),
     path('delete/<int:resource_id>/', views.delete_resource,
          name='delete_resource'),
     path('edit/<int:resource_id>/', views.edit_resource, name='edit_resource'),
-    path('favorites/', views.view_favorites, name='view_favorites'),
+    path('favorites/', listing_views.view_favorites, name='view_favorites'),
     path('favorite/<int:resource_id>/', views.favorite_resource,
          name='favorite_resource'),
+    path('favorite/<int:resource_id>/toggle/', views.toggle_favorite,
+         name='toggle_favorite'),
     path('suggest-category/', views.suggest_category, name='suggest_category'),
-    path('search/', views.search_resources, name='search_resources'),
+    path('search/', listing_views.search_resources, name='search_resources'),
+    path('export/', views.export_resources, name='export_resources'),
+    path('api/categories/', api.category_list, name='api_category_list'),
+    path('api/resources/', api.resource_list, name='api_resource_list'),
 ]
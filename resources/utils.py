@@ -1,23 +1,220 @@
-from django.db.models import Count
+import re
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils import timezone
+from .cache import (
+    bump_content_version, get_category_list, invalidate_category_list,
+    invalidate_category_listings, invalidate_resource_details,
+    set_category_list,
+)
+from . import fuzzy
+from .canonical import canonicalize_url, name_key, url_hash
+from .models import Category, Resource
 
+# Marks where per-user actions go in a cached listing
+RESOURCE_ACTIONS_PLACEHOLDER = re.compile(r'<!-- resource-actions:(\d+) -->')
 
-def sort_resources(request, resources):
+
+def favorites_count_subquery():
+    """
+    Build a correlated subquery counting the favorites of each resource.
+
+    :returns: An expression usable in ``annotate`` or ``update``.
+    """
+    favorites = Resource.favorites.through.objects.filter(
+        resource=OuterRef('pk')
+    ).order_by().values('resource').annotate(
+        count=Count('*')
+    ).values('count')
+    return Coalesce(Subquery(favorites), 0)
+
+
+def update_favorites_count(resource_ids=None):
+    """
+    Recount the stored favorites count of resources in a single UPDATE.
+
+    The resources are locked first, so concurrent recounts of a resource
+    run one after the other and the last one counts the favorites the
+    others committed, instead of both counting from the same snapshot and
+    missing each other's change.
+
+    :param resource_ids: The IDs of the :model:`Resource` objects to update,
+    or ``None`` to update every resource.
+    :returns: The number of resources updated.
+    """
+    resources = Resource.objects.all()
+    if resource_ids is not None:
+        resources = resources.filter(pk__in=resource_ids)
+    with transaction.atomic(savepoint=False):
+        # Locked in a fixed order so concurrent recounts can't deadlock
+        list(resources.select_for_update().order_by('pk').values_list(
+            'pk', flat=True))
+        return resources.update(favorites_count=favorites_count_subquery())
+
+
+def set_approved(resources, approved):
+    """
+    Approve or unapprove resources with a single UPDATE.
+
+    ``update()`` sends no signals, so the caches and the fuzzy search
+    index that the signals would drop for each resource are dropped here
+    once for all of them.
+
+    :param resources: A queryset of :model:`Resource` objects.
+    :param approved: Whether to approve the resources.
+    :returns: The number of resources whose approval changed.
+    """
+    resources = resources.exclude(approved=approved)
+    resource_ids = list(resources.values_list('pk', flat=True))
+    category_ids = set(
+        resources.values_list('category_id', flat=True).distinct())
+    updated = Resource.objects.filter(pk__in=resource_ids).update(
+        approved=approved, updated_at=timezone.now())
+    if updated:
+        invalidate_resource_details(resource_ids)
+        invalidate_category_listings(category_ids)
+        invalidate_category_list()
+        bump_content_version()
+        fuzzy.invalidate_index()
+    return updated
+
+
+def set_published(categories, published):
+    """
+    Publish or unpublish categories with a single UPDATE, dropping the
+    caches listing them once for all of them.
+
+    :param categories: A queryset of :model:`Category` objects.
+    :param published: Whether to publish the categories.
+    :returns: The number of categories whose publication changed.
+    """
+    category_ids = list(
+        categories.exclude(published=published).values_list('pk', flat=True))
+    updated = Category.objects.filter(pk__in=category_ids).update(
+        published=published)
+    if updated:
+        invalidate_category_listings(category_ids)
+        invalidate_category_list()
+        bump_content_version()
+        fuzzy.invalidate_index()
+    return updated
+
+
+def published_categories():
+    """
+    Return the published categories ordered by name, annotated with
+    ``resource_count`` and ``newest_resource``, their number of approved
+    resources and the creation date of the newest one.
+
+    The list is cached until a category is published or renamed or a
+    resource's approval changes.
+    """
+    categories = get_category_list()
+    if categories is None:
+        categories = list(published_categories_queryset())
+        set_category_list(categories)
+    return categories
+
+
+def published_categories_queryset():
+    """
+    Build the query of :func:`published_categories`.
+    """
+    approved = Q(resources__approved=True)
+    return Category.objects.filter(published=True).annotate(
+        resource_count=Count('resources', filter=approved),
+        newest_resource=Max('resources__created_at', filter=approved),
+    ).order_by('name')
+
+
+def listing_queryset(resources):
+    """
+    Prepare a queryset of resources for rendering in a listing.
+
+    Listings only show the name and favorite state of each resource and
+    load its details on demand, so only the columns needed to render and
+    paginate the list are loaded.
+
+    :param resources: A queryset of :model:`Resource` objects.
+    """
+    # The category is kept for querysets of a category's resources,
+    # which set it on every row they load
+    return resources.only(
+        'id', 'name', 'category', 'uploader', 'created_at', 'favorites_count'
+    )
+
+
+def sort_resources(request, resources, default='alphabetical'):
     """
     Sort resources based on user-selected criteria.
 
     :param request: The HTTP request object containing GET parameters.
     :param resources: A queryset of :model:`Resource` objects to be sorted.
+    :param default: The criteria to use when none is selected.
     """
-    sort_by = request.GET.get('sort_by', 'alphabetical')
+    sort_by = request.GET.get('sort_by', default)
+    # Every ordering ends with the ID so positions are unique, which
+    # keyset pagination relies on
     if sort_by == 'alphabetical':
-        resources = resources.order_by('name')
+        resources = resources.order_by('name', 'id')
     elif sort_by == 'newest':
-        resources = resources.order_by('-created_at')
+        resources = resources.order_by('-created_at', '-id')
     elif sort_by == 'oldest':
-        resources = resources.order_by('created_at')
+        resources = resources.order_by('created_at', 'id')
     elif sort_by == 'most_favorited':
-        # Annotate each resource with the count of favorites
-        # and order by that count
-        resources = resources.annotate(num_favorites=Count(
-            'favorites', distinct=True)).order_by('-num_favorites')
+        # Order by the stored favorites count, which is indexed
+        resources = resources.order_by('-favorites_count', '-id')
+    elif (sort_by == 'relevance' and
+            'search_rank' in resources.query.annotations):
+        # Order full-text search results by their rank
+        resources = resources.order_by('-search_rank', '-id')
     return resources
+
+
+def add_resource_actions(user, html, resources, favorite_resources):
+    """
+    Add the favorite icons and edit buttons of a user to the resources of a
+    cached listing.
+
+    :param user: The current user.
+    :param html: The rendered listing with a placeholder per resource.
+    :param resources: The :model:`Resource` objects in the listing.
+    :param favorite_resources: The :model:`Resource` objects in the
+    listing favorited by the user.
+    """
+    # Evaluate the favorites once for all resources
+    favorite_resources = list(favorite_resources)
+    actions = {
+        resource.pk: render_to_string(
+            'resources/includes/resource_actions.html', {
+                'user': user,
+                'resource': resource,
+                'favorite_resources': favorite_resources,
+            })
+        for resource in resources
+    }
+    return RESOURCE_ACTIONS_PLACEHOLDER.sub(
+        lambda match: actions.get(int(match[1]), ''), html)
+
+
+def find_duplicate(resource):
+    """
+    Find which field of a resource duplicates another resource.
+
+    Both the canonical URL hash and the case-folded name are unique and
+    indexed, so a single query checks both.
+
+    :param resource: A saved or unsaved :model:`Resource` object.
+    :returns: ``'url'`` or ``'name'``, or ``None`` if there is no
+    duplicate.
+    """
+    resource_url_hash = url_hash(canonicalize_url(resource.url))
+    duplicates = Resource.objects.filter(
+        Q(url_hash=resource_url_hash) | Q(name_key=name_key(resource.name))
+    ).exclude(pk=resource.pk).values_list('url_hash', flat=True)[:2]
+    duplicates = list(duplicates)
+    if not duplicates:
+        return None
+    return 'url' if resource_url_hash in duplicates else 'name'
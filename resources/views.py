@@ -1,38 +1,77 @@
-from django.shortcuts import render
-from django.http import HttpResponseRedirect
-from django.db.models import Q
+from django.shortcuts import get_object_or_404, render
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect,
+    JsonResponse, QueryDict, StreamingHttpResponse,
+)
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.db.models.signals import m2m_changed
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST
+from developer_toolkit.query_checks import query_budget
+from developer_toolkit.throttling import throttle
 from .models import Resource, Category
+from .cache import (
+    get_category_listing, get_resource_detail, set_category_listing,
+    set_resource_detail,
+)
+from .export import EXPORT_FORMATS, export_lines
+from .conditional import (
+    category_validators, conditional_listing, index_validators,
+    search_validators,
+)
 from .forms import ResourceForm, CategoryForm
-from .utils import sort_resources
+from .fuzzy import fuzzy_search, suggest_query
+from .pagination import CURSOR_PARAM, paginate_keyset
+from .search import deferred_indexing, full_text_search
+from .utils import (
+    add_resource_actions, find_duplicate, listing_queryset,
+    published_categories, sort_resources,
+)
 
 
 # Create your views here.
+# Listings are revalidated on every visit and differ per user
+@query_budget(3)
+@cache_control(private=True, no_cache=True)
+@conditional_listing(index_validators)
 def index(request):
     """
     Display the homepage with a list of published categories.
 
-    This view fetches all published categories, orders them by name,
-    and renders them on the homepage.
+    This view fetches all published categories with the number of approved
+    resources in each and the date of the newest one, orders them by name,
+    and renders them on the homepage. The categories are cached until a
+    category is published or renamed or a resource's approval changes.
 
     :param request: The HTTP request object.
 
     **Context:**
 
-    ``categories``: A queryset of published :model:`Category` objects ordered
-    by name.
+    ``categories``: A list of published :model:`Category` objects ordered
+    by name, annotated with ``resource_count`` and ``newest_resource``.
 
     **Template:**
 
     :template:`resources/index.html`
     """
-    categories = Category.objects.filter(published=True).order_by('name')
     context = {
-        'categories': categories,
+        'categories': published_categories(),
     }
     return render(request, 'resources/index.html', context)
 
 
+# Listings are revalidated on every visit and differ per user
+@query_budget(8)
+@cache_control(private=True, no_cache=True)
+@conditional_listing(category_validators)
 def category_detail(request, category_id):
     """
     Display details of a specific category along with its approved resources.
@@ -40,7 +79,13 @@ def category_detail(request, category_id):
     This view fetches a published category by its ID and retrieves
     all approved resources associated with that category. It also identifies
     which of these resources are favorited by the current user.
-    The resources can be sorted based on user preferences.
+    The resources can be sorted based on user preferences and are
+    paginated with a cursor.
+
+    The rendered list of approved resources is the same for every user, so
+    each page of it is cached per sort order until a resource of the
+    category changes. The favorite icons and edit buttons of the current
+    user are added to the cached list afterwards.
 
     :param request: The HTTP request object.
     :param category_id: The ID of the category to be displayed.
@@ -48,39 +93,117 @@ def category_detail(request, category_id):
     **Context:**
 
     ``category``: The :model:`Category` object being viewed.
-    ``resources``: A queryset of approved :model:`Resource` objects in the
-    category, sorted as per user preference.
-    ``favorite_resources``: A queryset of :model:`Resource` objects favorited
-    by the current user.
+    ``listing``: The rendered list of approved :model:`Resource` objects on
+    the page, sorted as per user preference.
+    ``pagination``: The rendered links to the adjacent pages.
+    ``resource_count``: The number of approved resources in the category.
+    ``favorite_resources``: A queryset of :model:`Resource` objects on the
+    page favorited by the current user.
+    ``unapproved_resources``: A queryset of the current user's
+    :model:`Resource` objects in the category awaiting approval.
 
     **Template:**
 
     :template:`resources/category_detail.html`
     """
     category = Category.objects.get(id=category_id, published=True)
-    resources = category.resources.filter(approved=True)
-    resources = resources.order_by('-created_at')
+    sort_by = request.GET.get('sort_by', 'alphabetical')
+    cursor = request.GET.get(CURSOR_PARAM)
+    listing = get_category_listing(category.id, sort_by, cursor)
+    if listing is None:
+        resources = category.resources.filter(approved=True)
+        resources = resources.order_by('-created_at')
+        # Page links only keep the sort order, the key of the cached page
+        params = QueryDict(mutable=True)
+        if 'sort_by' in request.GET:
+            params['sort_by'] = sort_by
+        # Load related objects and keywords in bulk, one page at a time
+        page = paginate_keyset(
+            request, sort_resources(request, listing_queryset(resources)),
+            params=params,
+        )
+        listing = {
+            'html': render_to_string(
+                'resources/includes/category_listing.html',
+                {'resources': page},
+            ),
+            'pagination': render_to_string(
+                'resources/includes/pagination.html', {'page': page},
+            ),
+            'resource_count': resources.count(),
+            'resources': page.items,
+        }
+        set_category_listing(category.id, sort_by, cursor, listing)
+    html = listing['html']
     if request.user.is_authenticated:
-        unapproved_resources = category.resources.filter(approved=False,
-                                                         uploader=request.user)
+        unapproved_resources = listing_queryset(
+            category.resources.filter(approved=False, uploader=request.user)
+        )
+        favorite_resources = Resource.objects.filter(
+            favorites=request.user,
+            pk__in=[r.pk for r in listing['resources']],
+        )
+        html = add_resource_actions(
+            request.user, html, listing['resources'], favorite_resources)
     else:
         unapproved_resources = []
-    if request.user.is_authenticated:
-        favorite_resources = resources.filter(favorites=request.user)
-    else:
         favorite_resources = []
-    if resources.exists():
-        resources = sort_resources(request, resources)
 
     context = {
         'category': category,
-        'resources': resources,
+        'listing': mark_safe(html),
+        'pagination': mark_safe(listing['pagination']),
+        'resource_count': listing['resource_count'],
         'favorite_resources': favorite_resources,
         'unapproved_resources': unapproved_resources,
     }
     return render(request, 'resources/category_detail.html', context)
 
 
+@query_budget(4)
+def resource_detail(request, resource_id):
+    """
+    Return the detail of a resource as an HTML fragment for its modal.
+
+    The rendered fragment is the same for every user, so it is cached
+    until the resource is edited, favorited or deleted. Unapproved
+    resources are only shown to their uploader.
+
+    :param request: The HTTP request object.
+    :param resource_id: The ID of the resource to be displayed.
+
+    **Context:**
+
+    ``resource``: The :model:`Resource` object being displayed.
+
+    **Template:**
+
+    :template:`resources/includes/resource_detail.html`
+    """
+    detail = get_resource_detail(resource_id)
+    if detail is None:
+        resource = get_object_or_404(
+            Resource.objects.select_related(
+                'category', 'uploader'
+            ).prefetch_related('keywords'),
+            id=resource_id,
+        )
+        detail = {
+            'html': render_to_string(
+                'resources/includes/resource_detail.html',
+                {'resource': resource},
+            ),
+            'approved': resource.approved,
+            'uploader_id': resource.uploader_id,
+        }
+        set_resource_detail(resource_id, detail)
+    if not detail['approved'] and detail['uploader_id'] != request.user.id:
+        raise Http404('Resource not found.')
+    return HttpResponse(detail['html'])
+
+
+@query_budget(29)
+@throttle('submit_resource')
 def submit_resource(request):
     """
     Handle the submission of a new resource.
@@ -111,34 +234,24 @@ def submit_resource(request):
             form = ResourceForm(request.POST)
             if form.is_valid():
                 resource = form.save(commit=False)
-                # Check if resource with the same URL already exists
-                existing_resource_url = Resource.objects.filter(
-                    url=resource.url
-                ).first()
-                if existing_resource_url:
-                    messages.add_message(
-                        request, messages.ERROR,
-                        f'A resource with the URL "{resource.url}"'
-                        'already exists.')
-                    return HttpResponseRedirect(request.META.get(
-                        'HTTP_REFERER', '/'
-                        ))
-                # Check if resource with the same name already exists
-                existing_resource_name = Resource.objects.filter(
-                    name=resource.name
-                ).first()
-                if existing_resource_name:
-                    messages.add_message(
-                        request, messages.ERROR,
-                        f'A resource with the name "{resource.name}"'
-                        ' already exists.')
-                    return HttpResponseRedirect(request.META.get(
-                        'HTTP_REFERER', '/'
-                        ))
+                # Check if a resource with the same canonical URL or
+                # case-folded name already exists
+                duplicate = find_duplicate(resource)
+                if duplicate:
+                    return reject_duplicate_resource(
+                        request, resource, duplicate)
                 resource.uploader = request.user
                 resource.approved = False
-                resource.save()
-                form.save_m2m()  # Save tags
+                try:
+                    # The unique URL hash and name key reject a duplicate
+                    # submitted since the check. The search document is
+                    # built once for the resource and its keywords
+                    with transaction.atomic(), deferred_indexing():
+                        resource.save()
+                        form.save_m2m()  # Save tags
+                except IntegrityError:
+                    return reject_duplicate_resource(
+                        request, resource, find_duplicate(resource))
                 messages.add_message(
                     request, messages.SUCCESS,
                     f'Resource "{resource.name}" submitted and'
@@ -159,6 +272,27 @@ def submit_resource(request):
         return render(request, 'resources/add_resource.html', context)
 
 
+def reject_duplicate_resource(request, resource, duplicate):
+    """
+    Reject a resource duplicating an existing one.
+
+    :param request: The HTTP request object.
+    :param resource: The :model:`Resource` object being saved.
+    :param duplicate: The duplicated field, ``'url'`` or ``'name'``.
+
+    **Redirects to:**
+
+    The referring page or homepage if no referrer is found.
+    """
+    if duplicate == 'name':
+        message = f'A resource with the name "{resource.name}" already exists.'
+    else:
+        message = f'A resource with the URL "{resource.url}" already exists.'
+    messages.add_message(request, messages.ERROR, message)
+    return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
+
+
+@query_budget(34)
 def edit_resource(request, resource_id):
     """
     Handle the editing of an existing resource.
@@ -192,37 +326,23 @@ def edit_resource(request, resource_id):
             form = ResourceForm(request.POST, instance=resource)
             if form.is_valid():
                 resource = form.save(commit=False)
-                # Check if resource with the same URL already exists
-                # and is not the current resource
-                existing_resource_url = Resource.objects.filter(
-                    url=resource.url
-                ).first()
-                if (existing_resource_url and
-                        existing_resource_url.id != resource.id):
-                    messages.add_message(
-                        request, messages.ERROR,
-                        f'A resource with the URL "{resource.url}"'
-                        'already exists.')
-                    return HttpResponseRedirect(request.META.get(
-                        'HTTP_REFERER', '/'
-                        ))
-                # Check if resource with the same name already exists
-                # and is not the current resource
-                existing_resource_name = Resource.objects.filter(
-                    name=resource.name
-                ).first()
-                if (existing_resource_name and
-                        existing_resource_name.id != resource.id):
-                    messages.add_message(
-                        request, messages.ERROR,
-                        f'A resource with the name "{resource.name}"'
-                        ' already exists.')
-                    return HttpResponseRedirect(request.META.get(
-                        'HTTP_REFERER', '/'
-                        ))
+                # Check if another resource with the same canonical URL
+                # or case-folded name already exists
+                duplicate = find_duplicate(resource)
+                if duplicate:
+                    return reject_duplicate_resource(
+                        request, resource, duplicate)
                 resource.approved = False  # Re-approval after edit
-                resource.save()
-                form.save_m2m()  # Save tags
+                try:
+                    # The unique URL hash and name key reject a duplicate
+                    # submitted since the check. The search document is
+                    # built once for the resource and its keywords
+                    with transaction.atomic(), deferred_indexing():
+                        resource.save()
+                        form.save_m2m()  # Save tags
+                except IntegrityError:
+                    return reject_duplicate_resource(
+                        request, resource, find_duplicate(resource))
                 messages.add_message(
                     request, messages.SUCCESS,
                     f'Resource "{resource.name}" updated successfully'
@@ -241,6 +361,8 @@ def edit_resource(request, resource_id):
     return render(request, 'resources/add_resource.html', context)
 
 
+@query_budget(8)
+@throttle('delete_resource', methods=None)
 def delete_resource(request, resource_id):
     """
     Handle the deletion of an existing resource.
@@ -272,6 +394,7 @@ def delete_resource(request, resource_id):
     return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
 
 
+@query_budget(4)
 def view_favorites(request):
     """
     Display the user's favorite resources.
@@ -284,8 +407,9 @@ def view_favorites(request):
 
     **Context:**
 
-    ``favorite_resources``: A queryset of :model:`Resource` objects favorited
+    ``favorite_resources``: A page of :model:`Resource` objects favorited
     by the current user.
+    ``favorite_count``: The number of resources favorited by the user.
 
     **Template:**
 
@@ -299,15 +423,23 @@ def view_favorites(request):
     else:
         favorite_resources = request.user.favorite_resources.all()
         favorite_resources = favorite_resources.order_by('-created_at')
-        if favorite_resources.exists():
-            favorite_resources = sort_resources(request, favorite_resources)
+        favorite_count = favorite_resources.count()
+        # Load related objects and keywords in bulk, one page at a time
+        page = paginate_keyset(
+            request, sort_resources(request,
+                                    listing_queryset(favorite_resources))
+        )
 
         context = {
-            'favorite_resources': favorite_resources,
+            'favorite_resources': page,
+            'favorite_count': favorite_count,
         }
         return render(request, 'resources/favorite_resources.html', context)
 
 
+# Recounting favorites locks the resource first
+@query_budget(8)
+@throttle('favorite_resource', methods=None)
 def favorite_resource(request, resource_id):
     """
     Toggle the favorite status of a resource for the current user.
@@ -346,6 +478,68 @@ def favorite_resource(request, resource_id):
     return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
 
 
+# Recounting favorites locks the resource first
+@query_budget(8)
+@require_POST
+@throttle('favorite_resource')
+def toggle_favorite(request, resource_id):
+    """
+    Toggle the favorite status of a resource for the current user and
+    return the new status as JSON.
+
+    The favorite is removed with a single delete, or added with a single
+    insert conditional on the resource existing, without loading the
+    resource. The page is updated in place by ``static/js/script.js``.
+
+    :param request: The HTTP request object.
+    :param resource_id: The ID of the resource to be favorited or unfavorited.
+
+    **Returns:**
+
+    A JSON object with ``favorited``, whether the resource is now a
+    favorite of the user, and ``favorites_count``, its number of
+    favorites. Anonymous users get a 401 error and unknown resources a
+    404 error.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'error': 'You must be logged in to favorite a resource.'},
+            status=401)
+    through = Resource.favorites.through
+    removed, _ = through.objects.filter(
+        resource_id=resource_id, user_id=request.user.id
+    ).delete()
+    if removed:
+        favorited, action = False, 'post_remove'
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {through._meta.db_table} '
+                '(resource_id, user_id) '
+                f'SELECT id, %s FROM {Resource._meta.db_table} WHERE id = %s '
+                'ON CONFLICT DO NOTHING',
+                [request.user.id, resource_id])
+            added = cursor.rowcount
+        if not added and not Resource.objects.filter(pk=resource_id).exists():
+            raise Http404('Resource not found.')
+        favorited, action = True, 'post_add'
+    # Refresh the favorites count and caches as a related manager would
+    m2m_changed.send(
+        sender=through, instance=Resource(pk=resource_id), action=action,
+        reverse=False, model=User, pk_set={request.user.id},
+        using=connection.alias,
+    )
+    favorites_count = Resource.objects.filter(
+        pk=resource_id
+    ).values_list('favorites_count', flat=True).first()
+    return JsonResponse({
+        'favorited': favorited,
+        'favorites_count': favorites_count or 0,
+    })
+
+
+@query_budget(4)
+@throttle('suggest_category')
 def suggest_category(request):
     """
     Handle the suggestion of a new category.
@@ -377,10 +571,11 @@ def suggest_category(request):
             form = CategoryForm(request.POST)
             if form.is_valid():
                 category = form.save(commit=False)
-                # Check if category with the same name already exists
-                existing_category = Category.objects.filter(
-                    name__iexact=category.name
-                    ).first()
+                # Check if category with the same name already exists,
+                # comparing lowercase names to use their index
+                existing_category = Category.objects.alias(
+                    name_lower=Lower('name')
+                ).filter(name_lower=Lower(Value(category.name))).exists()
                 if existing_category:
                     messages.add_message(
                         request, messages.ERROR,
@@ -416,23 +611,37 @@ def suggest_category(request):
         return render(request, 'resources/category_suggestion.html', context)
 
 
+# Listings are revalidated on every visit and differ per user
+@query_budget(7)
+@cache_control(private=True, no_cache=True)
+@conditional_listing(search_validators)
 def search_resources(request):
     """
     Handle the search for resources based on user queries.
 
     This view processes search queries submitted by users. It allows searching
-    within resource names, descriptions, and keywords.
-    The results can be sorted based on user preferences.
+    within resource names, descriptions, and keywords using the full-text
+    search index, or within names and keywords using typo-tolerant fuzzy
+    matching. The results are ranked by relevance unless the user
+    selects another sort order. When nothing matches, a corrected query
+    is suggested.
 
     :param request: The HTTP request object.
 
     **Context:**
 
-    ``resources``: A queryset of :model:`Resource` objects matching
-    the search criteria, sorted as per user preference.
+    ``resources``: A page of :model:`Resource` objects matching
+    the search criteria, annotated with ``search_rank`` and
+    ``search_snippet`` and sorted as per user preference.
+    ``resource_count``: The number of resources matching the search.
     ``query``: The search query string.
+    ``favorite_resources``: A queryset of :model:`Resource` objects on the
+    page favorited by the current user.
     ``search_in``: A list of fields to search within
     (name, description, keywords).
+    ``fuzzy``: Whether typo-tolerant matching was requested.
+    ``suggestion``: A corrected query when no resources were found.
+    ``suggestion_query``: The query string searching for the suggestion.
 
     **Template:**
 
@@ -440,29 +649,79 @@ def search_resources(request):
     """
     query = request.GET.get('q', '')
     search_in = request.GET.getlist('in') or ['name']
+    fuzzy = request.GET.get('fuzzy') == 'on'
+    favorite_resources = []
+    suggestion = None
+    suggestion_query = ''
     if query:
         resources = Resource.objects.filter(approved=True).order_by(
             '-created_at'
         )
     else:
         resources = []
+    resource_count = 0
     if query:
-        # Build the Q object based on selected search fields
-        q_objects = Q()
         # Search in name, description, and keywords as per user selection
-        if 'name' in search_in:
-            q_objects |= Q(name__icontains=query)
-        if 'description' in search_in:
-            q_objects |= Q(description__icontains=query)
-        if 'keywords' in search_in:
-            q_objects |= Q(keywords__name__icontains=query)
-        # Filter resources based on the constructed Q object
-        resources = resources.filter(q_objects).distinct()
-        resources = sort_resources(request, resources)
+        if fuzzy:
+            resources = fuzzy_search(resources, query, search_in)
+        else:
+            resources = full_text_search(resources, query, search_in)
+        resource_count = resources.count()
+        # Load related objects and keywords in bulk, one page at a time
+        page = paginate_keyset(request, sort_resources(
+            request, listing_queryset(resources), default='relevance'
+        ))
+        if request.user.is_authenticated:
+            favorite_resources = resources.filter(
+                favorites=request.user, pk__in=[r.pk for r in page]
+            )
+        resources = page
+        if not resource_count:
+            # Suggest a correction of misspelled words
+            suggestion = suggest_query(query)
+            if suggestion:
+                params = request.GET.copy()
+                params['q'] = suggestion
+                suggestion_query = params.urlencode()
 
     context = {
         'resources': resources,
+        'resource_count': resource_count,
+        'favorite_resources': favorite_resources,
         'query': query,
         'search_in': search_in,
+        'fuzzy': fuzzy,
+        'suggestion': suggestion,
+        'suggestion_query': suggestion_query,
     }
     return render(request, 'resources/search_results.html', context)
+
+
+@query_budget(4)
+@staff_member_required
+@gzip_page
+def export_resources(request):
+    """
+    Stream the approved catalog as CSV or JSON Lines to staff members.
+
+    The rows are generated while the response is sent, so the export
+    never holds the catalog in memory, and compressed on the fly for
+    clients accepting gzip.
+
+    :param request: The HTTP request object, whose ``format`` parameter is
+    ``csv`` (the default) or ``jsonl``.
+
+    **Returns:**
+
+    A streamed attachment with a row per approved resource, see
+    :mod:`resources.export`. Unknown formats get a 400 error.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Unknown export format.')
+    response = StreamingHttpResponse(
+        export_lines(export_format),
+        content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = (
+        f'attachment; filename="resources.{export_format}"')
+    return response
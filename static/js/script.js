@@ -70,14 +70,17 @@ if (sortBySelect) {
     const selectOptions = sortBySelect.querySelectorAll('option');
     let queryString = window.location.search;
     let urlParams = new URLSearchParams(queryString);
-    let currentSort = urlParams.get('sort_by') || 'alphabetical';
-    selectOptions.forEach(option => {
-        if (option.value === currentSort) {
-            option.selected = true;
-        } else {
-            option.selected = false;
-        }
-    });
+    let currentSort = urlParams.get('sort_by');
+    // Keep the page's default option selected when no sort is requested
+    if (currentSort) {
+        selectOptions.forEach(option => {
+            if (option.value === currentSort) {
+                option.selected = true;
+            } else {
+                option.selected = false;
+            }
+        });
+    }
 }
 
 // Set the checked state of search-in checkboxes based on URL parameters
@@ -121,4 +124,138 @@ if (contactForm) {
         }
         contactForm.submit();
     });
-}
\ No newline at end of file
+}
+// Show the favorite state of a resource on a list icon or modal button
+const setFavoriteState = (link, favorited) => {
+    link.dataset.favorited = favorited;
+    if (link.classList.contains('favorite-link')) {
+        const action = favorited ? 'Remove' : 'Add';
+        const preposition = favorited ? 'from' : 'to';
+        const label = `${action} ${link.dataset.resourceName} ${preposition} favorites`;
+        link.setAttribute('aria-label', label);
+        link.title = label;
+        const icon = link.querySelector('i');
+        icon.classList.toggle('bi-bookmark-star-fill', favorited);
+        icon.classList.toggle('bi-bookmark-star', !favorited);
+    } else {
+        link.textContent = favorited ? 'Remove from Favorites' : 'Add to Favorites';
+        link.classList.toggle('delete-button', favorited);
+        link.classList.toggle('secondary-button', !favorited);
+    }
+};
+
+// Resource detail fragments already loaded, by URL
+const detailCache = new Map();
+
+// Load resource details into the shared resource modal when it opens
+const resourceModal = document.getElementById('resourceModal');
+if (resourceModal) {
+    const modalTitle = resourceModal.querySelector('#resourceModalLabel');
+    const modalBody = resourceModal.querySelector('#resourceModalBody');
+    const visitLink = resourceModal.querySelector('#resourceModalVisit');
+    const favoriteLink = resourceModal.querySelector('#resourceModalFavorite');
+    const showDetail = html => {
+        modalBody.innerHTML = html;
+        const detail = modalBody.querySelector('.resource-detail');
+        visitLink.href = detail ? detail.dataset.visitUrl : '#';
+    };
+    resourceModal.addEventListener('show.bs.modal', e => {
+        const trigger = e.relatedTarget;
+        const detailUrl = trigger.getAttribute('href');
+        modalTitle.textContent = trigger.dataset.resourceName;
+        // Mirror the favorite icon shown next to the resource in the list
+        const listFavorite = trigger.closest('li').querySelector('.favorite-link');
+        if (favoriteLink) {
+            if (listFavorite) {
+                favoriteLink.href = listFavorite.getAttribute('href');
+                favoriteLink.dataset.toggleUrl = listFavorite.dataset.toggleUrl;
+                setFavoriteState(favoriteLink, listFavorite.dataset.favorited === 'true');
+                favoriteLink.classList.remove('d-none');
+            } else {
+                favoriteLink.classList.add('d-none');
+            }
+        }
+        if (detailCache.has(detailUrl)) {
+            showDetail(detailCache.get(detailUrl));
+            return;
+        }
+        modalBody.innerHTML = '<div class="text-center"><div class="spinner-border" role="status"><span class="visually-hidden">Loading...</span></div></div>';
+        visitLink.href = '#';
+        fetch(detailUrl, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.text();
+            })
+            .then(html => {
+                detailCache.set(detailUrl, html);
+                showDetail(html);
+            })
+            .catch(() => {
+                modalBody.innerHTML = '<div class="alert alert-danger" role="alert">The resource details could not be loaded.</div>';
+            });
+    });
+}
+
+// Show the new favorite state and count of a toggled resource
+const showToggledFavorite = (link, toggleUrl, data) => {
+    document.querySelectorAll('[data-toggle-url]').forEach(other => {
+        if (other.dataset.toggleUrl === toggleUrl) {
+            setFavoriteState(other, data.favorited);
+        }
+    });
+    // Loaded details show the old favorites count
+    detailCache.clear();
+    if (link.id === 'resourceModalFavorite') {
+        const count = resourceModal.querySelector('.resource-favorites-count');
+        if (count) {
+            count.textContent = data.favorites_count;
+        }
+    }
+};
+
+// Toggle favorites in place instead of reloading the page
+const csrfToken = document.querySelector('meta[name="csrf-token"]');
+if (csrfToken) {
+    document.addEventListener('click', e => {
+        const link = e.target.closest('[data-toggle-url]');
+        if (!link) {
+            return;
+        }
+        e.preventDefault();
+        const toggleUrl = link.dataset.toggleUrl;
+        fetch(toggleUrl, {
+            method: 'POST',
+            headers: {'X-CSRFToken': csrfToken.content, 'X-Requested-With': 'XMLHttpRequest'},
+        })
+            .then(response => {
+                if (response.ok) {
+                    return response.json().then(data => showToggledFavorite(link, toggleUrl, data));
+                }
+                // The server answered, so toggling again by reloading the
+                // page would not help
+                if (response.status === 401) {
+                    alert('You must be logged in to favorite a resource.');
+                } else if (response.status === 429) {
+                    alert('Too many favorites, please try again later.');
+                } else {
+                    alert('The favorite could not be saved, please try again later.');
+                }
+            }, () => {
+                // The request could not be sent, fall back to the toggle
+                // that reloads the page
+                window.location.href = link.href;
+            });
+    });
+}
+
+// Point the shared delete confirmation modal at the chosen resource
+const deleteResourceModal = document.getElementById('deleteResourceModal');
+if (deleteResourceModal) {
+    deleteResourceModal.addEventListener('show.bs.modal', e => {
+        const trigger = e.relatedTarget;
+        deleteResourceModal.querySelector('#deleteResourceModalLabel').textContent = `Delete ${trigger.dataset.resourceName}`;
+        deleteResourceModal.querySelector('#deleteResourceLink').href = trigger.dataset.deleteUrl;
+    });
+}